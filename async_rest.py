@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import checkpoints
+import record_spill
+import run_metrics
+
+# Requests in flight at once per API host on the asyncio engine, e.g. REST_CONCURRENCY=16
+DEFAULT_CONCURRENCY = 8
+
+# One slot pool per API host, shared by every event loop of the process (export_targets runs one per worker thread)
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+# Items per page of a REST list endpoint; a shorter page is the last one
+PER_PAGE = 100
+
+
+# Function to read the REST engine for this run, e.g. REST_ENGINE=async for the aiohttp client (requests is the default)
+def selected_rest_engine(default="requests"):
+    engine = os.environ.get("REST_ENGINE", default).strip().lower()
+    if engine not in ("requests", "async"):
+        raise ValueError(f"Unsupported REST engine {engine}; choose requests or async")
+    return engine
+
+
+# Function to read how many requests the asyncio engine keeps in flight
+def rest_concurrency():
+    return max(1, int(os.environ.get("REST_CONCURRENCY", DEFAULT_CONCURRENCY)))
+
+
+# Function to get the slot pool of one API host, sized REST_CONCURRENCY when the host is first used
+def host_slots(url):
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(rest_concurrency())
+        return _host_slots[host]
+
+
+# Function to hold one slot of the host's pool without blocking the event loop, so all threads together keep at most
+# REST_CONCURRENCY requests in flight to a host however many targets run at once
+@contextlib.asynccontextmanager
+async def host_slot(url):
+    slots = host_slots(url)
+    while not slots.acquire(blocking=False):
+        await asyncio.sleep(0.01)
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+# Function to read the last page number from a GitHub Link header (None when there is no rel="last")
+def last_page_number(link_header):
+    match = re.search(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"', link_header or "")
+    return int(match.group(1)) if match else None
+
+
+# Function to send one request through the metrics layer, holding a semaphore slot and a slot of the host's pool only
+# while it is in flight and
+# retrying transient failures like run_metrics.http_request. Returns (status, body bytes, response headers).
+async def request(session, semaphore, method, url, retries=2, backoff=2, **kwargs):
+    import aiohttp
+
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            async with semaphore, host_slot(url):
+                async with session.request(method, url, **kwargs) as response:
+                    body = await response.read()
+                    status = response.status
+                    headers = response.headers
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            run_metrics.record_request(time.perf_counter() - start, 0, ok=False, retry=attempt > 0)
+            if attempt >= retries:
+                raise
+        else:
+            run_metrics.record_request(time.perf_counter() - start, len(body), ok=status < 400, retry=attempt > 0)
+            if status not in run_metrics.RETRY_STATUS_CODES or attempt >= retries:
+                return status, body, headers
+        attempt += 1
+        print(f"Retrying {method} {url} (attempt {attempt + 1} of {retries + 1})")
+        await asyncio.sleep(backoff * attempt)
+
+
+async def _fetch_all_items(base_url, headers, concurrency):
+    import aiohttp
+
+    items = record_spill.record_list()
+    page = 1
+
+    # Pick up after the last page a previous, interrupted run saved for this endpoint (same checkpoint as the requests engine)
+    checkpoint_name = f"rest_{base_url}"
+    checkpoint = checkpoints.load_checkpoint(checkpoint_name)
+    if checkpoint:
+        items.extend(checkpoint['records'])
+        page = checkpoint['position']
+        print(f"Resuming {base_url} from its checkpoint at page {page} after {len(items)} items")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    last_page = None
+    async with aiohttp.ClientSession(headers=headers) as session:
+        # The first page comes alone to read the page count from its Link header; after that up to `concurrency`
+        # pages are fetched at once and taken in page order, so the items and checkpoints match the requests engine
+        window = 1
+        while last_page is None or page <= last_page:
+            pages = list(range(page, page + window if last_page is None else min(page + window, last_page + 1)))
+            api_urls = [f"{base_url}?state=all&page={number}&per_page={PER_PAGE}" for number in pages]
+            responses = await asyncio.gather(*(request(session, semaphore, 'GET', api_url) for api_url in api_urls))
+            for number, api_url, (status, body, response_headers) in zip(pages, api_urls, responses):
+                print(f"Fetching {api_url}")
+                if status != 200:
+                    print(f"Failed to fetch data. Status Code: {status}. Response: {body.decode('utf-8', 'replace')} status_code: {status}")
+                    return items
+                if last_page is None:
+                    last_page = last_page_number(response_headers.get('Link'))
+                data = json.loads(body)
+                if not data:
+                    checkpoints.clear_checkpoint(checkpoint_name)
+                    return items
+                items.extend(data)
+                page = number + 1
+                checkpoints.save_checkpoint(checkpoint_name, page, data)
+                if len(data) < PER_PAGE:
+                    checkpoints.clear_checkpoint(checkpoint_name)
+                    return items
+            window = concurrency
+    checkpoints.clear_checkpoint(checkpoint_name)
+    return items
+
+
+# Function to fetch every page of a REST list endpoint (issues or pulls, all states) with the asyncio engine
+def fetch_all_items(base_url, headers, concurrency=None):
+    return asyncio.run(_fetch_all_items(base_url, headers, concurrency or rest_concurrency()))
+
+
+async def _fetch_json_many(urls, headers, concurrency):
+    import aiohttp
+
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession(headers=headers) as session:
+        # A lookup that still fails after its retries only fails its own URL, not the whole batch
+        responses = await asyncio.gather(*(request(session, semaphore, 'GET', url) for url in urls), return_exceptions=True)
+    results = []
+    for response in responses:
+        if isinstance(response, Exception):
+            results.append((0, None, f"{type(response).__name__}: {response}"))
+            continue
+        status, body, response_headers = response
+        text = body.decode('utf-8', 'replace')
+        results.append((status, json.loads(text) if status == 200 else None, text))
+    return results
+
+
+# Function to GET many JSON resources at once, e.g. one issue per release-note feature.
+# Returns (status, parsed JSON or None, response text) for each URL, in the order of urls;
+# a URL whose connection failed after its retries gets status 0 and the error as its text.
+def fetch_json_many(urls, headers, concurrency=None):
+    urls = list(urls)
+    if not urls:
+        return []
+    return asyncio.run(_fetch_json_many(urls, headers, concurrency or rest_concurrency()))
@@ -0,0 +1,75 @@
+import json
+import os
+import re
+import time
+
+# Directory for pagination checkpoints; FETCH_CHECKPOINTS overrides it (FETCH_CHECKPOINTS=0 turns checkpointing off)
+DEFAULT_CHECKPOINT_DIR = ".fetch_checkpoints"
+
+# Checkpoints older than this many hours are ignored, so a long-abandoned run doesn't resume with stale data
+DEFAULT_MAX_AGE_HOURS = 24
+
+
+# Function to read the checkpoint directory for this run (None when checkpointing is off)
+def checkpoint_dir():
+    path = os.environ.get("FETCH_CHECKPOINTS", DEFAULT_CHECKPOINT_DIR).strip()
+    return None if path in ("", "0") else path
+
+
+# Function to turn a checkpoint name (board or endpoint) into its file path
+def checkpoint_path(name):
+    directory = checkpoint_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_') + ".jsonl")
+
+
+# Function to load a checkpoint: {'position': cursor or page to continue from, 'records': records fetched so far,
+# 'index': the pages' saved indexes merged}, or None. Each line of the file is one fetched page, so a line cut short by a crash is simply dropped.
+def load_checkpoint(name):
+    path = checkpoint_path(name)
+    if path is None or not os.path.exists(path):
+        return None
+    max_age_hours = float(os.environ.get("FETCH_CHECKPOINT_MAX_AGE_HOURS", DEFAULT_MAX_AGE_HOURS))
+    if time.time() - os.path.getmtime(path) > max_age_hours * 3600:
+        print(f"Ignoring checkpoint {path}: older than {max_age_hours:g} hours")
+        clear_checkpoint(name)
+        return None
+    records = []
+    index = {}
+    position = None
+    with open(path, 'r', encoding='utf-8') as checkpoint_file:
+        for line in checkpoint_file:
+            try:
+                page = json.loads(line)
+            except ValueError:
+                break
+            records.extend(page['records'])
+            index.update(page.get('index') or {})
+            position = page['position']
+    if position is None:
+        return None
+    return {'position': position, 'records': records, 'index': index}
+
+
+# Function to append one fetched page and the position after it to a checkpoint;
+# index is an optional side map kept with the page (e.g. project item node id -> issue URL)
+def save_checkpoint(name, position, records, index=None):
+    path = checkpoint_path(name)
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as checkpoint_file:
+        page = {'position': position, 'records': records}
+        if index:
+            page['index'] = index
+        checkpoint_file.write(json.dumps(page) + "\n")
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+
+
+# Function to remove a checkpoint once its board or endpoint has been fetched completely
+def clear_checkpoint(name):
+    path = checkpoint_path(name)
+    if path is not None and os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import shutil
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+import excel_styles
+import report_views
+from xlsxwriter_report import FORMULA_TEMPLATES, LINK_COLUMNS
+
+# Header of the column that flags rows added or changed by the last update
+CHANGE_MARKER_HEADER = "Changed since last run"
+
+# Function to read the previous report to update, e.g. UPDATE_FROM=getProjectsStatusReleaseDefects20240101_120000.xlsx
+def previous_report_path():
+    path = os.environ.get("UPDATE_FROM", "").strip()
+    if path and not os.path.exists(path):
+        raise FileNotFoundError(f"UPDATE_FROM report not found: {path}")
+    return path or None
+
+
+# Function to name the row-hash index kept next to an updated report, e.g. report.xlsx -> report.rows.json
+def index_path(filename):
+    return f"{os.path.splitext(filename)[0]}.rows.json"
+
+
+# Function to turn one stored value into the text its row hash is built from. Whole-number floats hash as ints,
+# since openpyxl reads 3.0 back from a sheet as 3 (e.g. NUMBER project fields, or int columns pandas made float for a None)
+def hash_text(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# Function to hash the stored (non-formula) values of a row so changed records can be found without comparing cell by cell
+def row_hash(values):
+    text = "\x1f".join(hash_text(value) for value in values)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# Function to list the columns whose values come from the fetched records rather than a formula
+def stored_columns(columns):
+    return [index for index, column in enumerate(columns) if column not in FORMULA_TEMPLATES and column not in LINK_COLUMNS]
+
+
+# Function to write one record into a sheet row, re-creating the formula and link cells for that row
+# (the workbook needs excel_styles.register_styles first)
+def write_row(sheet, row_num, columns, record, use_formulas, formulas):
+    url_index = columns.index("URL") if "URL" in columns else None
+    url_letter = get_column_letter(url_index + 1) if url_index is not None else None
+    labels_letter = get_column_letter(columns.index("Labels") + 1) if "Labels" in columns else None
+    for col_num, (column, value) in enumerate(zip(columns, record), 1):
+        if value is not None and not isinstance(value, str) and pd.isna(value):
+            value = None
+        cell = sheet.cell(row=row_num, column=col_num)
+        if column in LINK_COLUMNS and url_letter and (formulas or not excel_styles.link_formulas_enabled()):
+            excel_styles.write_link(cell, record[url_index], f'{url_letter}{row_num}')
+        elif use_formulas and column in FORMULA_TEMPLATES and labels_letter:
+            cell.value = FORMULA_TEMPLATES[column].replace('G2', f'{labels_letter}{row_num}')
+        else:
+            cell.value = value
+
+
+# Function to re-point the formula cells of the rows from first_row down (needed after rows are deleted)
+def _repoint_formulas(sheet, columns, first_row, last_row, use_formulas, formulas):
+    url_letter = get_column_letter(columns.index("URL") + 1) if "URL" in columns else None
+    labels_letter = get_column_letter(columns.index("Labels") + 1) if "Labels" in columns else None
+    for row_num in range(first_row, last_row + 1):
+        for col_num, column in enumerate(columns, 1):
+            if formulas and column in LINK_COLUMNS and url_letter and excel_styles.link_formulas_enabled():
+                sheet.cell(row=row_num, column=col_num).value = report_views.HYPERLINK_FORMULA.replace('B2', f'{url_letter}{row_num}')
+            elif use_formulas and column in FORMULA_TEMPLATES and labels_letter:
+                sheet.cell(row=row_num, column=col_num).value = FORMULA_TEMPLATES[column].replace('G2', f'{labels_letter}{row_num}')
+
+
+# Function to describe a table for the row-hash index: the hash of each record by URL, or for tables without a URL
+# (the Summary pivots) one hash of the whole table
+def table_index(df):
+    columns = list(df.columns)
+    if "URL" not in columns:
+        return {"columns": columns, "hash": row_hash([row_hash(record) for record in df.itertuples(index=False, name=None)])}
+    url_index = columns.index("URL")
+    compare = stored_columns(columns)
+    rows = {}
+    for record in df.itertuples(index=False, name=None):
+        rows.setdefault(record[url_index], row_hash([record[i] for i in compare]))
+    return {"columns": columns, "rows": rows}
+
+
+def _read_index(filename):
+    path = index_path(filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable row index {path}: {e}")
+        return None
+
+
+def _write_index(filename, tables, marked_sheets):
+    with open(index_path(filename), 'w', encoding='utf-8') as index_file:
+        json.dump({"tables": tables, "marked_sheets": sorted(marked_sheets)}, index_file)
+
+
+# Function to write a whole table into a fresh sheet (used for new sheets or sheets whose layout changed).
+# flag marks every row "New"; tables without a URL key (the Summary pivots) are written without the marker column.
+def _rebuild_sheet(workbook, sheet_name, df, use_formulas, formulas, flag=True):
+    index = None
+    if sheet_name in workbook.sheetnames:
+        index = workbook.sheetnames.index(sheet_name)
+        workbook.remove(workbook[sheet_name])
+    sheet = workbook.create_sheet(sheet_name, index)
+    columns = list(df.columns)
+    for col_num, column in enumerate(columns + ([CHANGE_MARKER_HEADER] if flag else []), 1):
+        sheet.cell(row=1, column=col_num, value=column)
+    for row_num, record in enumerate(df.itertuples(index=False, name=None), 2):
+        write_row(sheet, row_num, columns, record, use_formulas, formulas)
+        if flag:
+            sheet.cell(row=row_num, column=len(columns) + 1, value="New")
+    return sheet
+
+
+# Function to tell whether a keyless sheet (e.g. a Summary pivot) already holds exactly the table's values
+def _same_table(sheet, df):
+    rows = list(sheet.iter_rows(values_only=True))
+    if not rows or list(rows[0]) != list(df.columns):
+        return False
+    return table_index(pd.DataFrame(rows[1:], columns=list(df.columns)))["hash"] == table_index(df)["hash"]
+
+
+# Function to apply the changed, added and removed records of one table to its existing sheet
+def _update_sheet(sheet, df, use_formulas, formulas):
+    columns = list(df.columns)
+    url_index = columns.index("URL")
+    compare = stored_columns(columns)
+    headers = [cell.value for cell in sheet[1]]
+    marker_col = headers.index(CHANGE_MARKER_HEADER) + 1 if CHANGE_MARKER_HEADER in headers else len(columns) + 1
+    sheet.cell(row=1, column=marker_col, value=CHANGE_MARKER_HEADER)
+
+    # Index the previous rows by URL with a hash of their stored values; clear last run's markers
+    existing = {}
+    last_data_row = 1
+    for row_num, row in enumerate(sheet.iter_rows(min_row=2, max_col=max(marker_col, len(columns)), values_only=True), 2):
+        if len(row) >= marker_col and row[marker_col - 1]:
+            sheet.cell(row=row_num, column=marker_col).value = None
+        url = row[url_index]
+        if url:
+            last_data_row = row_num
+            existing.setdefault(url, (row_num, row_hash([row[i] for i in compare])))
+
+    changed = added = 0
+    seen = set()
+    new_records = []
+    for record in df.itertuples(index=False, name=None):
+        url = record[url_index]
+        seen.add(url)
+        if url not in existing:
+            new_records.append(record)
+            continue
+        row_num, previous_hash = existing[url]
+        if row_hash([record[i] for i in compare]) != previous_hash:
+            write_row(sheet, row_num, columns, record, use_formulas, formulas)
+            sheet.cell(row=row_num, column=marker_col, value="Changed")
+            changed += 1
+
+    # Delete rows whose records are gone, bottom-up, then re-point the formulas of the rows that moved
+    removed_rows = sorted((row_num for url, (row_num, _) in existing.items() if url not in seen), reverse=True)
+    for row_num in removed_rows:
+        sheet.delete_rows(row_num, 1)
+    last_data_row -= len(removed_rows)
+    if removed_rows:
+        _repoint_formulas(sheet, columns, removed_rows[-1], last_data_row, use_formulas, formulas)
+
+    for record in new_records:
+        last_data_row += 1
+        write_row(sheet, last_data_row, columns, record, use_formulas, formulas)
+        sheet.cell(row=last_data_row, column=marker_col, value="New")
+        added += 1
+
+    return {"changed": changed, "added": added, "removed": len(removed_rows)}
+
+
+# Function to update a previous report with the current tables, touching only the rows and sheets that changed.
+# Board tables are keyed by URL and their changes flagged; tables without a URL (the Summary pivots) are replaced whole,
+# without flags, and only when their values changed. The row-hash index written next to each updated report lets the
+# next update see that nothing changed without opening the workbook, in which case the previous file is just copied.
+# Returns sheet name -> {"changed", "added", "removed", "replaced"} counts.
+def update_report_workbook(previous_filename, tables, output_filename, formulas=True, formula_tables=()):
+    current = {sheet_name: table_index(df) for sheet_name, df in tables.items()}
+    summary = {sheet_name: {"changed": 0, "added": 0, "removed": 0, "replaced": 0} for sheet_name in tables}
+    previous = _read_index(previous_filename)
+    if previous is not None and not previous.get("marked_sheets") and all(previous["tables"].get(sheet_name) == index for sheet_name, index in current.items()):
+        shutil.copyfile(previous_filename, output_filename)
+        _write_index(output_filename, current, [])
+        print(f"No table changed since {previous_filename}; copied it to {output_filename} without rewriting it")
+        return summary
+
+    workbook = excel_styles.register_styles(load_workbook(previous_filename))
+    for sheet_name, df in tables.items():
+        use_formulas = formulas and sheet_name in formula_tables
+        columns = list(df.columns)
+        keyed = "URL" in columns
+        if sheet_name in workbook.sheetnames:
+            sheet = workbook[sheet_name]
+            if keyed and [cell.value for cell in sheet[1]][:len(columns)] == columns:
+                summary[sheet_name].update(_update_sheet(sheet, df, use_formulas, formulas))
+                continue
+            if not keyed and _same_table(sheet, df):
+                continue
+        # New sheet, a sheet whose layout no longer matches the table, or a changed keyless table: write it out in full
+        _rebuild_sheet(workbook, sheet_name, df, use_formulas, formulas, flag=keyed)
+        summary[sheet_name]["added" if keyed else "replaced"] = len(df)
+
+    workbook.active = workbook[workbook.sheetnames[0]]
+    workbook.active.sheet_state = 'visible'
+    for sheet_name in tables:
+        excel_styles.refresh_hyperlinks(workbook[sheet_name])
+    workbook.save(output_filename)
+    _write_index(output_filename, current, [sheet_name for sheet_name, counts in summary.items() if counts["changed"] or counts["added"]])
+
+    # Board deltas first, then the keyless tables that were replaced
+    for sheet_name, counts in summary.items():
+        if counts["changed"] or counts["added"] or counts["removed"]:
+            print(f"{sheet_name}: {counts['changed']} changed, {counts['added']} added, {counts['removed']} removed")
+    replaced = [sheet_name for sheet_name, counts in summary.items() if counts["replaced"]]
+    if replaced:
+        print(f"Replaced {len(replaced)} summary tables whose values changed: {', '.join(replaced)}")
+    return summary
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import pandas as pd
+import output_backends
+import snapshot_store
+
+# Compares the board snapshots kept by getProjectsStatus.py and getProjectsStatusReleaseDefects.py (SNAPSHOT_DIR=1)
+# without fetching anything, e.g.
+#
+#   python diff_snapshots.py                                   (latest two runs)
+#   python diff_snapshots.py snapshots/getProjectsStatus_20240101_120000.parquet snapshots/getProjectsStatus_20240108_120000.parquet
+#   python diff_snapshots.py --fields Status,Pod --output changes.xlsx
+#   python diff_snapshots.py --history --weekly --output burndown.csv
+#
+# A diff lists the items whose fields changed (Transitions) and the items Added and Removed between the two runs;
+# --history counts the items per board and Status in every run instead.
+
+parser = argparse.ArgumentParser(description="Diff two board snapshots, or count items per run for a burn-down")
+parser.add_argument("old", nargs="?", help="older snapshot (default: the second newest run)")
+parser.add_argument("new", nargs="?", help="newer snapshot (default: the newest run)")
+parser.add_argument("--dir", default=None, help=f"snapshot folder (default SNAPSHOT_DIR or {snapshot_store.DEFAULT_SNAPSHOT_DIR})")
+parser.add_argument("--prefix", default=None, help="only use runs of one script, e.g. getProjectsStatus_")
+parser.add_argument("--list", action="store_true", help="list the snapshots and exit")
+parser.add_argument("--fields", default=",".join(snapshot_store.TRACKED_COLUMNS), metavar="COLUMN[,COLUMN]", help="fields to report transitions for")
+parser.add_argument("--history", action="store_true", help="count items per board and --history-field in every run")
+parser.add_argument("--history-field", default="Status", help="field the --history counts are split by")
+parser.add_argument("--weekly", action="store_true", help="with --history, keep only the last run of each week")
+parser.add_argument("--output", help="write the result to a .xlsx (one sheet per table), .csv, .jsonl or .parquet file instead of printing it")
+args = parser.parse_args()
+
+paths = snapshot_store.list_snapshots(args.dir, args.prefix)
+if args.list:
+    for path in paths:
+        print(f"{snapshot_store.snapshot_time(path)}  {path}")
+    print(f"{len(paths)} snapshots")
+    sys.exit(0)
+
+if args.history:
+    tables = {"History": snapshot_store.field_history(paths, field=args.history_field, weekly=args.weekly)}
+else:
+    if args.old and not args.new:
+        parser.error("give both snapshots, or neither to compare the latest two")
+    if not args.old:
+        if len(paths) < 2:
+            print("Need at least two snapshots to diff; run getProjectsStatus.py or getProjectsStatusReleaseDefects.py again")
+            sys.exit(1)
+        args.old, args.new = paths[-2], paths[-1]
+    print(f"Comparing {args.old} with {args.new}")
+    tables = snapshot_store.diff_snapshots(snapshot_store.load_snapshot(args.old), snapshot_store.load_snapshot(args.new),
+                                           fields=[name.strip() for name in args.fields.split(",") if name.strip()])
+
+if args.output:
+    base, extension = os.path.splitext(args.output)
+    extension = extension.lstrip(".").lower()
+    if extension == "xlsx":
+        with pd.ExcelWriter(args.output) as writer:
+            for table_name, df in tables.items():
+                df.to_excel(writer, sheet_name=table_name, index=False)
+        print(f"{', '.join(tables)} written to {args.output}")
+    elif len(tables) == 1:
+        output_backends.write_table(next(iter(tables.values())), args.output, extension)
+        print(f"{next(iter(tables))} written to {args.output}")
+    else:
+        output_backends.write_tables(tables, base, [extension])
+else:
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        for table_name, df in tables.items():
+            print(f"{table_name}: {len(df)} rows")
+            if len(df):
+                print(df.to_string(index=False))
@@ -0,0 +1,126 @@
+import os
+import weakref
+from copy import copy
+
+from openpyxl.styles import Font, NamedStyle
+from openpyxl.styles.cell_style import StyleArray
+
+import report_views
+
+# Named style of every link cell (an issue or pull request number linking to its URL). It is registered once per
+# workbook, so each link cell only stores the style's index instead of its own Font; link columns also carry it as
+# their column-level format.
+LINK_STYLE = "Issue Link"
+
+# Most hyperlinks Excel keeps on one sheet; links past it are written as =HYPERLINK("url", "text") formulas
+MAX_SHEET_URLS = 65530
+
+# Per sheet: native hyperlinks written through set_link (to switch to formulas past MAX_SHEET_URLS) and the columns
+# already given the column-level link format
+_sheet_links = weakref.WeakKeyDictionary()
+
+
+# Function to read whether link columns are written as the older =HYPERLINK(...) formulas (EXCEL_LINKS=formula)
+# instead of native cell hyperlinks showing the issue number (the default)
+def link_formulas_enabled():
+    return os.environ.get("EXCEL_LINKS", "native").strip().lower() == "formula"
+
+
+# Function to add the named styles to a workbook (normal or write-only) unless it already has them, e.g. from a loaded report
+def register_styles(workbook):
+    if LINK_STYLE not in workbook.named_styles:
+        workbook.add_named_style(NamedStyle(name=LINK_STYLE, font=Font(color="0000FF", underline="single")))
+    return workbook
+
+
+# Function to build the formula of a link that can't be a native hyperlink, e.g. =HYPERLINK("https://...", "42")
+def hyperlink_formula(url, text):
+    quoted = [f'"{str(value).replace(chr(34), chr(34) * 2)}"' for value in (url, '' if text is None else text)]
+    return f"=HYPERLINK({quoted[0]}, {quoted[1]})"
+
+
+# Function to give a sheet column the link style as its column-level format, e.g. style_link_column(sheet, 'M').
+# Excel still reads the format of a filled cell from the cell, so link cells keep the (shared) named style too.
+# Write-only sheets need this before their first row is appended.
+def style_link_column(sheet, column_letter):
+    sheet.column_dimensions[column_letter]._style = copy(_link_style_array(sheet.parent))
+
+
+# Function to read the style of the named link style as cells and column dimensions store it
+def _link_style_array(workbook):
+    register_styles(workbook)
+    return workbook._named_styles[LINK_STYLE].as_tuple()
+
+
+def _link_state(sheet):
+    if sheet not in _sheet_links:
+        _sheet_links[sheet] = {'urls': 0, 'columns': set()}
+    return _sheet_links[sheet]
+
+
+# Function to give a link cell the shared link style, and its column the column-level format the first time
+# (WriteOnlyCells have no column yet; their sheets call style_link_column up front)
+def _style_link_cell(cell):
+    cell.style = LINK_STYLE
+    if cell.row is not None:
+        columns = _link_state(cell.parent)['columns']
+        if cell.column_letter not in columns:
+            columns.add(cell.column_letter)
+            style_link_column(cell.parent, cell.column_letter)
+
+
+# Function to make a cell a native hyperlink to url showing text (the issue number from the URL by default).
+# Works for normal cells and WriteOnlyCells; a cell without a URL just gets the text. Past MAX_SHEET_URLS links
+# on the sheet the link is a HYPERLINK formula instead, as Excel drops the extra hyperlinks.
+def set_link(cell, url, text=None):
+    if not isinstance(url, str) or not url:
+        cell.value = text
+        return cell
+    text = report_views.issue_link_text(url) if text is None else text
+    state = _link_state(cell.parent)
+    state['urls'] += 1
+    if state['urls'] > MAX_SHEET_URLS:
+        cell.value = hyperlink_formula(url, text)
+    else:
+        cell.value = text
+        cell.hyperlink = url
+    _style_link_cell(cell)
+    return cell
+
+
+# Function to fill one link cell of a report sheet whose URL sits in url_coordinate (e.g. B2):
+# a native hyperlink, or with EXCEL_LINKS=formula the HYPERLINK formula that reads the URL cell
+def write_link(cell, url, url_coordinate):
+    if link_formulas_enabled():
+        cell.value = report_views.HYPERLINK_FORMULA.replace('B2', url_coordinate)
+        _style_link_cell(cell)
+        return cell
+    return set_link(cell, url)
+
+
+# Function to point every hyperlink of a sheet back at its cell after rows or columns were deleted
+# (openpyxl moves the cells but leaves each hyperlink's reference where it was). Hyperlinks past MAX_SHEET_URLS
+# (e.g. after a delta update added rows) become HYPERLINK formulas, and the column-level link format follows the
+# link cells to the columns they now sit in.
+def refresh_hyperlinks(sheet):
+    links = 0
+    link_columns = set()
+    for row in sheet.iter_rows():
+        for cell in row:
+            if cell.hyperlink is not None:
+                links += 1
+                if links > MAX_SHEET_URLS:
+                    url = cell.hyperlink.target
+                    cell.hyperlink = None
+                    cell.value = hyperlink_formula(url, cell.value)
+                else:
+                    cell.hyperlink.ref = cell.coordinate
+                link_columns.add(cell.column_letter)
+            elif cell.has_style and cell.style == LINK_STYLE:
+                link_columns.add(cell.column_letter)
+    for column_letter, dimension in list(sheet.column_dimensions.items()):
+        if column_letter not in link_columns and dimension.has_style and dimension._style == _link_style_array(sheet.parent):
+            dimension._style = StyleArray()
+    for column_letter in link_columns:
+        style_link_column(sheet, column_letter)
+    _sheet_links[sheet] = {'urls': links, 'columns': link_columns}
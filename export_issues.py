@@ -6,7 +6,14 @@ from openpyxl.styles import Font, Color
 from openpyxl.styles.colors import BLUE
 from datetime import datetime
 import re
+import sys
 import json
+import pandas as pd
+import run_metrics
+import output_backends
+import xlsxwriter_report
+import rest_exports
+import record_spill
 
 # Function to read the GitHub access token from a file
 def read_token_from_file(file_path):
@@ -16,50 +23,15 @@ token_file_path = "C:\\Users\\wquraishi\\Documents\\GitHub-Config\/github_token.
 
 access_token = read_token_from_file(token_file_path)
 
+# Start collecting per-stage timings and request counts for this run
+run_metrics.reset_metrics('export_issues')
+
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
 
-def sanitize_for_excel(text):
-    if not isinstance(text, str):
-        text = str(text)
-    if not text:
-        return text  # or return "" to avoid NoneType issues
-    # Remove HTML tags
-    text = re.sub('<[^<]+?>', ' ', text)
-    # Replace URLs with a simple placeholder or remove them
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[LINK]', text)
-    # Remove or replace other illegal characters as needed
-    # text = text.replace('\n', ' ').replace('\r', '').replace('\t', ' ')
-    # Truncate to avoid Excel cell character limit issues
-    text = (text[:32767]) if len(text) > 32767 else text
-    return text
-
-def fetch_all_items(base_url, headers):
-    items = []
-    page = 1
-    while True:
-        # Construct the full URL with query parameters for each request
-        api_url = f"{base_url}?state=all&page={page}&per_page=100"
-        response = requests.get(api_url, headers=headers)
-        print(f"Fetching {api_url}")  # Debug print to check the constructed URL
-        
-        if response.status_code == 200:
-            data = response.json()
-            if not data:
-                break  # No more data, exit the loop
-            items.extend(data)
-            page += 1
-        else:
-            print(f"Failed to fetch data. Status Code: {response.status_code}. Response: {response.text} status_code: {response.status_code}")
-            break
-    return items
-
-
-
-def get_username_from_string(input_string):
-   #print(f" Input String:= {input_string}")  
-   start_index = input_string.find("'login': '") + len("'login': '")
-   end_index = input_string.find("_kpmg'")
-   input_string = input_string[start_index:end_index]
-   return input_string
 
 def get_created_at_string(input_string):
    #print(f" Input String:= {input_string}")  
@@ -77,69 +49,67 @@ repo_name = "digital-matrix-app"
 
 headers = {"Authorization": f"Bearer {access_token}"}
 
-issues_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues"
-pulls_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls"
+issues_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/issues"
+pulls_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/pulls"
 
 
 # Fetch issues and pull requests with pagination
-issues_data = fetch_all_items(issues_url, headers)
+with run_metrics.stage("fetch:issues"):
+    issues_data = rest_exports.fetch_all_items(issues_url, headers)
+run_metrics.record_rows("fetch:issues", len(issues_data))
 
 #print(json.dumps(issues_data, indent=4))
 #pulls_data = fetch_all_items(pulls_url, headers)
 
 # The rest of your script remains the same...
 
-# Create an Excel workbook
-wb = Workbook()
-sheet = wb.active
-sheet.title = "Issues for Digital-Matrix-App"
-# Set header row font to bold...
-# Continue as before.
-
-# Write the header row
-header_row = ["Number", "Type", "Title", "Body", "Reporter (User)","Created dt","Assignees", "Labels", "Milestone", "State"]
-for col_num, header in enumerate(header_row, 1):
-    col_letter = get_column_letter(col_num)
-    sheet[f"{col_letter}1"] = header
-
-# Write issues data to the Excel file
-for row_num, issue in enumerate(issues_data, 2):
-    issue_number = issue["number"]
-    issue_type = "Issue"
-    issue_title = issue["title"]
-    #issue_body = issue["body"]
-    issue_body = sanitize_for_excel(issue["body"])
-    issue_user = sanitize_for_excel(issue["user"])
-    issue_createdt = issue["created_at"]
-    issue_assignees = ",".join(assignee["login"] for assignee in issue["assignees"])
-    issue_labels = ",".join(label["name"] for label in issue["labels"])
-    issue_milestone = issue["milestone"]["title"] if issue["milestone"] else ""
-    issue_state = issue["state"]
-    issue_url = issue["html_url"]
-    #issue_project = issue["Projects"]
-    #issue_chargecode = issue["Charge Code"]
-    #issue_project = issue["project_url"]
-    #issue_iteration = issue["iteration"]
-#try:  
-    cell = f"A{row_num}"
-    sheet[cell].hyperlink = f'{issue_url}'
-    sheet[cell].value = issue_number
-    sheet[cell].font = Font(color=Color(rgb=BLUE))
-    sheet[f"B{row_num}"] = issue_type
-    sheet[f"C{row_num}"] = issue_title
-    #Commented due to IllegalCharacterError
-    sheet[f"D{row_num}"] = issue_body
-    sheet[f"E{row_num}"] = get_username_from_string(issue_user)
-    sheet[f"F{row_num}"] = issue_createdt
-    sheet[f"G{row_num}"] = issue_assignees
-    sheet[f"H{row_num}"] = issue_labels
-    sheet[f"I{row_num}"] = issue_milestone
-    sheet[f"J{row_num}"] = issue_state
-    #sheet[f"J{row_num}"] = issue_project
-    #sheet[f"K{row_num}"] = issue_chargecode
-#except Exception as e:
-    # Catch any exception
-#    print(f"An error occurred: {e}")
+# Generate output filename with current datetime suffix
+current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+output_base = f"Issues_{current_datetime}"
+output_filename = f"{output_base}.xlsx"
+
+sheet_title = "Issues for Digital-Matrix-App"
+header_row = rest_exports.ISSUE_COLUMNS
+
+# Bounded-memory mode (MEMORY_BUDGET_MB): stream the spilled issues into every output instead of building the rows in memory
+if record_spill.bounded_mode():
+    def issue_entries():
+        return (rest_exports.issue_row(issue) for issue in issues_data)
+
+    with run_metrics.stage("write:streamed"):
+        rest_exports.write_streamed_outputs({sheet_title: (header_row, issue_entries)}, output_base, output_formats)
+    run_metrics.record_rows("write:streamed", len(issues_data))
+    run_metrics.write_metrics(output_filename)
+    sys.exit(0)
+
+# Build one row per issue in header_row order; the URL is kept alongside for the Number hyperlink
+issue_rows = []
+issue_urls = []
+for issue in issues_data:
+    issue_row, issue_url = rest_exports.issue_row(issue)
+    issue_rows.append(issue_row)
+    issue_urls.append(issue_url)
+
+# Columnar outputs use the same columns as the Excel sheet
+issues_df = pd.DataFrame(issue_rows, columns=header_row)
+if any(output_format != 'xlsx' for output_format in output_formats):
+    with run_metrics.stage("write:columnar"):
+        output_backends.write_tables({sheet_title: issues_df}, output_base, output_formats)
+
+if 'xlsx' in output_formats and excel_engine == 'xlsxwriter':
+    # Stream the sheet in one pass; the Number column links to each item's URL
+    with run_metrics.stage("write:workbook (xlsxwriter)"):
+        xlsxwriter_report.write_report_workbook({sheet_title: issues_df}, output_filename, links={sheet_title: {"Number": issue_urls}})
+    run_metrics.record_rows("write:workbook (xlsxwriter)", len(issues_df))
+elif 'xlsx' in output_formats:
+    # Create an Excel workbook
+    run_metrics.begin_stage("write:workbook")
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = sheet_title
+
+    # Write the header row and the issues, with Number linked to each issue
+    rest_exports.write_rows_sheet(sheet, header_row, issue_rows, issue_urls)
 
 # Write pull requests data to the Excel file
 #for pull_num, pull in enumerate(pulls_data, row_num + 1):
@@ -172,22 +142,16 @@ for row_num, issue in enumerate(issues_data, 2):
     ## Catch any exception
 ##    print(f"An error occurred: {e}")    
 
-# Adjust column widths
-for col in sheet.columns:
-    max_length = 0
-    for cell in col:
-        if cell.value:
-            max_length = max(max_length, len(str(cell.value)))
-    adjusted_width = (max_length + 2) * 1.2
-    sheet.column_dimensions[col[0].column_letter].width = adjusted_width
-
 # Save the workbook as an Excel file
 if issues_data :
     print("Data fetched, writing to Excel...")
 else:
     print("No data fetched, please check the fetch logic.")
 
-# Generate output filename with current datetime suffix
-current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f"Issues_{current_datetime}.xlsx"
-wb.save(output_filename)
+if 'xlsx' in output_formats and excel_engine == 'openpyxl':
+    wb.save(output_filename)
+    run_metrics.record_rows("write:workbook", len(issues_data))
+    run_metrics.end_stage()
+
+# Write the run metrics next to the output workbook
+run_metrics.write_metrics(output_filename)
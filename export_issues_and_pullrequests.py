@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from openpyxl import Workbook
+from datetime import datetime
+import sys
+import pandas as pd
+import run_metrics
+import output_backends
+import xlsxwriter_report
+import rest_exports
+import pull_enrichment
+import record_spill
+
+# Function to read the GitHub access token from a file
+def read_token_from_file(file_path):
+    with open(file_path, 'r') as file:
+        return file.read().strip()
+token_file_path = "C:\\Users\\wquraishi\\Documents\\GitHub-Config\/github_token.txt"
+access_token = read_token_from_file(token_file_path)
+
+# Start collecting per-stage timings and request counts for this run
+run_metrics.reset_metrics('export_issues_and_pullrequests')
+
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
+
+# Function to fetch one REST list endpoint inside its own metrics stage (runs on a worker thread)
+def fetch_stage(stage_name, url, headers):
+    with run_metrics.stage(stage_name):
+        items = rest_exports.fetch_all_items(url, headers)
+    run_metrics.record_rows(stage_name, len(items))
+    return items
+
+#kpmg-global-technology-and-knowledge/digital-matrix-app
+repo_owner = "kpmg-global-technology-and-knowledge"
+repo_name = "digital-matrix-app"
+
+headers = {"Authorization": f"Bearer {access_token}"}
+
+issues_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/issues"
+pulls_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/pulls"
+
+# Fetch issues and pull requests at the same time; the two pagination chains are independent
+with ThreadPoolExecutor(max_workers=2) as executor:
+    issues_future = executor.submit(fetch_stage, "fetch:issues", issues_url, headers)
+    pulls_future = executor.submit(fetch_stage, "fetch:pulls", pulls_url, headers)
+    issues_data = issues_future.result()
+    pulls_data = pulls_future.result()
+
+# The issues endpoint also returns every pull request; those rows come from the pulls endpoint instead
+# (in the bounded-memory mode the spilled issues stay on disk and the pull requests are skipped as they stream back)
+issue_count = len(issues_data)
+if record_spill.bounded_mode():
+    issue_total = sum(1 for issue in issues_data if not rest_exports.is_pull_request(issue))
+else:
+    issues_data = [issue for issue in issues_data if not rest_exports.is_pull_request(issue)]
+    issue_total = len(issues_data)
+print(f"Fetched {issue_total} issues ({issue_count - issue_total} pull request entries skipped) and {len(pulls_data)} pull requests")
+
+# Generate output filename with current datetime suffix
+current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+output_base = f"Issues_and_Pull_requests_{current_datetime}"
+output_filename = f"{output_base}.xlsx"
+
+# Bounded-memory mode (MEMORY_BUDGET_MB): stream both sheets from the spilled items into every output and stop here
+if record_spill.bounded_mode():
+    enrichment = None
+    pull_header = rest_exports.PULL_COLUMNS
+    if pull_enrichment.enrichment_enabled():
+        with run_metrics.stage("enrich:pulls"):
+            enrichment = pull_enrichment.fetch_pull_enrichment(repo_owner, repo_name, [pull["number"] for pull in pulls_data], headers)
+        run_metrics.record_rows("enrich:pulls", len(enrichment))
+        pull_header = pull_header + pull_enrichment.ENRICHMENT_COLUMNS
+
+    def issue_entries():
+        return (rest_exports.issue_row(issue) for issue in issues_data if not rest_exports.is_pull_request(issue))
+
+    def pull_entries():
+        for pull in pulls_data:
+            pull_row, pull_url = rest_exports.pull_row(pull)
+            if enrichment is not None:
+                pull_row = pull_enrichment.enrich_rows([pull_row], enrichment)[0]
+            yield pull_row, pull_url
+
+    streamed_sheets = {
+        "Issues": (rest_exports.ISSUE_COLUMNS, issue_entries),
+        "Pull Requests": (pull_header, pull_entries),
+    }
+    with run_metrics.stage("write:streamed"):
+        rest_exports.write_streamed_outputs(streamed_sheets, output_base, output_formats)
+    run_metrics.record_rows("write:streamed", issue_total + len(pulls_data))
+    run_metrics.write_metrics(output_filename)
+    sys.exit(0)
+
+pull_header = rest_exports.PULL_COLUMNS
+pull_entries = [rest_exports.pull_row(pull) for pull in pulls_data]
+
+# Add reviews, commit counts, changed lines and merge timing through batched GraphQL lookups (PULL_ENRICHMENT=0 skips this)
+if pull_enrichment.enrichment_enabled():
+    with run_metrics.stage("enrich:pulls"):
+        enrichment = pull_enrichment.fetch_pull_enrichment(repo_owner, repo_name, [pull["number"] for pull in pulls_data], headers)
+    run_metrics.record_rows("enrich:pulls", len(enrichment))
+    pull_header = pull_header + pull_enrichment.ENRICHMENT_COLUMNS
+    enriched_rows = pull_enrichment.enrich_rows([row for row, url in pull_entries], enrichment)
+    pull_entries = [(row, url) for row, (_, url) in zip(enriched_rows, pull_entries)]
+
+# One sheet per item type, each with its own column layout; the URL is kept alongside for the Number hyperlink
+sheets = {
+    "Issues": (rest_exports.ISSUE_COLUMNS, [rest_exports.issue_row(issue) for issue in issues_data]),
+    "Pull Requests": (pull_header, pull_entries),
+}
+tables = {}
+links = {}
+for sheet_title, (header_row, rows) in sheets.items():
+    tables[sheet_title] = pd.DataFrame([row for row, url in rows], columns=header_row)
+    links[sheet_title] = {"Number": [url for row, url in rows]}
+
+# Columnar outputs use the same columns as the Excel sheets
+if any(output_format != 'xlsx' for output_format in output_formats):
+    with run_metrics.stage("write:columnar"):
+        output_backends.write_tables(tables, output_base, output_formats)
+
+if 'xlsx' in output_formats and excel_engine == 'xlsxwriter':
+    # Stream both sheets in one pass; the Number column links to each item's URL
+    with run_metrics.stage("write:workbook (xlsxwriter)"):
+        xlsxwriter_report.write_report_workbook(tables, output_filename, links=links)
+    run_metrics.record_rows("write:workbook (xlsxwriter)", sum(len(df) for df in tables.values()))
+elif 'xlsx' in output_formats:
+    with run_metrics.stage("write:workbook"):
+        wb = Workbook()
+        wb.remove(wb.active)
+        for sheet_title, (header_row, rows) in sheets.items():
+            sheet = wb.create_sheet(sheet_title)
+            rest_exports.write_rows_sheet(sheet, header_row, [row for row, url in rows], [url for row, url in rows])
+        wb.save(output_filename)
+    run_metrics.record_rows("write:workbook", sum(len(df) for df in tables.values()))
+    print(f"Data written to {output_filename}")
+
+# Write the run metrics next to the output workbook
+run_metrics.write_metrics(output_filename)
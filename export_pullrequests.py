@@ -6,7 +6,15 @@ from openpyxl.styles import Font, Color
 from openpyxl.styles.colors import BLUE
 from datetime import datetime
 import re
+import sys
 import json
+import pandas as pd
+import run_metrics
+import output_backends
+import xlsxwriter_report
+import rest_exports
+import pull_enrichment
+import record_spill
 
 # Function to read the GitHub access token from a file
 def read_token_from_file(file_path):
@@ -15,47 +23,15 @@ def read_token_from_file(file_path):
 token_file_path = "C:\\Users\\wquraishi\\Documents\\GitHub-Config\/github_token.txt"
 access_token = read_token_from_file(token_file_path)
 
+# Start collecting per-stage timings and request counts for this run
+run_metrics.reset_metrics('export_pullrequests')
+
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
 
-def sanitize_for_excel(text):
-    if not isinstance(text, str):
-        text = str(text)
-    if not text:
-        return text  # or return "" to avoid NoneType issues
-    # Remove HTML tags
-    text = re.sub('<[^<]+?>', ' ', text)
-    # Replace URLs with a simple placeholder or remove them
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[LINK]', text)
-    # Remove or replace other illegal characters as needed
-    text = text.replace('\n', ' ').replace('\r', '').replace('\t', ' ')
-    # Truncate to avoid Excel cell character limit issues
-    text = (text[:32767]) if len(text) > 32767 else text
-    return text
-
-def fetch_all_items(base_url, headers):
-    items = []
-    page = 1
-    while True:
-        # Construct the full URL with query parameters for each request
-        api_url = f"{base_url}?state=all&page={page}&per_page=100"
-        response = requests.get(api_url, headers=headers)
-        print(f"Fetching {api_url}")  # Debug print to check the constructed URL
-        
-        if response.status_code == 200:
-            data = response.json()
-            if not data:
-                break  # No more data, exit the loop
-            items.extend(data)
-            page += 1
-        else:
-            print(f"Failed to fetch data. Status Code: {response.status_code}. Response: {response.text} status_code: {response.status_code}")
-            break
-    return items
-
-def get_username_from_string(input_string):
-   start_index = input_string.find("'login': '") + len("'login': '")
-   end_index = input_string.find("_kpmg'")
-   input_string = input_string[start_index:end_index]
-   return input_string
 
 #kpmg-global-technology-and-knowledge/digital-matrix-app
 repo_owner = "kpmg-global-technology-and-knowledge"
@@ -65,67 +41,83 @@ repo_name = "digital-matrix-app"
 
 headers = {"Authorization": f"Bearer {access_token}"}
 
-issues_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues"
-pulls_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/pulls"
+issues_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/issues"
+pulls_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/pulls"
 
 # Fetch issues and pull requests with pagination
 #issues_data = fetch_all_items(issues_url, headers)
-pulls_data = fetch_all_items(pulls_url, headers)
+with run_metrics.stage("fetch:pulls"):
+    pulls_data = rest_exports.fetch_all_items(pulls_url, headers)
+run_metrics.record_rows("fetch:pulls", len(pulls_data))
 
 # The rest of your script remains the same...
 
-# Create an Excel workbook
-wb = Workbook()
-sheet = wb.active
-sheet.title = "Pull R. for digital-matrix-app"
-# Set header row font to bold ...
-# Continue as before.
-
-# Write the header row
-header_row = ["Number", "Type", "Title", "Body", "Reporter (User)", "Labels","Milestone","State", "Reviewers", "Committers"]
-for col_num, header in enumerate(header_row, 1):
-    col_letter = get_column_letter(col_num)
-    sheet[f"{col_letter}1"] = header
-
-# Write pull requests data to the Excel file
-for pull_num, pull in enumerate(pulls_data, 2):
-    pull_number = pull["number"]
-    pull_type = "Pull Request"
-    pull_title = sanitize_for_excel(pull["title"])
-    pull_body = pull["body"]
-    pull_assignees = ",".join(assignee["login"] for assignee in pull["assignees"])
-    pull_labels = ",".join(label["name"] for label in pull["labels"])
-    pull_milestone = pull["milestone"]["title"] if pull["milestone"] else ""
-    pull_state = pull["state"]
-    pull_url = pull["html_url"]
-    pull_reviewers = ",".join(reviewer["login"] for reviewer in pull["requested_reviewers"])
-    pull_committers = pull["user"]["login"]
-#try:
-    cell = f"A{pull_num}"
-    sheet[cell].hyperlink = f'{pull_url}'
-    sheet[cell].value = pull_number
-    sheet[cell].font = Font(color=Color(rgb=BLUE))
-    sheet[f"B{pull_num}"] = pull_type
-    sheet[f"C{pull_num}"] = pull_title
-    sheet[f"D{pull_num}"] = pull_body
-    sheet[f"E{pull_num}"] = pull_assignees
-    sheet[f"F{pull_num}"] = pull_labels
-    sheet[f"G{pull_num}"] = pull_milestone
-    sheet[f"H{pull_num}"] = pull_state
-    sheet[f"I{pull_num}"] = pull_reviewers
-    sheet[f"J{pull_num}"] = pull_committers
-#except Exception as e:
-    # Catch any exception
-#    print(f"An error occurred: {e}")    
-
-# Adjust column widths
-for col in sheet.columns:
-    max_length = 0
-    for cell in col:
-        if cell.value:
-            max_length = max(max_length, len(str(cell.value)))
-    adjusted_width = (max_length + 2) * 1.2
-    sheet.column_dimensions[col[0].column_letter].width = adjusted_width
+# Generate output filename with current datetime suffix
+current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+output_base = f"Pull_requests_{current_datetime}"
+output_filename = f"{output_base}.xlsx"
+
+sheet_title = "Pull R. for digital-matrix-app"
+header_row = rest_exports.PULL_COLUMNS
+
+# Bounded-memory mode (MEMORY_BUDGET_MB): stream the spilled pull requests into every output, enriching one row at a time
+if record_spill.bounded_mode():
+    enrichment = None
+    if pull_enrichment.enrichment_enabled():
+        with run_metrics.stage("enrich:pulls"):
+            enrichment = pull_enrichment.fetch_pull_enrichment(repo_owner, repo_name, [pull["number"] for pull in pulls_data], headers)
+        run_metrics.record_rows("enrich:pulls", len(enrichment))
+        header_row = header_row + pull_enrichment.ENRICHMENT_COLUMNS
+
+    def pull_entries():
+        for pull in pulls_data:
+            pull_row, pull_url = rest_exports.pull_row(pull)
+            if enrichment is not None:
+                pull_row = pull_enrichment.enrich_rows([pull_row], enrichment)[0]
+            yield pull_row, pull_url
+
+    with run_metrics.stage("write:streamed"):
+        rest_exports.write_streamed_outputs({sheet_title: (header_row, pull_entries)}, output_base, output_formats)
+    run_metrics.record_rows("write:streamed", len(pulls_data))
+    run_metrics.write_metrics(output_filename)
+    sys.exit(0)
+
+# Build one row per pull request in header_row order; the URL is kept alongside for the Number hyperlink
+pull_rows = []
+pull_urls = []
+for pull in pulls_data:
+    pull_row, pull_url = rest_exports.pull_row(pull)
+    pull_rows.append(pull_row)
+    pull_urls.append(pull_url)
+
+# Add reviews, commit counts, changed lines and merge timing through batched GraphQL lookups (PULL_ENRICHMENT=0 skips this)
+if pull_enrichment.enrichment_enabled():
+    with run_metrics.stage("enrich:pulls"):
+        enrichment = pull_enrichment.fetch_pull_enrichment(repo_owner, repo_name, [pull["number"] for pull in pulls_data], headers)
+    run_metrics.record_rows("enrich:pulls", len(enrichment))
+    header_row = header_row + pull_enrichment.ENRICHMENT_COLUMNS
+    pull_rows = pull_enrichment.enrich_rows(pull_rows, enrichment)
+
+# Columnar outputs use the same columns as the Excel sheet
+pulls_df = pd.DataFrame(pull_rows, columns=header_row)
+if any(output_format != 'xlsx' for output_format in output_formats):
+    with run_metrics.stage("write:columnar"):
+        output_backends.write_tables({sheet_title: pulls_df}, output_base, output_formats)
+
+if 'xlsx' in output_formats and excel_engine == 'xlsxwriter':
+    # Stream the sheet in one pass; the Number column links to each item's URL
+    with run_metrics.stage("write:workbook (xlsxwriter)"):
+        xlsxwriter_report.write_report_workbook({sheet_title: pulls_df}, output_filename, links={sheet_title: {"Number": pull_urls}})
+    run_metrics.record_rows("write:workbook (xlsxwriter)", len(pulls_df))
+elif 'xlsx' in output_formats:
+    # Create an Excel workbook
+    run_metrics.begin_stage("write:workbook")
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = sheet_title
+
+    # Write the header row and the pull requests, with Number linked to each pull request
+    rest_exports.write_rows_sheet(sheet, header_row, pull_rows, pull_urls)
 
 # Save the workbook as an Excel file
 if pulls_data:
@@ -133,7 +125,10 @@ if pulls_data:
 else:
     print("No data fetched, please check the fetch logic.")
 
-# Generate output filename with current datetime suffix
-current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f"Pull_requests_{current_datetime}.xlsx"
-wb.save(output_filename)
+if 'xlsx' in output_formats and excel_engine == 'openpyxl':
+    wb.save(output_filename)
+    run_metrics.record_rows("write:workbook", len(pulls_data))
+    run_metrics.end_stage()
+
+# Write the run metrics next to the output workbook
+run_metrics.write_metrics(output_filename)
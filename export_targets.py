@@ -0,0 +1,224 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openpyxl import Workbook
+from datetime import datetime
+import json
+import os
+import sys
+import pandas as pd
+import run_metrics
+import output_backends
+import xlsxwriter_report
+import rest_exports
+import pull_enrichment
+import project_fetch
+import report_views
+import excel_styles
+
+# Runs the issue, pull request and project board exports for many targets listed in a JSON config file:
+#
+#   {
+#     "max_workers": 6,
+#     "output": "combined",
+#     "repos": ["kpmg-global-technology-and-knowledge/digital-matrix-app"],
+#     "projects": [{"org": "kpmg-global-technology-and-knowledge", "number": 12, "title": "Workbench Program Status"}]
+#   }
+#
+# Every fetch runs on one shared worker pool, so max_workers caps the requests in flight across all targets.
+# With REST_ENGINE=async a worker keeps several requests in flight; those share one pool of REST_CONCURRENCY slots
+# per API host across all workers, so the host never sees more than that at once.
+# "output": "combined" writes one workbook with a Repo/Org column; "per_target" writes one workbook per target.
+# Usage: python export_targets.py targets.json (or TARGETS_CONFIG=targets.json)
+
+# Requests in flight at once across every target when the config doesn't say
+DEFAULT_MAX_WORKERS = 6
+
+# Function to read the token from a file
+def read_token_from_file(file_path):
+    with open(file_path, 'r') as file:
+        return file.read().strip()
+
+# Path to the token file
+token_file_path = 'github_token.txt'
+
+# Read the token from the file
+token = read_token_from_file(token_file_path)
+
+# Function to read the targets config: repositories as "owner/name", projects as org, number and an optional title
+def load_targets(config_path):
+    with open(config_path, 'r', encoding='utf-8') as config_file:
+        config = json.load(config_file)
+    repos = []
+    for target in config.get('repos', []):
+        owner, _, name = target.partition('/')
+        if not owner or not name:
+            raise ValueError(f"Repository targets must look like owner/name: {target}")
+        repos.append((owner, name))
+    projects = []
+    for target in config.get('projects', []):
+        org = target.get('org', project_fetch.DEFAULT_ORG)
+        number = int(target['number'])
+        projects.append((org, number, target.get('title') or f"Project {number}"))
+    max_workers = int(os.environ.get('TARGETS_MAX_WORKERS', config.get('max_workers', DEFAULT_MAX_WORKERS)))
+    output_mode = config.get('output', 'combined')
+    if output_mode not in ('combined', 'per_target'):
+        raise ValueError(f"Unsupported output {output_mode}; choose combined or per_target")
+    return repos, projects, max(1, max_workers), output_mode
+
+# Function to fetch the issues of one repository as sheet rows, leaving out the pull requests /issues also returns
+def fetch_issue_rows(owner, name):
+    stage_name = f"fetch:issues {owner}/{name}"
+    with run_metrics.stage(stage_name):
+        items = rest_exports.fetch_all_items(f"{run_metrics.github_api_url()}/repos/{owner}/{name}/issues", headers)
+    issues = [item for item in items if not rest_exports.is_pull_request(item)]
+    run_metrics.record_rows(stage_name, len(issues))
+    return [rest_exports.issue_row(issue) for issue in issues]
+
+# Function to fetch the pull requests of one repository as sheet rows, enriched when PULL_ENRICHMENT is on
+def fetch_pull_rows(owner, name):
+    stage_name = f"fetch:pulls {owner}/{name}"
+    with run_metrics.stage(stage_name):
+        pulls = rest_exports.fetch_all_items(f"{run_metrics.github_api_url()}/repos/{owner}/{name}/pulls", headers)
+    run_metrics.record_rows(stage_name, len(pulls))
+    entries = [rest_exports.pull_row(pull) for pull in pulls]
+    if enrich_pulls:
+        with run_metrics.stage(f"enrich:pulls {owner}/{name}"):
+            enrichment = pull_enrichment.fetch_pull_enrichment(owner, name, [pull["number"] for pull in pulls], headers)
+        run_metrics.record_rows(f"enrich:pulls {owner}/{name}", len(enrichment))
+        enriched_rows = pull_enrichment.enrich_rows([row for row, url in entries], enrichment)
+        entries = [(row, url) for row, (_, url) in zip(enriched_rows, entries)]
+    return entries
+
+# Function to fetch one project board as a board view (fetched columns plus the derived label columns)
+def fetch_project_view(org, number, title):
+    stage_name = f"fetch:{org}/{title}"
+    with run_metrics.stage(stage_name):
+        issues = project_fetch.fetch_project_items(number, token, org=org, extra_fields=project_fetch.resolve_extra_fields(token, org, [number]))
+    run_metrics.record_rows(stage_name, len(issues))
+    return report_views.build_board_view(pd.DataFrame(issues), title[:31])
+
+# Function to turn (row, url) entries into a DataFrame and the URL list for the Number hyperlinks
+def entries_table(entries, columns):
+    return pd.DataFrame([row for row, url in entries], columns=columns), [url for row, url in entries]
+
+# Function to make the link columns of a board view (e.g. "GitHub Link ") hyperlinks to each row's URL in an openpyxl sheet,
+# as the xlsxwriter engine writes them
+def link_board_columns(sheet, df):
+    columns = list(df.columns)
+    if "URL" not in columns:
+        return
+    for column in xlsxwriter_report.LINK_COLUMNS:
+        if column not in columns:
+            continue
+        col_num = columns.index(column) + 1
+        for row_num, (url, value) in enumerate(zip(df["URL"], df[column]), 2):
+            text = '' if value is None or pd.isna(value) else str(value)
+            excel_styles.set_link(sheet.cell(row=row_num, column=col_num), url, text)
+
+# Function to write a set of tables to the selected outputs under one base name
+def write_outputs(tables, links, output_base):
+    if any(output_format != 'xlsx' for output_format in output_formats):
+        output_backends.write_tables(tables, output_base, output_formats)
+    if 'xlsx' not in output_formats:
+        return
+    output_filename = f"{output_base}.xlsx"
+    if excel_engine == 'xlsxwriter':
+        xlsxwriter_report.write_report_workbook(tables, output_filename, formulas=False, links=links)
+    else:
+        wb = Workbook()
+        wb.remove(wb.active)
+        for sheet_title, df in tables.items():
+            sheet = wb.create_sheet(sheet_title[:31])
+            values = df.astype(object).where(df.notna(), None)
+            rest_exports.write_rows_sheet(sheet, list(df.columns), values.values.tolist(), links.get(sheet_title, {}).get("Number"))
+            link_board_columns(sheet, df)
+        wb.save(output_filename)
+    print(f"Data written to {output_filename}")
+
+config_path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get('TARGETS_CONFIG', 'targets.json')
+repos, projects, max_workers, output_mode = load_targets(config_path)
+
+# Start collecting per-stage timings and request counts for this run
+run_metrics.reset_metrics('export_targets')
+
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
+
+enrich_pulls = pull_enrichment.enrichment_enabled()
+pull_columns = rest_exports.PULL_COLUMNS + (pull_enrichment.ENRICHMENT_COLUMNS if enrich_pulls else [])
+
+headers = {"Authorization": f"Bearer {token}"}
+
+# Every target's fetches go on one pool; a target that fails is reported and left out of the output
+print(f"Fetching {len(repos)} repositories and {len(projects)} projects with up to {max_workers} requests in flight")
+results = {}
+with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    futures = {}
+    for owner, name in repos:
+        futures[executor.submit(fetch_issue_rows, owner, name)] = ('issues', f"{owner}/{name}")
+        futures[executor.submit(fetch_pull_rows, owner, name)] = ('pulls', f"{owner}/{name}")
+    for org, number, title in projects:
+        futures[executor.submit(fetch_project_view, org, number, title)] = ('project', f"{org}/{number}")
+    for future in as_completed(futures):
+        kind, target = futures[future]
+        try:
+            results[(kind, target)] = future.result()
+        except Exception as e:
+            print(f"Failed to fetch {kind} for {target}: {e}")
+
+current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+output_base = f"Targets_{current_datetime}"
+
+with run_metrics.stage("write:outputs"):
+    if output_mode == 'combined':
+        # One table per item type across every target, with the target in a Repo/Org column
+        issue_tables, issue_urls, pull_tables, pull_urls, project_tables = [], [], [], [], []
+        for owner, name in repos:
+            target = f"{owner}/{name}"
+            if ('issues', target) in results:
+                df, urls = entries_table(results[('issues', target)], rest_exports.ISSUE_COLUMNS)
+                issue_tables.append(df.assign(Repo=target))
+                issue_urls.extend(urls)
+            if ('pulls', target) in results:
+                df, urls = entries_table(results[('pulls', target)], pull_columns)
+                pull_tables.append(df.assign(Repo=target))
+                pull_urls.extend(urls)
+        for org, number, title in projects:
+            if ('project', f"{org}/{number}") in results:
+                project_tables.append(results[('project', f"{org}/{number}")].assign(Org=org))
+
+        tables = {}
+        links = {}
+        if repos:
+            tables["Issues"] = pd.concat(issue_tables, ignore_index=True) if issue_tables else pd.DataFrame(columns=rest_exports.ISSUE_COLUMNS + ["Repo"])
+            tables["Pull Requests"] = pd.concat(pull_tables, ignore_index=True) if pull_tables else pd.DataFrame(columns=pull_columns + ["Repo"])
+            links = {"Issues": {"Number": issue_urls}, "Pull Requests": {"Number": pull_urls}}
+        if projects:
+            tables["Project Items"] = pd.concat(project_tables, ignore_index=True) if project_tables else pd.DataFrame(columns=report_views.BOARD_COLUMNS + ["Org"])
+        write_outputs(tables, links, output_base)
+        run_metrics.record_rows("write:outputs", sum(len(df) for df in tables.values()))
+    else:
+        # One output per repository (Issues and Pull Requests sheets) and per project board
+        for owner, name in repos:
+            target = f"{owner}/{name}"
+            if ('issues', target) not in results or ('pulls', target) not in results:
+                continue
+            issues_df, issue_urls = entries_table(results[('issues', target)], rest_exports.ISSUE_COLUMNS)
+            pulls_df, pull_urls = entries_table(results[('pulls', target)], pull_columns)
+            write_outputs({"Issues": issues_df, "Pull Requests": pulls_df}, {"Issues": {"Number": issue_urls}, "Pull Requests": {"Number": pull_urls}}, f"{owner}_{name}_{current_datetime}")
+            run_metrics.record_rows("write:outputs", len(issues_df) + len(pulls_df))
+        for org, number, title in projects:
+            if ('project', f"{org}/{number}") not in results:
+                continue
+            board = results[('project', f"{org}/{number}")]
+            write_outputs({title[:31]: board}, {}, f"{org}_project{number}_{current_datetime}")
+            run_metrics.record_rows("write:outputs", len(board))
+
+failed = len(futures) - len(results)
+if failed:
+    print(f"{failed} of {len(futures)} fetches failed; see the messages above")
+
+# Write the run metrics for the whole run
+run_metrics.write_metrics(f"{output_base}.xlsx")
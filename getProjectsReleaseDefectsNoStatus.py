@@ -1,11 +1,24 @@
 import subprocess
 import json
+import sys
+import time
 from datetime import datetime
 import pandas as pd
 import re
 import requests
 from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Font
+import run_metrics
+import project_fetch
+import issue_bodies
+import release_notes
+import report_views
+import excel_styles
+import output_backends
+import xlsxwriter_report
+import delta_update
+
+# Start collecting per-stage timings, request counts and rate-limit cost for this run
+run_metrics.reset_metrics('getProjectsReleaseDefectsNoStatus')
 
 # Function to read the token from a file
 def read_token_from_file(file_path):
@@ -29,12 +42,30 @@ project_mapping = {
 # Shortened sheet names to fit Excel's 31-character limit
 shortened_project_mapping = {number: title[:31] for number, title in project_mapping.items()}
 
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the single-pass constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
+
+# Previous report to update instead of rebuilding every row, e.g. UPDATE_FROM=<earlier report>.xlsx
+update_from = delta_update.previous_report_path()
+
+# Markdown file for the release notes
+md_filename = "Release_Notes.md"
+
 # Initialize a dictionary to hold DataFrames for each project
 project_dataframes = {}
 
 # Query template for fetching project issues
 query_template = '''
 {
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
   organization(login: "kpmg-global-technology-and-knowledge") {
     projectV2(number: %d) {
       items(first: 100, after: "%s") {
@@ -56,6 +87,10 @@ query_template = '''
                 login
               }
               labels(first: 10) {
+                pageInfo {
+                  endCursor
+                  hasNextPage
+                }
                 nodes {
                   name
                 }
@@ -71,6 +106,72 @@ query_template = '''
   }
 }
 '''
+
+def fetch_issue_body(issue_url, token, updated_at=None):
+    issue_number = issue_url.split('/')[-1]
+    repo_owner = "kpmg-global-technology-and-knowledge"
+    repo_name = "Digital-matrix-app"
+    # Bodies already fetched at this updatedAt come from the cache instead of the network
+    cached = issue_bodies.cached_body(f"{repo_owner}/{repo_name}", issue_number, updated_at)
+    if cached is not None:
+        return re.sub(r'\n\s*\n', '\n', cached['raw']).strip()
+    api_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/issues/{issue_number}"
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = run_metrics.http_get(api_url, headers=headers)
+    if response.status_code == 200:
+        issue_data = response.json()
+        # An issue without a description has "body": null
+        body = issue_data.get("body") or ""
+        issue_bodies.store_body(f"{repo_owner}/{repo_name}", issue_number, updated_at, body, issue_bodies.clean_issue_body(body))
+        # Remove multiple line breaks
+        body = re.sub(r'\n\s*\n', '\n', body).strip()
+        #match = re.search(r'# Criteria', body)
+        #print(f"Criteria: The Match value is {match}")
+        #if match:
+        #    body = body[:match.start()]
+        #else:
+        #    match = re.search(r' Scoped Work', body)  
+        #    print(f"Scoped Work: The Match value is {match}")
+        #if match:
+        #    body = body[:match.start()] 
+        #else:
+        return body
+    else:
+        print(f"Failed to fetch issue {issue_number}: {response.status_code}")
+        return release_notes.FALLBACK_BODY
+
+# Function to write the release notes from the Features table
+def write_release_notes(df_features, md_filename):
+    run_metrics.begin_stage("write:release notes")
+    issue_bodies.load_body_cache()
+    release_notes.load_section_cache()
+    notes = ["# Release Notes\n\n"]
+
+    for index, row in df_features.iterrows():
+        # Features unchanged since the last run reuse their rendered section (these keep the raw body, hence their own layout)
+        section = release_notes.cached_section("features_raw", row)
+        if section is None:
+            feature_title = row['Title']
+            issue_url = row['URL']
+
+            # Fetch the issue body using the URL
+            issue_body = fetch_issue_body(issue_url, token, row.get('Updated At'))
+
+            # Ensure issue_body is a string
+            issue_body = str(issue_body) if issue_body else ""
+            # Write the feature title and issue body to the Markdown file with formatting
+            section = f"## **{feature_title}**\n\n" + f"*{issue_body}*\n\n" + f"[Issue Link]({issue_url})\n\n"
+            if issue_body != release_notes.FALLBACK_BODY:
+                release_notes.store_section("features_raw", row, section)
+        notes.append(section)
+
+    release_notes.write_release_notes_file(md_filename, "".join(notes))
+    issue_bodies.save_body_cache()
+    release_notes.save_section_cache()
+    run_metrics.record_rows("write:release notes", len(df_features))
+    run_metrics.end_stage()
+
 # Function to fetch all issues for a project, handling pagination
 def fetch_all_issues_for_project(project_number):
     issues = []
@@ -85,10 +186,13 @@ def fetch_all_issues_for_project(project_number):
             "-H", "Content-Type: application/json",
             "-X", "POST",
             "--data", json.dumps({"query": query}),
-            "https://api.github.com/graphql"
+            f"{run_metrics.github_api_url()}/graphql"
         ]
+        request_start = time.perf_counter()
         result = subprocess.run(curl_command, capture_output=True, text=True)
+        run_metrics.record_request(time.perf_counter() - request_start, len(result.stdout.encode('utf-8')), ok=result.returncode == 0)
         data = json.loads(result.stdout)
+        run_metrics.record_rate_limit(data)
         
         # Check for and handle errors in the response
         if "errors" in data:
@@ -98,6 +202,7 @@ def fetch_all_issues_for_project(project_number):
         # Parse the JSON response and extract issues
         page_info = data['data']['organization']['projectV2']['items']['pageInfo']
         nodes = data['data']['organization']['projectV2']['items']['nodes']
+        project_fetch.complete_nested_pages(nodes, token)
         
         for node in nodes:
             issue = node['content']
@@ -129,13 +234,52 @@ def fetch_all_issues_for_project(project_number):
 
 # Fetch all issues for each project and store in DataFrames
 for project_number, project_title in project_mapping.items():
-    issues = fetch_all_issues_for_project(project_number)
+    with run_metrics.stage(f"fetch:{project_title}"):
+        issues = fetch_all_issues_for_project(project_number)
+    run_metrics.record_rows(f"fetch:{project_title}", len(issues))
     df = pd.DataFrame(issues)
     project_dataframes[shortened_project_mapping[project_number]] = df
 
 # Create a timestamped Excel writer
 current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f"getProjectsStatusReleaseDefectsNoStatus{current_datetime}.xlsx"
+output_base = f"getProjectsStatusReleaseDefectsNoStatus{current_datetime}"
+output_filename = f"{output_base}.xlsx"
+
+# Columnar outputs and the XlsxWriter workbook share the Excel column schema but are built straight from the fetched DataFrames
+write_columnar = any(output_format != 'xlsx' for output_format in output_formats)
+delta_xlsx = 'xlsx' in output_formats and update_from is not None
+single_pass_xlsx = 'xlsx' in output_formats and excel_engine == 'xlsxwriter' and not delta_xlsx
+report_tables = None
+if write_columnar or single_pass_xlsx or delta_xlsx:
+    with run_metrics.stage("build:report tables"):
+        report_tables = report_views.build_report_tables(project_dataframes, include_status=False)
+
+if write_columnar:
+    with run_metrics.stage("write:columnar"):
+        output_backends.write_tables(report_tables, output_base, output_formats)
+
+if single_pass_xlsx:
+    # Single-pass build: every sheet is streamed once, in order, so there is no reload/append cycle
+    with run_metrics.stage("write:workbook (xlsxwriter)"):
+        xlsxwriter_report.write_report_workbook(report_tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=xlsxwriter_report.formula_tables_for(report_tables))
+    run_metrics.record_rows("write:workbook (xlsxwriter)", sum(len(df) for df in report_tables.values()))
+    print(f"Issues successfully written to {output_filename} with additional columns including 'Release1.8items' sheet.")
+
+if delta_xlsx:
+    # Delta update: only rows whose stored values changed are rewritten, and they are flagged in "Changed since last run"
+    with run_metrics.stage("write:workbook (delta update)"):
+        changes = delta_update.update_report_workbook(update_from, report_tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=xlsxwriter_report.formula_tables_for(report_tables))
+    run_metrics.record_rows("write:workbook (delta update)", sum(counts["changed"] + counts["added"] for counts in changes.values()))
+    print(f"Issues successfully updated from {update_from} to {output_filename} with additional columns including 'Release1.8items' sheet.")
+
+if 'xlsx' not in output_formats or single_pass_xlsx or delta_xlsx:
+    # The release notes come straight from the Features view
+    write_release_notes(report_tables["Features"], md_filename)
+    print(f"Release notes successfully written to {md_filename}.")
+    run_metrics.write_metrics(output_filename)
+    sys.exit(0)
+
+run_metrics.begin_stage("write:project sheets")
 
 with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
     for project_title, df in project_dataframes.items():
@@ -145,14 +289,13 @@ with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
 
 # Load the newly created Excel file to modify it
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 # Define the formulas for the additional columns
-label_status_formula = '''=IFERROR(MID(G2, SEARCH("Status: ", G2) + LEN("Status: "), IF(ISNUMBER(SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: "))), SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: ")) - (SEARCH("Status: ", G2) + LEN("Status: ")), LEN(G2))), "")'''
-issuetype_formula = '''=IF(OR(UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "FEATURE", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "USER STORY", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "TASK", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "EPIC", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "OPERATIONAL", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "DEFECT"), UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)), IF(OR(LEFT(G2, 4) = "Pod:", G2 = ""), "", IFERROR(IF(ISERROR(FIND(",", G2)), G2, LEFT(G2, FIND(",", G2) - 1)), G2)))'''
-pod_formula = '''=IFERROR(MID(G2, SEARCH("Pod: ", G2) + LEN("Pod: "), SEARCH(",", G2, SEARCH("Pod: ", G2)) - (SEARCH("Pod: ", G2) + LEN("Pod: "))), "")'''
-isdefect_formula = '''=IF(ISNUMBER(SEARCH("Defect", G2)), "Defect", "")'''
-convertHyperlink = '''=HYPERLINK(B2, TRIM(RIGHT(SUBSTITUTE(B2, "/", REPT(" ", 100)), 100)))'''
-font = Font(color="0000FF", underline="single")
+label_status_formula = report_views.LABEL_STATUS_FORMULA
+issuetype_formula = report_views.ISSUETYPE_FORMULA
+pod_formula = report_views.POD_FORMULA
+isdefect_formula = report_views.ISDEFECT_FORMULA
 
 # List of shorted sheet names
 sheets_to_update = list(shortened_project_mapping.values())
@@ -187,8 +330,7 @@ for original_sheet_name in workbook.sheetnames:
             sheet[f'I{row}'] = issuetype_formula.replace('G2', f'G{row}')
             sheet[f'J{row}'] = pod_formula.replace('G2', f'G{row}')
             sheet[f'K{row}'] = isdefect_formula.replace('G2', f'G{row}')
-            sheet[f'M{row}'] = convertHyperlink.replace('B2',f'B{row}')
-            sheet[f'M{row}'].font=font
+            excel_styles.write_link(sheet[f'M{row}'], sheet[f'B{row}'].value, f'B{row}')
             sheet[f'N{row}'] = original_sheet_name
             
             # Safely fill the Milestone column
@@ -205,7 +347,10 @@ workbook.active.sheet_state = 'visible'
 
 # Save the updated workbook
 workbook.save(output_filename)
+run_metrics.record_rows("write:project sheets", sum(len(df) for df in project_dataframes.values()))
+run_metrics.end_stage()
 
+run_metrics.begin_stage("build:Release1.8items and Defects")
 # Collect all issues with milestone values that include "Release 1.6.0", "Release 1.7.0", or "Release 1.8.0"
 release_issues = []
 defect_issues =[]
@@ -247,6 +392,7 @@ with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a') as writer:  #
 
 # Reload the workbook to ensure changes are captured
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 ###Code to remove duplicate rows Based on Column B
 # Load the "Release1.8items" sheet into a pandas DataFrame
@@ -265,6 +411,7 @@ with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a', if_sheet_exist
 
 # Reload the workbook to ensure changes are captured
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 # Ensure the "Release1.8items" sheet is visible
 
 if "Release1.8items" in workbook.sheetnames:
@@ -276,15 +423,17 @@ for row in range(2, len(release_df) + 2):
     release_sheet[f'I{row}'] = issuetype_formula.replace('G2', f'G{row}')
     release_sheet[f'J{row}'] = pod_formula.replace('G2', f'G{row}')
     release_sheet[f'K{row}'] = isdefect_formula.replace('G2', f'G{row}')
-    release_sheet[f'M{row}'] = convertHyperlink.replace('B2',f'B{row}')
-    release_sheet[f'M{row}'].font = font
+    excel_styles.write_link(release_sheet[f'M{row}'], release_sheet[f'B{row}'].value, f'B{row}')
 # Ensure only one active sheet and it's visible
 workbook.active = workbook[workbook.sheetnames[0]]
 workbook.active.sheet_state = 'visible'
 
 # Save the updated workbook
 workbook.save(output_filename)
+run_metrics.record_rows("build:Release1.8items and Defects", len(df_release_items) + len(df_defect_items))
+run_metrics.end_stage()
 
+run_metrics.begin_stage("build:Features and Defects sheets")
 # Filter the DataFrame for rows where the value in Column "I" (IssueType) is "Feature"
 df_features = df_release_items.copy(sheet_name)
 
@@ -297,6 +446,7 @@ rows_to_delete = []
 
 # Reload the workbook to ensure changes are captured
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 # Ensure the "Features" sheet is visible
 if "Features" in workbook.sheetnames:
@@ -319,12 +469,12 @@ if "Features" in workbook.sheetnames:
     # Second pass: Adjust hyperlinks for remaining rows
     
     for row in range(2, features_sheet.max_row + 1):
-            features_sheet[f'M{row}'] = convertHyperlink.replace('B2', f'B{row}')
-            features_sheet[f'M{row}'].font = font
+            excel_styles.write_link(features_sheet[f'M{row}'], features_sheet[f'B{row}'].value, f'B{row}')
         
     # Delete columns J and K from features_sheet
     features_sheet.delete_cols(10)  # Delete column J (10th column)
     features_sheet.delete_cols(10)  # Delete column K (now the 10th column after deletion of previous column J)
+    excel_styles.refresh_hyperlinks(features_sheet)  # the deleted columns moved the link cells
     workbook.save(output_filename)
 
 ## New code for the Defects
@@ -333,8 +483,7 @@ if "Defects" in workbook.sheetnames:
     Defects_sheet.sheet_state = 'visible'
     # Apply formulas to the Features sheet
     for row in range(2, len(df_defect_items) + 2):
-        Defects_sheet[f'M{row}'] = convertHyperlink.replace('B2',f'B{row}')
-        Defects_sheet[f'M{row}'].font=font
+        excel_styles.write_link(Defects_sheet[f'M{row}'], Defects_sheet[f'B{row}'].value, f'B{row}')
         cell_value = Defects_sheet[f'G{row}'].value  # Get the computed value in cell G{row}
         if cell_value:  # Ensure the cell_value is not None
          if "Defect" in cell_value:
@@ -345,6 +494,7 @@ if "Defects" in workbook.sheetnames:
 Defects_sheet.delete_cols(8)  # Delete column H (8th column)
 Defects_sheet.delete_cols(8)  # Delete column I (now the 8th column after deletion of previous column J)
 Defects_sheet.delete_cols(8)  # Delete column J    
+excel_styles.refresh_hyperlinks(Defects_sheet)  # the deleted columns moved the link cells
 
 # Ensure only one active sheet and it's visible
 workbook.active = workbook[workbook.sheetnames[0]]
@@ -352,6 +502,7 @@ workbook.active.sheet_state = 'visible'
 
 # Save the updated workbook
 workbook.save(output_filename)
+run_metrics.end_stage()
 
 print(f"Issues successfully written to {output_filename} with additional columns including 'Release1.8items' sheet.")
 ## Begin write to a .MD file
@@ -362,57 +513,10 @@ workbook = load_workbook(output_filename, data_only=True)
 # Load the 'Features' sheet into a pandas DataFrame
 df_features = pd.read_excel(output_filename, sheet_name="Features")
 
-# Prepare to create the Markdown file
-md_filename = "Release_Notes.md"
-
-def fetch_issue_body(issue_url, token):
-    issue_number = issue_url.split('/')[-1]
-    repo_owner = "kpmg-global-technology-and-knowledge"
-    repo_name = "Digital-matrix-app"
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues/{issue_number}"
+# Create the Markdown content
+write_release_notes(df_features, md_filename)
 
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        issue_data = response.json()
-        body = issue_data.get("body", "No description available.")
-        # Remove multiple line breaks
-        body = re.sub(r'\n\s*\n', '\n', body).strip()
-        #match = re.search(r'# Criteria', body)
-        #print(f"Criteria: The Match value is {match}")
-        #if match:
-        #    body = body[:match.start()]
-        #else:
-        #    match = re.search(r' Scoped Work', body)  
-        #    print(f"Scoped Work: The Match value is {match}")
-        #if match:
-        #    body = body[:match.start()] 
-        #else:
-        return body
-    else:
-        print(f"Failed to fetch issue {issue_number}: {response.status_code}")
-        return "No description available."
+print(f"Release notes successfully written to {md_filename}.")
 
-# Create the Markdown content
-with open(md_filename, 'w', encoding='utf-8') as md_file:
-    md_file.write("# Release Notes\n\n")
-    
-    for index, row in df_features.iterrows():
-        feature_title = row['Title']
-        issue_url = row['URL']
-
-         # Fetch the issue body using the URL
-        issue_body = fetch_issue_body(issue_url, token)
-
-        # Ensure issue_body is a string
-        issue_body = str(issue_body) if issue_body else ""
-        # Write the feature title and issue body to the Markdown file with formatting
-        md_file.write(f"## **{feature_title}**\n\n")
-        #issue_body_clean = re.sub(r'##', '###', issue_body)  # Adjust subheadings level
-        #issue_body_clean = re.sub(r'###', '####', issue_body_clean)  # Adjust headings level for markdown consistency
-        #issue_body_clean = issue_body
-        #if issue_body_clean:
-        md_file.write(f"*{issue_body}*\n\n")
-        md_file.write(f"[Issue Link]({issue_url})\n\n")
-
-print(f"Release notes successfully written to {md_filename}.")
\ No newline at end of file
+# Write the run metrics next to the output workbook
+run_metrics.write_metrics(output_filename)
\ No newline at end of file
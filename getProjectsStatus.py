@@ -1,9 +1,24 @@
 import json
+import sys
 from datetime import datetime
 import pandas as pd
 import requests
 from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+import run_metrics
+import project_fetch
+import issue_store
+import snapshot_store
+import issue_timelines
+import report_views
+import excel_styles
+import output_backends
+import xlsxwriter_report
+import delta_update
+import parallel_workbooks
+
+# Start collecting per-stage timings, request counts and rate-limit cost for this run
+run_metrics.reset_metrics('getProjectsStatus')
 
 # Function to read the token from a file
 def read_token_from_file(file_path):
@@ -27,145 +42,37 @@ project_mapping = {
 # Shortened sheet names to fit Excel's 31-character limit
 shortened_project_mapping = {number: title[:31] for number, title in project_mapping.items()}
 
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the single-pass constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
+
+# Previous report to update instead of rebuilding every row, e.g. UPDATE_FROM=<earlier report>.xlsx
+update_from = delta_update.previous_report_path()
+
+# Workbook layout for this run, e.g. WORKBOOK_MODE=per_board to render each board and view into its own workbook in parallel
+workbook_mode = parallel_workbooks.selected_workbook_mode()
+
 # Initialize a dictionary to hold DataFrames for each project
 project_dataframes = {}
 processed_data = {}  # Dictionary to hold preprocessed data for each project
 
-# Corrected query template with proper handling of after cursor
-query_template = '''
-{
-  organization(login: "kpmg-global-technology-and-knowledge") {
-    projectV2(number: %d) {
-      items(first: 100, after: %s) {
-        pageInfo {
-          endCursor
-          hasNextPage
-        }
-        nodes {
-          content {
-            ... on Issue {
-              id
-              number
-              title
-              url
-              createdAt
-              updatedAt
-              state
-              author {
-                login
-              }
-              labels(first: 10) {
-                nodes {
-                  name
-                }
-              }
-              milestone {
-                title
-              }
-            }
-          }
-          fieldValues(first: 100) {
-            nodes {
-              ... on ProjectV2ItemFieldValueCommon {
-                field {
-                  ... on ProjectV2FieldCommon {
-                    name
-                  }
-                }
-              }
-              ... on ProjectV2ItemFieldTextValue {
-                field {
-                  ... on ProjectV2Field {
-                    name
-                  }
-                }
-                text
-              }
-              ... on ProjectV2ItemFieldSingleSelectValue {
-                field {
-                  ... on ProjectV2SingleSelectField {
-                    name
-                  }
-                }
-                name
-              }
-            }
-          }
-        }
-      }
-    }
-  }
-}
-'''
-
-# Function to extract status from field values
-def extract_status(field_values):
-    for field in field_values:
-        if 'field' in field:
-            print(f"Processing field: {field}")  # DEBUG: Print each field being processed
-            if field['field']['name'] == 'Status':
-                if 'text' in field:
-                    return field['text']
-                elif 'name' in field:
-                    return field['name']
-    return None
+# Organization that owns the project boards
+project_org = project_fetch.DEFAULT_ORG
+
+# Extra project fields fetched as columns after Status, e.g. PROJECT_FIELDS=Priority,Iteration (PROJECT_FIELDS=all for every custom field)
+extra_fields = project_fetch.resolve_extra_fields(token, project_org, project_mapping)
 
 # Function to fetch all issues for a project, handling pagination
 def fetch_all_issues_for_project(project_number):
-    issues = []
-    end_cursor = None  # Initialize cursor as None
-    has_next_page = True
-  
-    while has_next_page:
-        cursor_str = f'"{end_cursor}"' if end_cursor else 'null'  # Proper handling of cursor value in query
-        query = query_template % (project_number, cursor_str)
-        response = requests.post("https://api.github.com/graphql", json={'query': query}, headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"})
-        data = response.json()
-        
-        # Check for and handle errors in the response
-        if "errors" in data:
-            print(f"Error fetching data for project {project_number}: {data['errors']}")
-            break
-
-        # Parse the JSON response and extract issues
-        page_info = data['data']['organization']['projectV2']['items']['pageInfo']
-        nodes = data['data']['organization']['projectV2']['items']['nodes']
-        
-        for node in nodes:
-            issue = node['content']
-            if issue:
-                issue_number = issue['number']
-                title = issue['title']
-                url = issue['url']
-                created_at = issue['createdAt']
-                updated_at = issue['updatedAt']
-                state = issue['state']
-                author = issue['author']['login']
-                labels = ", ".join([label['name'] for label in issue['labels']['nodes']])
-                milestone = issue['milestone']['title'] if issue.get('milestone') else None
-                print(f"Fetching status for issue: {issue_number}")  # DEBUG: Verify issue number being processed
-                status = extract_status(node['fieldValues']['nodes'])  # Extract status field value
-                issues.append({
-                    'Title': title,
-                    'URL': url,
-                    'Created At': created_at,
-                    'Updated At': updated_at,
-                    'State': state,
-                    'Author': author,
-                    'Labels': labels,
-                    'Milestone': milestone,
-                    'Status': status  # Ensure column name is 'Status'
-                })
-
-        has_next_page = page_info['hasNextPage']
-        end_cursor = page_info['endCursor']
-
-    print(f"Issues fetched for project {project_number}: {issues}")  # DEBUG: Print all issues fetched
-    return issues
+    return project_fetch.fetch_project_items(project_number, token, org=project_org, extra_fields=extra_fields)
 
 # Fetch all issues for each project and store in DataFrames
 for project_number, project_title in project_mapping.items():
-    issues = fetch_all_issues_for_project(project_number)
+    with run_metrics.stage(f"fetch:{project_title}"):
+        issues = fetch_all_issues_for_project(project_number)
+    run_metrics.record_rows(f"fetch:{project_title}", len(issues))
     df = pd.DataFrame(issues)
     df['Status'] = df['Status'].astype(str)  # Ensure the Status column type is string
     print(f"DataFrame for project {project_number}:\n{df.head()}")  # DEBUG: Check DataFrame content
@@ -175,9 +82,75 @@ for project_number, project_title in project_mapping.items():
     # Pre-process data into dictionaries for access without indexing issues
     processed_data[shortened_project_mapping[project_number]] = df.to_dict(orient='records')
 
+# Keep the fetched boards in the local issue store (ISSUE_STORE=1) so query_issues.py can slice them without a new run
+with run_metrics.stage("write:issue store"):
+    issue_store.save_boards(project_dataframes)
+
 # Create a timestamped Excel writer
 current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f"getProjectsStatus_{current_datetime}.xlsx"
+output_base = f"getProjectsStatus_{current_datetime}"
+output_filename = f"{output_base}.xlsx"
+
+# Keep a compressed snapshot of this run's boards (SNAPSHOT_DIR=1) so diff_snapshots.py can compare runs without re-fetching
+with run_metrics.stage("write:snapshot"):
+    snapshot_store.save_snapshot(project_dataframes, output_base)
+
+# Lead and cycle time per board item from the issue timelines (ISSUE_TIMELINES=1), fetched in aliased batches on a few threads
+timeline_tables = {}
+if issue_timelines.timelines_enabled():
+    with run_metrics.stage("fetch:timelines"):
+        timelines = issue_timelines.fetch_issue_timelines([url for df in project_dataframes.values() for url in df.get('URL', [])], token)
+    run_metrics.record_rows("fetch:timelines", len(timelines))
+    board_projects = {shortened_project_mapping[project_number]: project_number for project_number in project_mapping}
+    timeline_tables = issue_timelines.build_timeline_tables({project_title: report_views.build_board_view(df, project_title) for project_title, df in project_dataframes.items()}, timelines, board_projects)
+
+# Columnar outputs and the XlsxWriter workbook share the Excel column schema but are built straight from the fetched DataFrames
+write_columnar = any(output_format != 'xlsx' for output_format in output_formats)
+delta_xlsx = 'xlsx' in output_formats and update_from is not None
+per_board_xlsx = 'xlsx' in output_formats and workbook_mode == 'per_board' and not delta_xlsx
+single_pass_xlsx = 'xlsx' in output_formats and excel_engine == 'xlsxwriter' and not delta_xlsx and not per_board_xlsx
+if write_columnar or single_pass_xlsx or delta_xlsx or per_board_xlsx:
+    board_tables = {project_title: report_views.build_board_view(df, project_title) for project_title, df in project_dataframes.items()}
+    # Pod x Status and IssueType x Milestone counts per board and across boards follow the board sheets
+    report_tables = dict(board_tables)
+    if report_views.summary_enabled():
+        report_tables.update(report_views.build_summary_tables(board_tables))
+    report_tables.update(timeline_tables)
+
+if write_columnar:
+    with run_metrics.stage("write:columnar"):
+        output_backends.write_tables(report_tables, output_base, output_formats)
+
+if single_pass_xlsx:
+    # Single-pass build: every sheet is streamed once, so there is no reload of the workbook
+    with run_metrics.stage("write:workbook (xlsxwriter)"):
+        xlsxwriter_report.write_report_workbook(report_tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=list(board_tables))
+    run_metrics.record_rows("write:workbook (xlsxwriter)", sum(len(df) for df in report_tables.values()))
+    print(f"Issues successfully written to {output_filename} with additional columns including 'Status'.")
+
+if delta_xlsx:
+    # Delta update: only rows whose stored values changed are rewritten, and they are flagged in "Changed since last run"
+    with run_metrics.stage("write:workbook (delta update)"):
+        changes = delta_update.update_report_workbook(update_from, report_tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=list(board_tables))
+    run_metrics.record_rows("write:workbook (delta update)", sum(counts["changed"] + counts["added"] for counts in changes.values()))
+    print(f"Issues successfully updated from {update_from} to {output_filename} with additional columns including 'Status'.")
+
+if per_board_xlsx:
+    # One workbook per board and view, rendered on a process pool; WORKBOOK_MERGE=1 also merges them into the usual workbook
+    with run_metrics.stage("write:workbooks (per board)"):
+        workbook_paths = parallel_workbooks.write_table_workbooks(report_tables, output_base, excel_engine, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=list(board_tables))
+    run_metrics.record_rows("write:workbooks (per board)", sum(len(df) for df in report_tables.values()))
+    print(f"Issues successfully written to {len(workbook_paths)} workbooks named {output_base}_<sheet>.xlsx.")
+    if parallel_workbooks.merge_enabled():
+        with run_metrics.stage("write:workbook (merge)"):
+            parallel_workbooks.merge_workbooks(workbook_paths, output_filename)
+        print(f"Issues successfully written to {output_filename} with additional columns including 'Status'.")
+
+if 'xlsx' not in output_formats or single_pass_xlsx or delta_xlsx or per_board_xlsx:
+    run_metrics.write_metrics(output_filename)
+    sys.exit(0)
+
+run_metrics.begin_stage("write:project sheets")
 
 with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
     for project_title, df in project_dataframes.items():
@@ -186,14 +159,13 @@ with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
 
 # Load the newly created Excel file to verify it
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 # Define the formulas for the additional columns
-label_status_formula = '''=IFERROR(MID(G2, SEARCH("Status: ", G2) + LEN("Status: "), IF(ISNUMBER(SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: "))), SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: ")) - (SEARCH("Status: ", G2) + LEN("Status: ")), LEN(G2))), "")'''
-issuetype_formula = '''=IF(OR(UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "FEATURE", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "USER STORY", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "TASK", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "EPIC", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "OPERATIONAL", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "DEFECT"), UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)), IF(OR(LEFT(G2, 4) = "Pod:", G2 = ""), "", IFERROR(IF(ISERROR(FIND(",", G2)), G2, LEFT(G2, FIND(",", G2) - 1)), G2)))'''
-pod_formula = '''=IFERROR(MID(G2, SEARCH("Pod: ", G2) + LEN("Pod: "), SEARCH(",", G2, SEARCH("Pod: ", G2)) - (SEARCH("Pod: ", G2) + LEN("Pod: "))), "")'''
-isdefect_formula = '''=IF(ISNUMBER(SEARCH("Defect", G2)), "Defect", "")'''
-convertHyperlink = '''=HYPERLINK(B2, TRIM(RIGHT(SUBSTITUTE(B2, "/", REPT(" ", 100)), 100)))'''
-font = Font(color="0000FF", underline="single")
+label_status_formula = report_views.LABEL_STATUS_FORMULA
+issuetype_formula = report_views.ISSUETYPE_FORMULA
+pod_formula = report_views.POD_FORMULA
+isdefect_formula = report_views.ISDEFECT_FORMULA
 
 # Ensure each sheet in the workbook is processed
 for project_title in workbook.sheetnames:
@@ -217,8 +189,7 @@ for project_title in workbook.sheetnames:
             sheet[f'I{row}'] = issuetype_formula.replace('G2', f'G{row}')
             sheet[f'J{row}'] = pod_formula.replace('G2', f'G{row}')
             sheet[f'K{row}'] = isdefect_formula.replace('G2', f'G{row}')
-            sheet[f'M{row}'] = convertHyperlink.replace('B2', f'B{row}')
-            sheet[f'M{row}'].font = font
+            excel_styles.write_link(sheet[f'M{row}'], sheet[f'B{row}'].value, f'B{row}')
             sheet[f'N{row}'] = project_title
 
             sheet[f'L{row}'] = record.get('Milestone', '')
@@ -226,11 +197,40 @@ for project_title in workbook.sheetnames:
             print(f"Writing Status '{status_value}' to row {row}")  # DEBUG: Print status value being written
             sheet[f'O{row}'] = status_value
 
+        # Configured extra project fields (PROJECT_FIELDS) follow the Status column
+        for offset, field_name in enumerate(extra_fields):
+            column = get_column_letter(16 + offset)
+            sheet[f'{column}1'] = field_name
+            for row, record in enumerate(processed_data[project_title], start=2):
+                sheet[f'{column}{row}'] = record.get(field_name)
+
 # Ensure only one active sheet and it's visible
 workbook.active = workbook.worksheets[0]
 workbook.active.sheet_state = 'visible'
 
 # Save the updated workbook
 workbook.save(output_filename)
+run_metrics.record_rows("write:project sheets", sum(len(records) for records in processed_data.values()))
+run_metrics.end_stage()
 
 print(f"Issues successfully written to {output_filename} with additional columns including 'Status'.")
+
+# Static Pod x Status and IssueType x Milestone counts, so nobody has to build them on top of the formula columns
+if report_views.summary_enabled():
+    with run_metrics.stage("write:summary sheets"):
+        board_views = {project_title: report_views.build_board_view(df, project_title) for project_title, df in project_dataframes.items()}
+        with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+            for sheet_name, df in report_views.build_summary_tables(board_views).items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(f"Summary sheets written to {output_filename}.")
+
+# Per-item lead and cycle time and their medians per Pod and milestone, when the timelines were fetched
+if timeline_tables:
+    with run_metrics.stage("write:timeline sheets"):
+        with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+            for sheet_name, df in timeline_tables.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(f"Cycle time sheets written to {output_filename}.")
+
+# Write the run metrics next to the output workbook
+run_metrics.write_metrics(output_filename)
@@ -3,10 +3,25 @@ import json
 from datetime import datetime
 import pandas as pd
 import re
+import sys
 import requests
 from openpyxl import load_workbook, Workbook
-from openpyxl.styles import Font
-
+from openpyxl.utils import get_column_letter
+import run_metrics
+import issue_bodies
+import release_notes
+import project_fetch
+import issue_store
+import snapshot_store
+import report_views
+import excel_styles
+import output_backends
+import xlsxwriter_report
+import delta_update
+import parallel_workbooks
+
+# Start collecting per-stage timings, request counts and rate-limit cost for this run
+run_metrics.reset_metrics('getProjectsStatusReleaseDefects')
 
 # Function to read the token from a file
 def read_token_from_file(file_path):
@@ -30,175 +45,52 @@ project_mapping = {
 # Shortened sheet names to fit Excel's 31-character limit
 shortened_project_mapping = {number: title[:31] for number, title in project_mapping.items()}
 
+# Output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet (xlsx is the default)
+output_formats = output_backends.selected_output_formats()
+
+# Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter for the single-pass constant-memory writer
+excel_engine = xlsxwriter_report.selected_excel_engine()
+
+# Previous report to update instead of rebuilding every row, e.g. UPDATE_FROM=<earlier report>.xlsx
+update_from = delta_update.previous_report_path()
+
+# Workbook layout for this run, e.g. WORKBOOK_MODE=per_board to render each board and view into its own workbook in parallel
+workbook_mode = parallel_workbooks.selected_workbook_mode()
+
+# Markdown file for the release notes
+md_filename = "Release_Notes.md"
+
 # Initialize a dictionary to hold DataFrames for each project
 project_dataframes = {}
 processed_data = {}  # Dictionary to hold preprocessed data for each project
 
-# Query template for fetching project issues
-# Corrected query template with proper handling of after cursor
-query_template = '''
-{
-  organization(login: "kpmg-global-technology-and-knowledge") {
-    projectV2(number: %d) {
-      items(first: 100, after: %s) {  # CHANGED: Correct handling of the cursor value
-        pageInfo {
-          endCursor
-          hasNextPage
-        }
-        nodes {
-          content {
-            ... on Issue {
-              id
-              number
-              title
-              url
-              createdAt
-              updatedAt
-              state
-              author {
-                login
-              }
-              labels(first: 10) {
-                nodes {
-                  name
-                }
-              }
-              milestone {
-                title
-              }
-            }
-          }
-          fieldValues(first: 100) {
-            nodes {
-              ... on ProjectV2ItemFieldValueCommon {
-                field {
-                  ... on ProjectV2FieldCommon {
-                    name
-                  }
-                }
-              }
-              ... on ProjectV2ItemFieldTextValue {
-                field {
-                  ... on ProjectV2Field {
-                    name
-                  }
-                }
-                text
-              }
-              ... on ProjectV2ItemFieldSingleSelectValue {
-                field {
-                  ... on ProjectV2SingleSelectField {
-                    name
-                  }
-                }
-                name
-              }
-            }
-          }
-        }
-      }
-    }
-  }
-}
-'''
-
-# Function to extract status from field values
-def extract_status(field_values):
-    for field in field_values:
-        if 'field' in field:
-            #print(f"Processing field: {field}")  # DEBUG: Print each field being processed
-            if field['field']['name'] == 'Status':
-                if 'text' in field:
-                    return field['text']
-                elif 'name' in field:
-                    return field['name']
-    return None
-# BEGIN of Function call to add Defects
-def fetch_defects_content(file_path):
-    # Read the Excel file
-    df = pd.read_excel(file_path, sheet_name='Defects')
-    
-    # Convert the defects dataframe to a string
-    defects_content = "## Defects\n\n"
-    for index, row in df.iterrows():
-        defect_description = " - ".join([str(item) for item in row if pd.notna(item)])
-        defects_content += f"* {defect_description}\n"
-    
-    return defects_content
-# End of Function call to add Defects    
+# Organization that owns the project boards
+project_org = project_fetch.DEFAULT_ORG
+
+# Extra project fields fetched as columns after Status, e.g. PROJECT_FIELDS=Priority,Iteration (PROJECT_FIELDS=all for every custom field)
+extra_fields = project_fetch.resolve_extra_fields(token, project_org, project_mapping)
+
+# Function to write the release notes from the Features and Defects tables
+def write_release_notes(df_features, df_defects, md_filename):
+    run_metrics.begin_stage("write:release notes")
+    issue_bodies.load_body_cache()
+    release_notes.load_section_cache()
+    release_notes.write_release_notes_file(md_filename, release_notes.render_release_notes(df_features, df_defects, token))
+
+    issue_bodies.save_body_cache()
+    release_notes.save_section_cache()
+    run_metrics.record_rows("write:release notes", len(df_features))
+    run_metrics.end_stage()
+
 # Function to fetch all issues for a project, handling pagination
 def fetch_all_issues_for_project(project_number):
-    issues = []
-    end_cursor =  None  # CHANGED: Initialize cursor as None
-    has_next_page = True
-    
-    while has_next_page:
-        cursor_str = f'"{end_cursor}"' if end_cursor else 'null'  # CHANGED: Proper handling of cursor value in query
-        query = query_template % (project_number, cursor_str)
-        #curl_command = [
-        #    "curl",
-        #    "-H", f"Authorization: Bearer {token}",
-        #    "-H", "Content-Type: application/json",
-        #    "-X", "POST",
-        #    "--data", json.dumps({"query": query}),
-        #    "https://api.github.com/graphql"
-        #]
-        # Define the GitHub API URL
-        url = "https://api.github.com/graphql"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(url, json={'query': query}, headers=headers)
-        data=response.json()
-        #result = subprocess.run(curl_command, capture_output=True, text=True)
-        #data = json.loads(result.stdout)
-        
-        # Check for and handle errors in the response
-        if "errors" in data:
-            print(f"Error fetching data for project {project_number}: {data['errors']}")
-            break
-
-        # Parse the JSON response and extract issues
-        page_info = data['data']['organization']['projectV2']['items']['pageInfo']
-        nodes = data['data']['organization']['projectV2']['items']['nodes']
-        
-        for node in nodes:
-            issue = node['content']
-            if issue:
-                issue_number = issue['number']
-                title = issue['title']
-                url = issue['url']
-                created_at = issue['createdAt']
-                updated_at = issue['updatedAt']
-                state = issue['state']
-                author = issue['author']['login']
-                labels = ", ".join([label['name'] for label in issue['labels']['nodes']])
-                milestone = issue['milestone']['title'] if issue.get('milestone') else None
-                #print(f"Fetching status for issue: {issue_number}")  # DEBUG: Verify issue number being processed
-                status = extract_status(node['fieldValues']['nodes'])
-                #print(f"Fetching status value : {status}")
-                issues.append({
-                    'Title': title,
-                    'URL': url,
-                    'Created At': created_at,
-                    'Updated At': updated_at,
-                    'State': state,
-                    'Author': author,
-                    'Labels': labels,
-                    'Milestone': milestone,
-                    'Status': status
-                })
-
-        has_next_page = page_info['hasNextPage']
-        end_cursor = page_info['endCursor']
-    #print(f"Issues fetched for project {project_number}: {issues}") 
-    return issues
+    return project_fetch.fetch_project_items(project_number, token, org=project_org, extra_fields=extra_fields)
 
 # Fetch all issues for each project and store in DataFrames
 for project_number, project_title in project_mapping.items():
-    issues = fetch_all_issues_for_project(project_number)
+    with run_metrics.stage(f"fetch:{project_title}"):
+        issues = fetch_all_issues_for_project(project_number)
+    run_metrics.record_rows(f"fetch:{project_title}", len(issues))
     df = pd.DataFrame(issues)
     df['Status'] = df['Status'].astype(str)  # Ensure the Status column type is string
     #print(f"DataFrame for project {project_number}:\n{df.head()}")  # DEBUG: Check DataFrame content
@@ -208,10 +100,66 @@ for project_number, project_title in project_mapping.items():
     # Pre-process data into dictionaries for access without indexing issues
     processed_data[shortened_project_mapping[project_number]] = df.to_dict(orient='records')
 
+# Keep the fetched boards in the local issue store (ISSUE_STORE=1) so query_issues.py can slice them without a new run
+with run_metrics.stage("write:issue store"):
+    issue_store.save_boards(project_dataframes)
+
 # Create a timestamped Excel writer
 current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-output_filename = f"getProjectsStatusReleaseDefects{current_datetime}.xlsx"
-
+output_base = f"getProjectsStatusReleaseDefects{current_datetime}"
+output_filename = f"{output_base}.xlsx"
+
+# Keep a compressed snapshot of this run's boards (SNAPSHOT_DIR=1) so diff_snapshots.py can compare runs without re-fetching
+with run_metrics.stage("write:snapshot"):
+    snapshot_store.save_snapshot(project_dataframes, output_base)
+
+# Columnar outputs and the XlsxWriter workbook share the Excel column schema but are built straight from the fetched DataFrames
+write_columnar = any(output_format != 'xlsx' for output_format in output_formats)
+delta_xlsx = 'xlsx' in output_formats and update_from is not None
+per_board_xlsx = 'xlsx' in output_formats and workbook_mode == 'per_board' and not delta_xlsx
+single_pass_xlsx = 'xlsx' in output_formats and excel_engine == 'xlsxwriter' and not delta_xlsx and not per_board_xlsx
+report_tables = None
+if write_columnar or single_pass_xlsx or delta_xlsx or per_board_xlsx:
+    with run_metrics.stage("build:report tables"):
+        report_tables = report_views.build_report_tables(project_dataframes)
+
+if write_columnar:
+    with run_metrics.stage("write:columnar"):
+        output_backends.write_tables(report_tables, output_base, output_formats)
+
+if single_pass_xlsx:
+    # Single-pass build: every sheet is streamed once, in order, so there is no reload/append cycle
+    with run_metrics.stage("write:workbook (xlsxwriter)"):
+        xlsxwriter_report.write_report_workbook(report_tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=xlsxwriter_report.formula_tables_for(report_tables))
+    run_metrics.record_rows("write:workbook (xlsxwriter)", sum(len(df) for df in report_tables.values()))
+    print(f"Issues successfully written to {output_filename} with additional columns including 'Release1.8items' sheet.")
+
+if delta_xlsx:
+    # Delta update: only rows whose stored values changed are rewritten, and they are flagged in "Changed since last run"
+    with run_metrics.stage("write:workbook (delta update)"):
+        changes = delta_update.update_report_workbook(update_from, report_tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=xlsxwriter_report.formula_tables_for(report_tables))
+    run_metrics.record_rows("write:workbook (delta update)", sum(counts["changed"] + counts["added"] for counts in changes.values()))
+    print(f"Issues successfully updated from {update_from} to {output_filename} with additional columns including 'Release1.8items' sheet.")
+
+if per_board_xlsx:
+    # One workbook per board and view, rendered on a process pool; WORKBOOK_MERGE=1 also merges them into the usual workbook
+    with run_metrics.stage("write:workbooks (per board)"):
+        workbook_paths = parallel_workbooks.write_table_workbooks(report_tables, output_base, excel_engine, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=xlsxwriter_report.formula_tables_for(report_tables))
+    run_metrics.record_rows("write:workbooks (per board)", sum(len(df) for df in report_tables.values()))
+    print(f"Issues successfully written to {len(workbook_paths)} workbooks named {output_base}_<sheet>.xlsx.")
+    if parallel_workbooks.merge_enabled():
+        with run_metrics.stage("write:workbook (merge)"):
+            parallel_workbooks.merge_workbooks(workbook_paths, output_filename)
+        print(f"Issues successfully written to {output_filename} with additional columns including 'Release1.8items' sheet.")
+
+if 'xlsx' not in output_formats or single_pass_xlsx or delta_xlsx or per_board_xlsx:
+    # The release notes come straight from the Features and Defects views
+    write_release_notes(report_tables["Features"], report_tables["Defects"], md_filename)
+    print(f"Release notes successfully written to {md_filename}.")
+    run_metrics.write_metrics(output_filename)
+    sys.exit(0)
+
+run_metrics.begin_stage("write:project sheets")
 with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
     for project_title, df in project_dataframes.items():
         # Sheet names already shortened to 31 characters
@@ -220,14 +168,13 @@ with pd.ExcelWriter(output_filename, engine='openpyxl') as writer:
 
 # Load the newly created Excel file to modify it
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 # Define the formulas for the additional columns
-label_status_formula = '''=IFERROR(MID(G2, SEARCH("Status: ", G2) + LEN("Status: "), IF(ISNUMBER(SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: "))), SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: ")) - (SEARCH("Status: ", G2) + LEN("Status: ")), LEN(G2))), "")'''
-issuetype_formula = '''=IF(OR(UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "FEATURE", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "USER STORY", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "TASK", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "EPIC", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "OPERATIONAL", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "DEFECT"), UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)), IF(OR(LEFT(G2, 4) = "Pod:", G2 = ""), "", IFERROR(IF(ISERROR(FIND(",", G2)), G2, LEFT(G2, FIND(",", G2) - 1)), G2)))'''
-pod_formula = '''=IFERROR(MID(G2, SEARCH("Pod: ", G2) + LEN("Pod: "), SEARCH(",", G2, SEARCH("Pod: ", G2)) - (SEARCH("Pod: ", G2) + LEN("Pod: "))), "")'''
-isdefect_formula = '''=IF(ISNUMBER(SEARCH("Defect", G2)), "Defect", "")'''
-convertHyperlink = '''=HYPERLINK(B2, TRIM(RIGHT(SUBSTITUTE(B2, "/", REPT(" ", 100)), 100)))'''
-font = Font(color="0000FF", underline="single")
+label_status_formula = report_views.LABEL_STATUS_FORMULA
+issuetype_formula = report_views.ISSUETYPE_FORMULA
+pod_formula = report_views.POD_FORMULA
+isdefect_formula = report_views.ISDEFECT_FORMULA
 
 # List of shorted sheet names
 sheets_to_update = list(shortened_project_mapping.values())
@@ -254,8 +201,7 @@ for project_title in workbook.sheetnames:
             sheet[f'I{row}'] = issuetype_formula.replace('G2', f'G{row}')
             sheet[f'J{row}'] = pod_formula.replace('G2', f'G{row}')
             sheet[f'K{row}'] = isdefect_formula.replace('G2', f'G{row}')
-            sheet[f'M{row}'] = convertHyperlink.replace('B2',f'B{row}')
-            sheet[f'M{row}'].font=font
+            excel_styles.write_link(sheet[f'M{row}'], sheet[f'B{row}'].value, f'B{row}')
             sheet[f'N{row}'] = project_title
 
             sheet[f'L{row}'] = record.get('Milestone', '')
@@ -263,14 +209,25 @@ for project_title in workbook.sheetnames:
             #print(f"Writing Status '{status_value}' to row {row}")  # DEBUG: Print status value being written
             sheet[f'O{row}'] = status_value
 
+        # Configured extra project fields (PROJECT_FIELDS) follow the Status column
+        for offset, field_name in enumerate(extra_fields):
+            column = get_column_letter(16 + offset)
+            sheet[f'{column}1'] = field_name
+            for row, record in enumerate(processed_data[project_title], start=2):
+                sheet[f'{column}{row}'] = record.get(field_name)
+
 # Ensure only one active sheet and it's visible
 workbook.active = workbook[workbook.sheetnames[0]]
 workbook.active.sheet_state = 'visible'
 
 # Save the updated workbook
 workbook.save(output_filename)
+run_metrics.record_rows("write:project sheets", sum(len(records) for records in processed_data.values()))
+run_metrics.end_stage()
 print(f" The project details extracted to {output_filename} including 'Status'.")
 
+run_metrics.begin_stage("build:Release1.8items and Defects")
+
 # Collect all issues with milestone values that include "Release 1.6.0", "Release 1.7.0", or "Release 1.8.0"
 release_issues = []
 defect_issues =[]
@@ -312,6 +269,7 @@ with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a') as writer:  #
 
 # Reload the workbook to ensure changes are captured
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 ###Code to remove duplicate rows Based on Column B
 # Load the "Release1.8items" sheet into a pandas DataFrame
@@ -330,6 +288,7 @@ with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a', if_sheet_exist
 
 # Reload the workbook to ensure changes are captured
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 # Ensure the "Release1.8items" sheet is visible
 
 if "Release1.8items" in workbook.sheetnames:
@@ -341,8 +300,7 @@ for row in range(2, len(release_df) + 2):
     release_sheet[f'I{row}'] = issuetype_formula.replace('G2', f'G{row}')
     release_sheet[f'J{row}'] = pod_formula.replace('G2', f'G{row}')
     release_sheet[f'K{row}'] = isdefect_formula.replace('G2', f'G{row}')
-    release_sheet[f'M{row}'] = convertHyperlink.replace('B2',f'B{row}')
-    release_sheet[f'M{row}'].font = font
+    excel_styles.write_link(release_sheet[f'M{row}'], release_sheet[f'B{row}'].value, f'B{row}')
 # Ensure only one active sheet and it's visible
 workbook.active = workbook[workbook.sheetnames[0]]
 workbook.active.sheet_state = 'visible'
@@ -350,6 +308,10 @@ workbook.active.sheet_state = 'visible'
 # Save the updated workbook
 workbook.save(output_filename)
 
+run_metrics.record_rows("build:Release1.8items and Defects", len(df_release_items) + len(df_defect_items))
+run_metrics.end_stage()
+
+run_metrics.begin_stage("build:Features and Defects sheets")
 # Filter the DataFrame for rows where the value in Column "I" (IssueType) is "Feature"
 df_features = df_release_items.copy(sheet_name)
 
@@ -362,6 +324,7 @@ rows_to_delete = []
 
 # Reload the workbook to ensure changes are captured
 workbook = load_workbook(output_filename)
+excel_styles.register_styles(workbook)
 
 # Ensure the "Features" sheet is visible
 if "Features" in workbook.sheetnames:
@@ -383,12 +346,12 @@ if "Features" in workbook.sheetnames:
     # Second pass: Adjust hyperlinks for remaining rows
     
     for row in range(2, features_sheet.max_row + 1):
-            features_sheet[f'M{row}'] = convertHyperlink.replace('B2', f'B{row}')
-            features_sheet[f'M{row}'].font = font
+            excel_styles.write_link(features_sheet[f'M{row}'], features_sheet[f'B{row}'].value, f'B{row}')
         
     # Delete columns J and K from features_sheet
     features_sheet.delete_cols(10)  # Delete column J (10th column)
     features_sheet.delete_cols(10)  # Delete column K (now the 10th column after deletion of previous column J)
+    excel_styles.refresh_hyperlinks(features_sheet)  # the deleted columns moved the link cells
     workbook.save(output_filename)
 
 ## New code for the Defects
@@ -397,8 +360,7 @@ if "Defects" in workbook.sheetnames:
     Defects_sheet.sheet_state = 'visible'
     # Apply formulas to the Features sheet
     for row in range(2, len(df_defect_items) + 2):
-        Defects_sheet[f'M{row}'] = convertHyperlink.replace('B2',f'B{row}')
-        Defects_sheet[f'M{row}'].font=font
+        excel_styles.write_link(Defects_sheet[f'M{row}'], Defects_sheet[f'B{row}'].value, f'B{row}')
         cell_value = Defects_sheet[f'G{row}'].value  # Get the computed value in cell G{row}
         if cell_value:  # Ensure the cell_value is not None
          if "Defect" in cell_value:
@@ -409,6 +371,7 @@ if "Defects" in workbook.sheetnames:
 Defects_sheet.delete_cols(8)  # Delete column H (8th column)
 Defects_sheet.delete_cols(8)  # Delete column I (now the 8th column after deletion of previous column J)
 Defects_sheet.delete_cols(8)  # Delete column J    
+excel_styles.refresh_hyperlinks(Defects_sheet)  # the deleted columns moved the link cells
 
 # Ensure only one active sheet and it's visible
 workbook.active = workbook[workbook.sheetnames[0]]
@@ -416,78 +379,32 @@ workbook.active.sheet_state = 'visible'
 
 # Save the updated workbook
 workbook.save(output_filename)
+run_metrics.end_stage()
 
 print(f"Issues successfully written to {output_filename} with additional columns including 'Release1.8items' sheet.")
+
+# Static Pod x Status and IssueType x Milestone counts, so nobody has to build them on top of the formula columns
+if report_views.summary_enabled():
+    with run_metrics.stage("write:summary sheets"):
+        board_views = {project_title: report_views.build_board_view(df, project_title) for project_title, df in project_dataframes.items()}
+        with pd.ExcelWriter(output_filename, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+            for sheet_name, df in report_views.build_summary_tables(board_views).items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(f"Summary sheets written to {output_filename}.")
+
 ## Begin write to a .MD file
 
 # Load workbook containing the 'Features' sheet
 workbook = load_workbook(output_filename, data_only=True)
 
-# Load the 'Features' sheet into a pandas DataFrame
+# Load the 'Features' and 'Defects' sheets into pandas DataFrames
 df_features = pd.read_excel(output_filename, sheet_name="Features")
+df_defects = pd.read_excel(output_filename, sheet_name="Defects")
 
-# Prepare to create the Markdown file
-md_filename = "Release_Notes.md"
-
-def fetch_issue_body(issue_url, token):
-    issue_number = issue_url.split('/')[-1]
-    repo_owner = "kpmg-global-technology-and-knowledge"
-    repo_name = "Digital-matrix-app"
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/issues/{issue_number}"
-
-    headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(api_url, headers=headers)
-    if response.status_code == 200:
-        issue_data = response.json()
-        body = issue_data.get("body", "No description available.")
-        #print(f"Original Body: {body}")  # Debugging line to show the original body
-        body = issue_data.get("body", "No description available.")
-    
-    # Remove multiple line breaks
-    body = re.sub(r'\n\s*\n', '\n', body).strip()
-    
-    # Regex pattern to find the "Acceptance Criteria" section more flexibly
-    pattern = r'\n\s*##\s*Acceptance Criteria\s*\n'
-    split_body = re.split(pattern, body, flags=re.IGNORECASE)
-    
-    if len(split_body) > 1:
-        truncated_body = split_body[0]
-    else:
-        truncated_body = body  # No "Acceptance Criteria" found, return the full body
-    
-    # Remove references to 'Charge Code' (case-insensitive)
-    charge_code_pattern = r'(?i)charge codes?\b[^\n]*'
-    truncated_body = re.sub(charge_code_pattern, '', truncated_body)
-    # Remove any residual multiple newlines from charge code removal
-    truncated_body = re.sub(r'\n\s*\n', '\n', truncated_body).strip()
-
-    return truncated_body
-    
 # Create the Markdown content
-with open(md_filename, 'w', encoding='utf-8') as md_file:
-    md_file.write("# Release Notes\n\n")
-    
-    for index, row in df_features.iterrows():
-        feature_title = row['Title']
-        issue_url = row['URL']
+write_release_notes(df_features, df_defects, md_filename)
 
-         # Fetch the issue body using the URL
-        issue_body = fetch_issue_body(issue_url, token)
+print(f"Release notes successfully written to {md_filename}.")
 
-        # Ensure issue_body is a string
-        issue_body = str(issue_body) if issue_body else ""
-        # Write the feature title and issue body to the Markdown file with formatting
-        md_file.write(f"## **{feature_title}**\n\n")
-        md_file.write(f"*{issue_body}*\n\n")
-        md_file.write(f"[Issue Link]({issue_url})\n\n")
-
-        defect_body =fetch_defects_content(output_filename)  
-        
-        # Ensure issue_body is a string
-        defect_body = str(defect_body) if defect_body else ""
-        # Write the feature title and issue body to the Markdown file with formatting
-        md_file.write("## **List of Defects**\n\n")
-        md_file.write(f"*{defect_body}*\n\n")
-        #md_file.write(f"[Issue Link]({issue_url})\n\n")
-
-print(f"Release notes successfully written to {md_filename}.")
\ No newline at end of file
+# Write the run metrics next to the output workbook
+run_metrics.write_metrics(output_filename)
\ No newline at end of file
@@ -0,0 +1,127 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Cache file for issue bodies, kept next to the reports; ISSUE_BODY_CACHE overrides it (ISSUE_BODY_CACHE=0 turns caching off)
+DEFAULT_CACHE_FILE = "issue_body_cache.json"
+
+# Most issue bodies kept in the cache; the least recently used ones are dropped first
+DEFAULT_CACHE_SIZE = 5000
+
+# Cached bodies in least- to most-recently-used order, keyed by repo, issue number and updatedAt
+_entries = OrderedDict()
+# Latest cached key for each issue, so an edited issue replaces its old body instead of piling up
+_latest = {}
+_lock = threading.Lock()
+_state = {'path': None, 'max_entries': DEFAULT_CACHE_SIZE, 'hits': 0, 'misses': 0, 'dirty': False}
+
+
+# Function to strip an issue body down for the release notes: collapse blank lines, cut at "Acceptance Criteria", drop Charge Code lines
+def clean_issue_body(body):
+    # Remove multiple line breaks
+    body = re.sub(r'\n\s*\n', '\n', body).strip()
+
+    # Regex pattern to find the "Acceptance Criteria" section more flexibly
+    pattern = r'\n\s*##\s*Acceptance Criteria\s*\n'
+    split_body = re.split(pattern, body, flags=re.IGNORECASE)
+
+    if len(split_body) > 1:
+        truncated_body = split_body[0]
+    else:
+        truncated_body = body  # No "Acceptance Criteria" found, return the full body
+
+    # Remove references to 'Charge Code' (case-insensitive)
+    charge_code_pattern = r'(?i)charge codes?\b[^\n]*'
+    truncated_body = re.sub(charge_code_pattern, '', truncated_body)
+    # Remove any residual multiple newlines from charge code removal
+    truncated_body = re.sub(r'\n\s*\n', '\n', truncated_body).strip()
+    return truncated_body
+
+
+def _issue_id(repo, number):
+    return f"{repo.lower()}#{number}"
+
+
+def _cache_key(repo, number, updated_at):
+    if updated_at is None or (not isinstance(updated_at, str) and pd.isna(updated_at)) or updated_at == '':
+        return None
+    return f"{_issue_id(repo, number)}@{updated_at}"
+
+
+# Function to load the body cache from disk; path and size default to ISSUE_BODY_CACHE and ISSUE_BODY_CACHE_SIZE
+def load_body_cache(path=None, max_entries=None):
+    path = path or os.environ.get("ISSUE_BODY_CACHE", DEFAULT_CACHE_FILE)
+    max_entries = max_entries or int(os.environ.get("ISSUE_BODY_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+    with _lock:
+        _entries.clear()
+        _latest.clear()
+        _state.update({'path': None if path in ("0", "") else path, 'max_entries': max_entries, 'hits': 0, 'misses': 0, 'dirty': False})
+        if _state['path'] and os.path.exists(_state['path']):
+            try:
+                with open(_state['path'], 'r', encoding='utf-8') as cache_file:
+                    stored = json.load(cache_file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable issue body cache {_state['path']}: {e}")
+                stored = {}
+            for key, entry in stored.get('entries', []):
+                _entries[key] = entry
+                _latest[key.rsplit('@', 1)[0]] = key
+            _evict()
+    return _state['path']
+
+
+def _evict():
+    while len(_entries) > _state['max_entries']:
+        key, _ = _entries.popitem(last=False)
+        issue_id = key.rsplit('@', 1)[0]
+        if _latest.get(issue_id) == key:
+            del _latest[issue_id]
+
+
+# Function to look up a cached body; returns {'raw': ..., 'clean': ...} or None when the issue changed or was never cached
+def cached_body(repo, number, updated_at):
+    key = _cache_key(repo, number, updated_at)
+    with _lock:
+        if key is None or _state['path'] is None or key not in _entries:
+            _state['misses'] += 1
+            return None
+        _entries.move_to_end(key)
+        _state['hits'] += 1
+        return _entries[key]
+
+
+# Function to cache the raw and cleaned body of an issue at its updatedAt, replacing any older version of that issue
+def store_body(repo, number, updated_at, raw, clean):
+    key = _cache_key(repo, number, updated_at)
+    if key is None:
+        return
+    with _lock:
+        if _state['path'] is None:
+            return
+        issue_id = _issue_id(repo, number)
+        previous = _latest.get(issue_id)
+        if previous and previous != key:
+            _entries.pop(previous, None)
+        _entries[key] = {'raw': raw, 'clean': clean}
+        _entries.move_to_end(key)
+        _latest[issue_id] = key
+        _state['dirty'] = True
+        _evict()
+
+
+# Function to write the cache back to disk (atomically, so an interrupted run can't leave a broken file)
+def save_body_cache():
+    with _lock:
+        if _state['path'] is None:
+            return
+        if _state['dirty']:
+            temp_path = f"{_state['path']}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump({'entries': list(_entries.items())}, cache_file)
+            os.replace(temp_path, _state['path'])
+            _state['dirty'] = False
+    print(f"Issue body cache: {_state['hits']} hits, {_state['misses']} misses, {len(_entries)} bodies kept in {_state['path']}")
@@ -0,0 +1,255 @@
+import json
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import pandas as pd
+
+import report_views
+
+# SQLite file the fetched boards are kept in for query_issues.py when ISSUE_STORE=1; ISSUE_STORE=<path> picks another file.
+# Off by default, as it rewrites the store on every run and webhook.
+DEFAULT_STORE_FILE = "issues.db"
+
+# Stored columns of a board view: SQL column name -> board sheet column
+ITEM_COLUMNS = {
+    "title": "Title",
+    "url": "URL",
+    "created_at": "Created At",
+    "updated_at": "Updated At",
+    "state": "State",
+    "author": "Author",
+    "labels": "Labels",
+    "label_status": "LabelStatus",
+    "issue_type": "LabelIssueType",
+    "pod": "Pod",
+    "is_defect": "IsDefect",
+    "milestone": "Milestone",
+    "link": "GitHub Link ",
+    "board": "POD Project ",
+    "status": "Status",
+}
+
+# Names a filter or group-by can use for each column (sheet headers of the boards and the views, and the SQL names)
+COLUMN_ALIASES = {name.strip().lower(): column for column, name in ITEM_COLUMNS.items()}
+COLUMN_ALIASES.update({column: column for column in ITEM_COLUMNS})
+COLUMN_ALIASES.update({"issuetype": "issue_type", "github link": "link", "pod project": "board", "label": "label"})
+
+# Date columns a date range can apply to
+DATE_COLUMNS = {"created": "created_at", "updated": "updated_at"}
+
+schema = '''
+CREATE TABLE IF NOT EXISTS boards (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    saved_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    board TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    title TEXT, url TEXT, created_at TEXT, updated_at TEXT, state TEXT, author TEXT, labels TEXT,
+    label_status TEXT, issue_type TEXT, pod TEXT, is_defect TEXT, milestone TEXT, link TEXT, status TEXT,
+    fields TEXT,
+    PRIMARY KEY (board, row)
+);
+CREATE TABLE IF NOT EXISTS item_labels (
+    board TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_url ON items (url);
+CREATE INDEX IF NOT EXISTS items_pod ON items (pod);
+CREATE INDEX IF NOT EXISTS items_status ON items (status);
+CREATE INDEX IF NOT EXISTS items_author ON items (author);
+CREATE INDEX IF NOT EXISTS items_milestone ON items (milestone);
+CREATE INDEX IF NOT EXISTS items_issue_type ON items (issue_type);
+CREATE INDEX IF NOT EXISTS items_created_at ON items (created_at);
+CREATE INDEX IF NOT EXISTS items_updated_at ON items (updated_at);
+CREATE INDEX IF NOT EXISTS item_labels_label ON item_labels (label);
+CREATE INDEX IF NOT EXISTS item_labels_item ON item_labels (board, row);
+'''
+
+# SQL views with the same rows and order as report_views.build_release_views; filled in with the release milestones.
+# They are recreated on every connect so a change to RELEASE_MILESTONES takes effect straight away.
+views_template = '''
+DROP VIEW IF EXISTS board_items;
+DROP VIEW IF EXISTS release_items;
+DROP VIEW IF EXISTS defect_items;
+DROP VIEW IF EXISTS feature_items;
+CREATE VIEW board_items AS
+    SELECT items.*, boards.position AS board_position FROM items JOIN boards ON boards.name = items.board;
+CREATE VIEW release_items AS
+    SELECT * FROM (
+        SELECT board_items.*, ROW_NUMBER() OVER (PARTITION BY url ORDER BY board_position, row) AS url_rank
+        FROM board_items WHERE milestone IN (%s)
+    ) WHERE url_rank = 1;
+CREATE VIEW defect_items AS
+    SELECT board, row, title, url, created_at, updated_at, state, author, labels, label_status, issue_type, pod,
+           'Defect' AS is_defect, milestone, link, status, fields, board_position FROM (
+        SELECT board_items.*, ROW_NUMBER() OVER (PARTITION BY url ORDER BY board_position, row) AS url_rank
+        FROM board_items WHERE instr(coalesce(labels, ''), 'Defect') > 0
+    ) WHERE url_rank = 1;
+CREATE VIEW feature_items AS
+    SELECT board, row, title, url, created_at, updated_at, state, author, labels, label_status,
+           CASE WHEN coalesce(labels, '') <> '' THEN 'Feature' ELSE issue_type END AS issue_type,
+           pod, is_defect, milestone, link, status, fields, board_position
+    FROM release_items WHERE coalesce(labels, '') = '' OR instr(labels, 'Feature') > 0;
+'''
+
+# Queryable views: name -> (SQL view, columns in the order of the matching sheet)
+VIEWS = {
+    "items": ("board_items", report_views.BOARD_COLUMNS),
+    "Release1.8items": ("release_items", report_views.VIEW_COLUMNS),
+    "Defects": ("defect_items", report_views.DEFECT_COLUMNS),
+    "Features": ("feature_items", report_views.FEATURE_COLUMNS),
+}
+
+# Sheet column -> SQL column for every column a view can return
+SHEET_COLUMNS = {name: column for column, name in ITEM_COLUMNS.items()}
+SHEET_COLUMNS.update({"IssueType": "issue_type", "GitHub Link": "link", "Pod Project": "board"})
+
+
+# Function to read the store path for this run (None when the store is off)
+def store_path():
+    path = os.environ.get("ISSUE_STORE", "0").strip()
+    if path.lower() in ("", "0", "false", "no"):
+        return None
+    return DEFAULT_STORE_FILE if path.lower() in ("1", "true", "yes") else path
+
+
+# Function to open the store, creating the tables, indexes and views when needed
+def connect(path=None):
+    conn = sqlite3.connect(path or store_path() or DEFAULT_STORE_FILE)
+    conn.executescript(schema)
+    milestones = ", ".join("'" + milestone.replace("'", "''") + "'" for milestone in report_views.RELEASE_MILESTONES)
+    conn.executescript(views_template % milestones)
+    return conn
+
+
+def _text(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return str(value)
+
+
+# Function to turn a board view into its stored rows: one items row per view row, and its (board, row, label) rows
+def board_rows(board_name, board_view):
+    extra_columns = [column for column in board_view.columns if column not in report_views.BOARD_COLUMNS]
+    rows = []
+    labels = []
+    for row, record in enumerate(board_view.to_dict(orient='records')):
+        values = [_text(record.get(name)) for name in ITEM_COLUMNS.values()]
+        values[list(ITEM_COLUMNS).index("board")] = board_name
+        fields = {column: _text(record.get(column)) for column in extra_columns}
+        rows.append([board_name, row] + values + [json.dumps(fields) if fields else None])
+        labels.append([(board_name, row, label) for label in (record.get('Labels') or '').split(", ")
+                       if label] if isinstance(record.get('Labels'), str) else [])
+    return rows, labels
+
+
+# Function to replace the stored rows of one board with its board view (as built by report_views.build_board_view).
+# With previous_view, the view the store last saved for the board, only the rows that differ from it are rewritten
+# (e.g. the one issue a webhook changed). Returns the number of rows written.
+def save_board(conn, board_name, board_view, previous_view=None):
+    rows, labels = board_rows(board_name, board_view)
+    if previous_view is None:
+        changed = list(range(len(rows)))
+        kept = 0
+    else:
+        previous_rows, _ = board_rows(board_name, previous_view)
+        changed = [row for row in range(len(rows)) if row >= len(previous_rows) or rows[row] != previous_rows[row]]
+        kept = len(previous_rows)
+
+    with conn:
+        position = conn.execute("SELECT position FROM boards WHERE name = ?", (board_name,)).fetchone()
+        if position is None:
+            position = conn.execute("SELECT coalesce(max(position) + 1, 0) FROM boards").fetchone()
+        conn.execute("INSERT OR REPLACE INTO boards (name, position, saved_at) VALUES (?, ?, datetime('now'))", (board_name, position[0]))
+        if previous_view is None:
+            conn.execute("DELETE FROM items WHERE board = ?", (board_name,))
+            conn.execute("DELETE FROM item_labels WHERE board = ?", (board_name,))
+        else:
+            # Rows past the end of a shorter view go; the changed rows are replaced below
+            stale = [(board_name, row) for row in changed if row < kept] + [(board_name, row) for row in range(len(rows), kept)]
+            conn.executemany("DELETE FROM items WHERE board = ? AND row = ?", stale)
+            conn.executemany("DELETE FROM item_labels WHERE board = ? AND row = ?", stale)
+        placeholders = ", ".join("?" * (len(ITEM_COLUMNS) + 3))
+        conn.executemany(f"INSERT INTO items (board, row, {', '.join(ITEM_COLUMNS)}, fields) VALUES ({placeholders})", [rows[row] for row in changed])
+        conn.executemany("INSERT INTO item_labels (board, row, label) VALUES (?, ?, ?)", [label for row in changed for label in labels[row]])
+    return len(changed)
+
+
+# Function to store every fetched board (board name -> fetched DataFrame) in the store for this run, if it is on
+def save_boards(project_dataframes, path=None):
+    path = path or store_path()
+    if path is None:
+        return None
+    conn = connect(path)
+    try:
+        for board_name, df in project_dataframes.items():
+            save_board(conn, board_name, report_views.build_board_view(df, board_name))
+    finally:
+        conn.close()
+    print(f"Boards saved to the issue store {path}")
+    return path
+
+
+def _column_sql(name, params):
+    column = COLUMN_ALIASES.get(name.strip().lower())
+    # Columns are qualified with the view alias, as a group-by on labels joins item_labels, which has board and row too
+    if column is not None and column != "label":
+        return f"v.{column}"
+    # Anything else is an extra project field kept in the fields JSON
+    params.append(f'$."{name}"')
+    return "json_extract(v.fields, ?)"
+
+
+# Function to query a view with filters and an optional group-by, without touching the network.
+# where maps a column (sheet header or SQL name, or an extra project field) to a value or list of values;
+# labels keeps items carrying every listed label; date_from/date_to (YYYY-MM-DD, inclusive) apply to date_field.
+# With group_by the result is one row per group with a Count column, largest first.
+def query(conn, view="items", where=None, labels=None, date_field="updated", date_from=None, date_to=None, group_by=None):
+    if view not in VIEWS:
+        raise ValueError(f"Unknown view {view}; choose from {', '.join(VIEWS)}")
+    source, columns = VIEWS[view]
+    clauses = []
+    params = []
+    for name, values in (where or {}).items():
+        values = values if isinstance(values, (list, tuple)) else [values]
+        column = _column_sql(name, params)
+        clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+    for label in labels or []:
+        clauses.append("EXISTS (SELECT 1 FROM item_labels l WHERE l.board = v.board AND l.row = v.row AND l.label = ?)")
+        params.append(label)
+    if date_from or date_to:
+        date_column = DATE_COLUMNS.get(date_field)
+        if date_column is None:
+            raise ValueError(f"Unknown date field {date_field}; choose created or updated")
+        if date_from:
+            clauses.append(f"v.{date_column} >= ?")
+            params.append(date.fromisoformat(date_from).isoformat())
+        if date_to:
+            clauses.append(f"v.{date_column} < ?")
+            params.append((date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+    where_sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    if group_by:
+        select_params = []
+        group_columns = []
+        joins = ""
+        for name in group_by:
+            if COLUMN_ALIASES.get(name.strip().lower()) == "label":
+                # One row per label: an item with three labels counts once in each of them
+                joins = " JOIN item_labels gl ON gl.board = v.board AND gl.row = v.row"
+                group_columns.append(("gl.label", name))
+            else:
+                group_columns.append((_column_sql(name, select_params), name))
+        select_list = ", ".join(f'{column} AS "{name}"' for column, name in group_columns)
+        group_list = ", ".join(str(index + 1) for index in range(len(group_columns)))
+        sql = f'SELECT {select_list}, COUNT(*) AS "Count" FROM {source} v{joins}{where_sql} GROUP BY {group_list} ORDER BY "Count" DESC, {group_list}'
+        return pd.read_sql_query(sql, conn, params=select_params + params)
+
+    select_list = ", ".join(f'{SHEET_COLUMNS[name]} AS "{name}"' for name in columns)
+    sql = f"SELECT {select_list} FROM {source} v{where_sql} ORDER BY v.board_position, v.row"
+    return pd.read_sql_query(sql, conn, params=params)
@@ -0,0 +1,237 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+import run_metrics
+
+GRAPHQL_URL = f"{run_metrics.github_api_url()}/graphql"
+
+# Issues looked up per GraphQL request; each is one aliased issue(number:) field under an aliased repository
+TIMELINE_BATCH_SIZE = 25
+
+# Timeline events fetched per issue and page; issues with more follow up with their own cursors
+TIMELINE_PAGE_SIZE = 100
+
+# Project statuses that mark the start of work for the cycle time, e.g. TIMELINE_START_STATUSES=In Progress,In Review
+DEFAULT_START_STATUSES = "In Progress"
+
+# Sheets added by the timeline stage: one row per board item, and the medians per Pod and milestone
+TIMELINE_SHEET = "Cycle Time"
+TIMELINE_SUMMARY_SHEET = "Cycle Time by Pod"
+TIMELINE_COLUMNS = ["Board", "URL", "Title", "Pod", "Milestone", "Status", "Created At", "Started At", "Closed At", "Reopened", "Status Changes", "Label Changes", "Lead Time (Days)", "Cycle Time (Days)"]
+
+timeline_fields_template = '''
+      timelineItems(first: %d%s, itemTypes: [LABELED_EVENT, UNLABELED_EVENT, CLOSED_EVENT, REOPENED_EVENT, PROJECT_V2_ITEM_STATUS_CHANGED_EVENT]) {
+        pageInfo {
+          hasNextPage
+          endCursor
+        }
+        nodes {
+          __typename
+          ... on LabeledEvent {
+            createdAt
+            label {
+              name
+            }
+          }
+          ... on UnlabeledEvent {
+            createdAt
+            label {
+              name
+            }
+          }
+          ... on ClosedEvent {
+            createdAt
+          }
+          ... on ReopenedEvent {
+            createdAt
+          }
+          ... on ProjectV2ItemStatusChangedEvent {
+            createdAt
+            previousStatus
+            status
+            project {
+              number
+            }
+          }
+        }
+      }
+'''
+
+query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+%s
+}
+'''
+
+
+# Function to read whether the timeline stage runs (ISSUE_TIMELINES=1; off by default as it costs a request per batch of issues)
+def timelines_enabled():
+    return os.environ.get("ISSUE_TIMELINES", "0").strip() not in ("0", "false", "no", "")
+
+
+# Function to read how many timeline requests run at once, e.g. TIMELINE_WORKERS=8
+def timeline_workers():
+    return max(1, int(os.environ.get("TIMELINE_WORKERS", "4")))
+
+
+# Function to read the project statuses that start the cycle time
+def start_statuses():
+    value = os.environ.get("TIMELINE_START_STATUSES", DEFAULT_START_STATUSES)
+    return [status.strip() for status in value.split(",") if status.strip()]
+
+
+# Function to split an issue URL into (owner, repo, number); pull requests and drafts have no issue timeline and give None
+def parse_issue_url(url):
+    match = re.match(r'https://github\.com/([^/]+)/([^/]+)/issues/(\d+)$', url or "")
+    return (match.group(1), match.group(2), int(match.group(3))) if match else None
+
+
+# Function to build one GraphQL query for a batch of (url, cursor) pairs; returns the query and alias -> url
+def build_timeline_query(batch, issues):
+    repositories = {}
+    for url, cursor in batch:
+        owner, repo, number = issues[url]
+        repositories.setdefault((owner, repo), []).append((url, number, cursor))
+    aliases = {}
+    blocks = []
+    for repo_index, ((owner, repo), entries) in enumerate(repositories.items()):
+        fields = []
+        for url, number, cursor in entries:
+            alias = f"i{number}"
+            aliases[(f"r{repo_index}", alias)] = url
+            after = f', after: "{cursor}"' if cursor else ""
+            fields.append(f"    {alias}: issue(number: {number}) {{{timeline_fields_template % (TIMELINE_PAGE_SIZE, after)}    }}")
+        blocks.append(f'  r{repo_index}: repository(owner: "{owner}", name: "{repo}") {{\n' + "\n".join(fields) + "\n  }")
+    return query_template % "\n".join(blocks), aliases
+
+
+# Function to turn one timeline node into a flat event
+def timeline_event(node):
+    return {
+        "type": node.get('__typename'),
+        "at": node.get('createdAt'),
+        "label": (node.get('label') or {}).get('name'),
+        "status": node.get('status'),
+        "previous": node.get('previousStatus'),
+        "project": (node.get('project') or {}).get('number'),
+    }
+
+
+# Function to fetch one batch of timeline pages; returns url -> (events, cursor of the next page or None)
+def _fetch_timeline_batch(batch, issues, headers):
+    query, aliases = build_timeline_query(batch, issues)
+    response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers=headers)
+    if response.status_code != 200:
+        print(f"Failed to fetch issue timelines. Status Code: {response.status_code}. Response: {response.text}")
+        return {}
+    data = response.json()
+    run_metrics.record_rate_limit(data)
+
+    # A missing or inaccessible issue only nulls its own alias, so keep whatever did resolve
+    if "errors" in data:
+        print(f"Error fetching issue timelines: {data['errors']}")
+    results = {}
+    for (repo_alias, issue_alias), url in aliases.items():
+        issue = ((data.get('data') or {}).get(repo_alias) or {}).get(issue_alias)
+        if not issue:
+            continue
+        timeline = issue['timelineItems']
+        next_cursor = timeline['pageInfo']['endCursor'] if timeline['pageInfo']['hasNextPage'] else None
+        results[url] = ([timeline_event(node) for node in timeline['nodes'] if node], next_cursor)
+    return results
+
+
+# Function to fetch the timelines of many issues, TIMELINE_BATCH_SIZE per request and max_workers requests at once.
+# Only issues whose first page ran out ask for more, each from its own cursor, until every timeline is complete.
+# Returns issue URL -> events in timeline order; URLs that aren't issues or can't be resolved are left out.
+def fetch_issue_timelines(urls, token, batch_size=TIMELINE_BATCH_SIZE, max_workers=None):
+    max_workers = max_workers or timeline_workers()
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    issues = {}
+    for url in urls:
+        parsed = parse_issue_url(url)
+        if parsed and url not in issues:
+            issues[url] = parsed
+
+    timelines = {}
+    pending = [(url, None) for url in issues]
+    while pending:
+        batches = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        print(f"Fetching timelines of {len(pending)} issues in {len(batches)} requests")
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            results = list(executor.map(lambda batch: _fetch_timeline_batch(batch, issues, headers), batches))
+        pending = []
+        for result in results:
+            for url, (events, next_cursor) in result.items():
+                timelines.setdefault(url, []).extend(events)
+                if next_cursor:
+                    pending.append((url, next_cursor))
+    return timelines
+
+
+# Function to work out the days between two GitHub timestamps (blank when either is missing)
+def _days_between(start, end):
+    if not start or not end:
+        return ""
+    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
+    return round((end_dt - start_dt).total_seconds() / 86400, 1)
+
+
+# Function to work out the timeline values of one board item, from Started At to Cycle Time in TIMELINE_COLUMNS order.
+# Status changes only count for the item's own project when its number is known; the cycle starts at the first move
+# into a start status, and an issue reopened after its last close has no Closed At.
+def timeline_values(created_at, events, project_number=None, statuses=None):
+    statuses = start_statuses() if statuses is None else statuses
+    events = sorted(events, key=lambda event: event["at"] or "")
+    status_events = [event for event in events if event["type"] == "ProjectV2ItemStatusChangedEvent"
+                     and (project_number is None or event["project"] in (None, project_number))]
+    started_at = next((event["at"] for event in status_events if event["status"] in statuses), "")
+    closed_at = ""
+    for event in events:
+        if event["type"] == "ClosedEvent":
+            closed_at = event["at"]
+        elif event["type"] == "ReopenedEvent":
+            closed_at = ""
+    return [
+        started_at,
+        closed_at,
+        sum(1 for event in events if event["type"] == "ReopenedEvent"),
+        len(status_events),
+        sum(1 for event in events if event["type"] in ("LabeledEvent", "UnlabeledEvent")),
+        _days_between(created_at, closed_at),
+        _days_between(started_at, closed_at),
+    ]
+
+
+# Function to build the timeline sheets from the board views (board name -> report_views.build_board_view) and the
+# fetched timelines; board_projects maps a board name to its project number so each board counts its own status changes
+def build_timeline_tables(board_views, timelines, board_projects=None):
+    rows = []
+    for board_name, board in board_views.items():
+        project_number = (board_projects or {}).get(board_name)
+        for record in board.to_dict(orient='records'):
+            if record["URL"] not in timelines:
+                continue
+            rows.append([board_name, record["URL"], record["Title"], record["Pod"], record["Milestone"], record.get("Status"), record["Created At"]]
+                        + timeline_values(record["Created At"], timelines[record["URL"]], project_number))
+    items = pd.DataFrame(rows, columns=TIMELINE_COLUMNS)
+
+    durations = items.assign(**{column: pd.to_numeric(items[column], errors="coerce") for column in ("Lead Time (Days)", "Cycle Time (Days)")})
+    summary = durations.fillna({"Pod": "", "Milestone": ""}).groupby(["Pod", "Milestone"]).agg(**{
+        "Items": ("URL", "size"),
+        "Closed": ("Lead Time (Days)", "count"),
+        "Median Lead Time (Days)": ("Lead Time (Days)", "median"),
+        "Median Cycle Time (Days)": ("Cycle Time (Days)", "median"),
+    }).reset_index()
+    return {TIMELINE_SHEET: items, TIMELINE_SUMMARY_SHEET: summary}
@@ -0,0 +1,391 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import calendar
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+# Local stand-in for the parts of the GitHub API these scripts use, for load and retry testing without network access:
+#
+#   GET  /repos/<owner>/<repo>/issues?state=all&page=&per_page=    issues and pull requests, like GitHub's issues endpoint
+#   GET  /repos/<owner>/<repo>/pulls?state=all&page=&per_page=     pull requests
+#   GET  /repos/<owner>/<repo>/issues/<number>                     one issue (release-note bodies)
+#   POST /graphql                                                  organization.projectV2.items pages (full and lean queries),
+#                                                                  organization.projectV2.fields (the field schema),
+#                                                                  node(id:) for one item (webhooks) and the aliased follow-up
+#                                                                  pages of labels and fieldValues, aliased pullRequest(number:)
+#                                                                  lookups with their reviews (pull request enrichment) and
+#                                                                  aliased issue(number:) timelineItems (ISSUE_TIMELINES)
+#
+# REST pages carry Link (first/prev/next/last) and ETag headers and answer If-None-Match with 304. Every item is
+# generated from its index and --seed, so a 100k-item board costs no memory and two runs see the same data.
+# --latency-ms and --item-latency-ms slow responses down, --error-rate answers a share of requests with 502,
+# --max-page-size fails larger project pages with 502 (as GitHub does on timeouts) and --rate-limit caps requests per hour.
+# --extra-labels gives every issue that many more labels, so item label lists run past their first page, and
+# --reviews-per-pull sets the most reviews a pull request gets, so review lists can run past theirs.
+# Usage: python mock_github_server.py --items 100000 --latency-ms 200, then run a script with
+#        GITHUB_API_URL=http://127.0.0.1:8790 (any token in github_token.txt works)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8790
+
+# Largest page GitHub serves, on both APIs
+MAX_PER_PAGE = 100
+
+LABELS = ["Feature", "Defect", "Task", "User Story", "Epic", "Pod: Alpha", "Pod: Beta", "Pod: Gamma", "Status: Ready", "Status: Blocked"]
+MILESTONES = ["Release 1.6.0", "Release 1.7.0", "Release 1.8.0", "Release 2.0", None]
+STATUSES = ["Todo", "In Progress", "In Review", "Done"]
+AUTHORS = ["alice_kpmg", "bob_kpmg", "carol_kpmg", "dave_kpmg"]
+
+settings = {}
+_lock = threading.Lock()
+_state = {'window_start': time.time(), 'used': 0, 'requests': 0, 'org': "synthetic-org"}
+
+
+# Function to build issue number n the same way on every request (every fifth issue is a pull request, like on GitHub)
+def synthetic_issue(owner, repo, number):
+    rng = random.Random(f"{settings['seed']}/{number}")
+    created = 1704067200 + number * 600
+    updated = created + rng.randint(0, 90 * 86400)
+    issue = {
+        'number': number,
+        'title': f"Synthetic issue {number}",
+        'body': f"Generated issue {number}.\n\n## Acceptance Criteria\n- works",
+        'user': {'login': rng.choice(AUTHORS)},
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created)),
+        'updated_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(updated)),
+        'state': rng.choice(["open", "open", "closed"]),
+        'assignees': [{'login': login} for login in rng.sample(AUTHORS, rng.randint(0, 2))],
+        'labels': [{'name': name} for name in rng.sample(LABELS, rng.randint(0, 3))],
+        'milestone': (lambda title: {'title': title} if title else None)(rng.choice(MILESTONES)),
+        'html_url': f"https://github.com/{owner}/{repo}/issues/{number}",
+        'requested_reviewers': [],
+    }
+    if number % 5 == 0:
+        issue['html_url'] = f"https://github.com/{owner}/{repo}/pull/{number}"
+        issue['pull_request'] = {'url': issue['html_url']}
+    return issue
+
+
+# Function to list every label of issue n: its generated labels, then the --extra-labels ones
+def synthetic_labels(issue):
+    return [label['name'] for label in issue['labels']] + [f"Tag {index + 1}" for index in range(settings['extra_labels'])]
+
+
+# Function to read a page of a list from a cursor (the cursor is the offset of the page, as a string)
+def connection_page(values, first, after=None):
+    start = int(after) if after else 0
+    end = min(start + first, len(values))
+    return {'pageInfo': {'endCursor': str(end), 'hasNextPage': end < len(values)}, 'nodes': values[start:end]}
+
+
+# Function to build the reviews of pull request n, oldest first
+def synthetic_reviews(number):
+    rng = random.Random(f"{settings['seed']}/reviews/{number}")
+    submitted = 1704067200 + number * 600
+    reviews = []
+    for _ in range(rng.randint(0, settings['reviews_per_pull'])):
+        submitted += rng.randint(600, 86400)
+        reviews.append({'author': {'login': rng.choice(AUTHORS)}, 'state': rng.choice(["COMMENTED", "APPROVED", "CHANGES_REQUESTED"]),
+                        'submittedAt': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(submitted))})
+    return reviews
+
+
+# Function to build the pullRequest node of pull request n for the enrichment query, with one page of its reviews
+def synthetic_pull(owner, repo, number, first, after=None):
+    issue = synthetic_issue(owner, repo, number)
+    rng = random.Random(f"{settings['seed']}/pull/{number}")
+    reviews = synthetic_reviews(number)
+    return {
+        'number': number,
+        'createdAt': issue['created_at'],
+        'mergedAt': issue['updated_at'] if issue['state'] == "closed" else None,
+        'additions': rng.randint(1, 500),
+        'deletions': rng.randint(0, 200),
+        'changedFiles': rng.randint(1, 20),
+        'commits': {'totalCount': rng.randint(1, 10)},
+        'reviews': dict(connection_page(reviews, first, after), totalCount=len(reviews)),
+    }
+
+
+# Function to build the timeline of issue n: its labels being added, Status moves through the statuses up to a random one,
+# and a close for closed issues, in time order
+def synthetic_timeline(owner, repo, number):
+    issue = synthetic_issue(owner, repo, number)
+    rng = random.Random(f"{settings['seed']}/timeline/{number}")
+    at = calendar.timegm(time.strptime(issue['created_at'], "%Y-%m-%dT%H:%M:%SZ"))
+    events = []
+    for label in synthetic_labels(issue):
+        at += rng.randint(60, 3600)
+        events.append({'__typename': "LabeledEvent", 'createdAt': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(at)), 'label': {'name': label}})
+    for previous, status in zip(STATUSES, STATUSES[1:rng.randint(1, len(STATUSES))]):
+        at += rng.randint(3600, 5 * 86400)
+        events.append({'__typename': "ProjectV2ItemStatusChangedEvent", 'createdAt': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(at)),
+                       'previousStatus': previous, 'status': status, 'project': None})
+    if issue['state'] == "closed":
+        at += rng.randint(3600, 5 * 86400)
+        events.append({'__typename': "ClosedEvent", 'createdAt': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(at))})
+    return events
+
+
+# Function to build the project item at one position of a board; the Status differs per project
+def synthetic_item(org, project_number, index):
+    issue = synthetic_issue(org, "synthetic-repo", index + 1)
+    status = random.Random(f"{settings['seed']}/{project_number}/{index}").choice(STATUSES)
+    content = {
+        'id': f"I_{index + 1}",
+        'number': issue['number'],
+        'title': issue['title'],
+        'url': f"https://github.com/{org}/synthetic-repo/issues/{issue['number']}",
+        'createdAt': issue['created_at'],
+        'updatedAt': issue['updated_at'],
+        'state': issue['state'].upper(),
+        'author': {'login': issue['user']['login']},
+        'labels': connection_page([{'name': name} for name in synthetic_labels(issue)], 10),
+        'milestone': issue['milestone'],
+    }
+    return {
+        'id': f"PVTI_{project_number}_{index}",
+        'content': content,
+        # Both query shapes: fieldValues for the full query, the status alias for the lean one
+        'fieldValues': connection_page(synthetic_field_values(status), 100),
+        'status': {'name': status},
+    }
+
+
+# Function to list the field values of an item with the given Status
+def synthetic_field_values(status):
+    return [{'field': {'id': "F_status", 'name': "Status"}, 'optionId': f"O_{STATUSES.index(status)}", 'name': status}]
+
+
+# Function to find the aliased fields of a GraphQL query in order: (alias, field name, arguments, selection text up to the next one)
+def aliased_fields(graphql_query):
+    matches = list(re.finditer(r'(?:(\w+):\s*)?\b(repository|node|pullRequest|issue)\(([^)]*)\)', graphql_query))
+    return [(match.group(1), match.group(2), match.group(3), graphql_query[match.end():matches[position + 1].start() if position + 1 < len(matches) else None])
+            for position, match in enumerate(matches)]
+
+
+# Function to read the first/after arguments of a connection in a selection, e.g. labels(first: 100, after: "10")
+def connection_arguments(selection, name):
+    match = re.search(name + r'\(first:\s*(\d+)(?:,\s*after:\s*"([^"]*)")?', selection)
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+# Function to answer the node(id:) queries: one project item by id (webhooks), or aliased follow-up pages of
+# issue labels (node ids I_<number>) and item field values (node ids PVTI_<project>_<index>)
+def node_results(org, graphql_query):
+    results = {}
+    for alias, field, arguments, selection in aliased_fields(graphql_query):
+        node_id = re.search(r'id:\s*"([^"]*)"', arguments)
+        node_id = node_id.group(1) if node_id else ""
+        issue_match = re.fullmatch(r'I_(\d+)', node_id)
+        item_match = re.fullmatch(r'PVTI_(\d+)_(\d+)', node_id)
+        labels = connection_arguments(selection, "labels")
+        field_values = connection_arguments(selection, "fieldValues")
+        if issue_match and labels and 1 <= int(issue_match.group(1)) <= settings['items']:
+            issue = synthetic_issue(org, "synthetic-repo", int(issue_match.group(1)))
+            results[alias or "node"] = {'labels': connection_page([{'name': name} for name in synthetic_labels(issue)], *labels)}
+        elif item_match and int(item_match.group(2)) < settings['items']:
+            project_number, index = int(item_match.group(1)), int(item_match.group(2))
+            item = synthetic_item(org, project_number, index)
+            if field_values:
+                results[alias or "node"] = {'fieldValues': connection_page(synthetic_field_values(item['status']['name']), *field_values)}
+            else:
+                results[alias or "node"] = dict(item, isArchived=False, project={'number': project_number, 'owner': {'login': org}})
+        else:
+            results[alias or "node"] = None
+    return results
+
+
+# Function to answer the repository queries: aliased pullRequest(number:) lookups (pull request enrichment, with a page of
+# their reviews) and aliased issue(number:) timelines under aliased repositories (ISSUE_TIMELINES); unknown numbers are null
+def repository_results(graphql_query):
+    results = {}
+    repository = None
+    for alias, field, arguments, selection in aliased_fields(graphql_query):
+        if field == "repository":
+            owner, repo = re.search(r'owner:\s*"([^"]+)",\s*name:\s*"([^"]+)"', arguments).groups()
+            repository = results.setdefault(alias or "repository", {})
+            continue
+        number = int(re.search(r'number:\s*(\d+)', arguments).group(1))
+        if repository is None or not 1 <= number <= settings['items']:
+            if repository is not None:
+                repository[alias] = None
+            continue
+        if field == "pullRequest":
+            repository[alias] = synthetic_pull(owner, repo, number, *(connection_arguments(selection, "reviews") or (100, None))) if number % 5 == 0 else None
+        elif field == "issue":
+            repository[alias] = {'timelineItems': connection_page(synthetic_timeline(owner, repo, number), *connection_arguments(selection, "timelineItems"))}
+    return results
+
+
+# Function to take one request from the hourly budget; returns the remaining count, or None when it is used up
+def take_rate_limit():
+    with _lock:
+        _state['requests'] += 1
+        if time.time() - _state['window_start'] >= 3600:
+            _state.update({'window_start': time.time(), 'used': 0})
+        limit = settings['rate_limit']
+        if limit and _state['used'] >= limit:
+            return None
+        _state['used'] += 1
+        return limit - _state['used'] if limit else 5000
+
+
+# Function to build the Link header of a REST page, with the page and per_page of the request swapped in
+def link_header(base_url, query, page, last_page):
+    links = []
+    for rel, number in (("first", 1), ("prev", page - 1), ("next", page + 1), ("last", last_page)):
+        if 1 <= number <= last_page and (rel not in ("prev", "next") or number != page):
+            params = dict(query, page=[str(number)])
+            links.append(f'<{base_url}?{"&".join(f"{key}={values[0]}" for key, values in params.items())}>; rel="{rel}"')
+    return ", ".join(links)
+
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if settings.get('verbose'):
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Latency, injected 502s and the rate limit apply to every request before it is answered
+    def admit(self, items=0):
+        time.sleep((settings['latency_ms'] + settings['item_latency_ms'] * items) / 1000)
+        if settings['error_rate'] and random.random() < settings['error_rate']:
+            self.send_json(502, {'message': "Server Error (injected)"})
+            return None
+        remaining = take_rate_limit()
+        headers = {'X-RateLimit-Limit': str(settings['rate_limit'] or 5000), 'X-RateLimit-Remaining': str(max(remaining or 0, 0)),
+                   'X-RateLimit-Reset': str(int(_state['window_start'] + 3600))}
+        if remaining is None:
+            self.send_json(403, {'message': "API rate limit exceeded (mock)"}, headers)
+            return None
+        return headers
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        match = re.fullmatch(r'/repos/([^/]+)/([^/]+)/(issues|pulls)(?:/(\d+))?', url.path)
+        if not match:
+            self.send_json(404, {'message': "Not Found"})
+            return
+        owner, repo, endpoint, number = match.groups()
+        if number:
+            headers = self.admit()
+            if headers is None:
+                return
+            if not 1 <= int(number) <= settings['items']:
+                self.send_json(404, {'message': "Not Found"}, headers)
+                return
+            self.send_json(200, synthetic_issue(owner, repo, int(number)), headers)
+            return
+
+        per_page = max(1, min(MAX_PER_PAGE, int(query.get('per_page', ['30'])[0])))
+        page = max(1, int(query.get('page', ['1'])[0]))
+        headers = self.admit(per_page)
+        if headers is None:
+            return
+        # The issues endpoint lists every number; the pulls endpoint only the pull requests among them
+        numbers = range(1, settings['items'] + 1) if endpoint == "issues" else range(5, settings['items'] + 1, 5)
+        last_page = max(1, -(-len(numbers) // per_page))
+        items = [synthetic_issue(owner, repo, number) for number in numbers[(page - 1) * per_page:page * per_page]]
+        headers['Link'] = link_header(f"http://{self.headers.get('Host')}{url.path}", query, page, last_page)
+        self.send_json(200, items, headers)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/graphql":
+            self.send_json(404, {'message': "Not Found"})
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        graphql_query = json.loads(self.rfile.read(length) or b"{}").get('query', '')
+        org = re.search(r'organization\(login:\s*"([^"]+)"', graphql_query)
+        project = re.search(r'projectV2\(number:\s*(\d+)', graphql_query)
+        if not org and re.search(r'\b(node|repository)\(', graphql_query):
+            aliases = len(aliased_fields(graphql_query))
+            headers = self.admit(aliases)
+            if headers is None:
+                return
+            # Node ids don't carry the org, so node lookups answer for the org of the last board query
+            data = node_results(_state['org'], graphql_query) if "repository(" not in graphql_query else repository_results(graphql_query)
+            data['rateLimit'] = {'cost': 1, 'remaining': int(headers['X-RateLimit-Remaining']), 'limit': settings['rate_limit'] or 5000, 'resetAt': None}
+            self.send_json(200, {'data': data}, headers)
+            return
+        if org:
+            _state['org'] = org.group(1)
+        if org and project and 'fields(first:' in graphql_query:
+            headers = self.admit()
+            if headers is None:
+                return
+            fields = [{'id': "F_title", 'name': "Title", 'dataType': "TITLE"},
+                      {'id': "F_status", 'name': "Status", 'dataType': "SINGLE_SELECT", 'options': [{'id': f"O_{index}", 'name': status} for index, status in enumerate(STATUSES)]}]
+            self.send_json(200, {'data': {'organization': {'projectV2': {'fields': {'nodes': fields}}}}})
+            return
+        page = re.search(r'items\(first:\s*(\d+),\s*after:\s*(null|"[^"]*")', graphql_query)
+        if not (org and project and page):
+            self.send_json(200, {'errors': [{'message': "mock_github_server doesn't serve this query"}]})
+            return
+        page_size = int(page.group(1))
+        headers = self.admit(page_size)
+        if headers is None:
+            return
+        if page_size > settings['max_page_size']:
+            self.send_json(502, {'message': "We couldn't respond to your request in time (mock)"})
+            return
+        start = 0 if page.group(2) == "null" else int(page.group(2).strip('"'))
+        end = min(start + page_size, settings['items'])
+        nodes = [synthetic_item(org.group(1), int(project.group(1)), index) for index in range(start, end)]
+        self.send_json(200, {'data': {
+            'rateLimit': {'cost': 1, 'remaining': int(headers['X-RateLimit-Remaining']), 'limit': settings['rate_limit'] or 5000, 'resetAt': None},
+            'organization': {'projectV2': {'items': {'pageInfo': {'endCursor': str(end), 'hasNextPage': end < settings['items']}, 'nodes': nodes}}},
+        }})
+
+
+parser = argparse.ArgumentParser(description="Serve synthetic GitHub REST and project GraphQL data for load and retry testing")
+parser.add_argument("--host", default=DEFAULT_HOST)
+parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+parser.add_argument("--items", type=int, default=1000, help="issues per repository and items per project board")
+parser.add_argument("--seed", type=int, default=1, help="seed for the synthetic data")
+parser.add_argument("--latency-ms", type=float, default=0, help="delay before every response")
+parser.add_argument("--item-latency-ms", type=float, default=0, help="extra delay per item in a page")
+parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 502, e.g. 0.05")
+parser.add_argument("--max-page-size", type=int, default=MAX_PER_PAGE, help="project pages larger than this fail with 502")
+parser.add_argument("--rate-limit", type=int, default=0, help="requests allowed per hour before 403 rate-limit answers (0 for no limit)")
+parser.add_argument("--extra-labels", type=int, default=0, help="labels added to every issue, e.g. 12 to make item label lists run past a page")
+parser.add_argument("--reviews-per-pull", type=int, default=3, help="most reviews a pull request gets, e.g. 150 to make review lists run past a page")
+parser.add_argument("--verbose", action="store_true", help="log every request")
+args = parser.parse_args()
+settings.update(vars(args))
+
+server = ThreadingHTTPServer((args.host, args.port), MockGitHubHandler)
+print(f"Mock GitHub API on http://{args.host}:{args.port} with {args.items} items per board and repository")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
+    print(f"Served {_state['requests']} requests")
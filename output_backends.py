@@ -0,0 +1,82 @@
+import os
+import re
+
+import pandas as pd
+
+# Output formats a run can select; "xlsx" is the existing openpyxl workbook
+SUPPORTED_FORMATS = ("xlsx", "parquet", "csv", "jsonl")
+
+# File extension written for each columnar format
+FORMAT_EXTENSIONS = {"parquet": "parquet", "csv": "csv", "jsonl": "jsonl"}
+
+
+# Function to read the output formats for this run, e.g. OUTPUT_FORMATS=xlsx,parquet
+def selected_output_formats(default="xlsx"):
+    value = os.environ.get("OUTPUT_FORMATS", default)
+    formats = [name.strip().lower() for name in value.split(",") if name.strip()]
+    unknown = [name for name in formats if name not in SUPPORTED_FORMATS]
+    if unknown:
+        raise ValueError(f"Unsupported output format(s) {unknown}; choose from {', '.join(SUPPORTED_FORMATS)}")
+    return formats or [default]
+
+
+# Function to turn a sheet name into a safe file name part
+def table_file_part(table_name):
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', table_name.strip()).strip('_')
+
+
+# Function to write one DataFrame in a single columnar format
+def write_table(df, filename, output_format):
+    if output_format == "parquet":
+        # Object columns can hold mixed None/str values; store them as strings so the schema is stable
+        df.astype({column: "string" for column in df.columns if df[column].dtype == object}).to_parquet(filename, index=False)
+    elif output_format == "csv":
+        df.to_csv(filename, index=False, encoding="utf-8")
+    elif output_format == "jsonl":
+        df.to_json(filename, orient="records", lines=True, force_ascii=False)
+    else:
+        raise ValueError(f"Unsupported columnar format: {output_format}")
+
+
+# Function to write every table (sheet name -> DataFrame) next to the workbook in the selected columnar formats
+def write_tables(tables, base_filename, formats):
+    written = []
+    for output_format in formats:
+        if output_format not in FORMAT_EXTENSIONS:
+            continue
+        for table_name, df in tables.items():
+            filename = f"{base_filename}_{table_file_part(table_name)}.{FORMAT_EXTENSIONS[output_format]}"
+            write_table(df, filename, output_format)
+            written.append(filename)
+    if written:
+        print(f"Columnar output written: {', '.join(written)}")
+    return written
+
+
+# Function to write one table that arrives as DataFrame chunks (bounded-memory mode), so only one chunk is in memory.
+# Parquet needs one schema for every chunk, so all but integer columns are stored as strings there.
+def write_table_chunks(chunks, filename, output_format):
+    if output_format == "parquet":
+        import pyarrow
+        import pyarrow.parquet
+
+        writer = None
+        try:
+            for chunk in chunks:
+                chunk = chunk.astype({column: "string" for column in chunk.columns if not pd.api.types.is_integer_dtype(chunk[column])})
+                table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(filename, table.schema)
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    elif output_format in ("csv", "jsonl"):
+        with open(filename, 'w', encoding='utf-8', newline='') as output_file:
+            for index, chunk in enumerate(chunks):
+                if output_format == "csv":
+                    chunk.to_csv(output_file, index=False, header=index == 0)
+                elif len(chunk):
+                    output_file.write(chunk.to_json(orient="records", lines=True, force_ascii=False).rstrip("\n") + "\n")
+    else:
+        raise ValueError(f"Unsupported columnar format: {output_format}")
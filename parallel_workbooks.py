@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+import delta_update
+import excel_styles
+import output_backends
+import xlsxwriter_report
+
+
+# Function to read the workbook layout for this run, e.g. WORKBOOK_MODE=per_board for one workbook per board and view
+def selected_workbook_mode(default="single"):
+    mode = os.environ.get("WORKBOOK_MODE", default).strip().lower()
+    if mode not in ("single", "per_board"):
+        raise ValueError(f"Unsupported workbook mode {mode}; choose single or per_board")
+    return mode
+
+
+# Function to read how many worker processes render workbooks, e.g. WORKBOOK_WORKERS=8 (defaults to the CPU count)
+def workbook_workers():
+    return max(1, int(os.environ.get("WORKBOOK_WORKERS", os.cpu_count() or 1)))
+
+
+# Function to read whether the per-board workbooks are merged into the usual single workbook afterwards (WORKBOOK_MERGE=1)
+def merge_enabled():
+    return os.environ.get("WORKBOOK_MERGE", "0").strip() not in ("0", "false", "no", "")
+
+
+# Function to name the workbook of one table, e.g. getProjectsStatus_20240101_120000_Defects.xlsx
+def table_workbook_path(output_base, table_name):
+    return f"{output_base}_{output_backends.table_file_part(table_name)}.xlsx"
+
+
+# Function to render one table into its own workbook with the selected engine (runs in a worker process)
+def write_table_workbook(table_name, df, output_filename, engine, formulas, use_formulas):
+    if engine == 'xlsxwriter':
+        xlsxwriter_report.write_report_workbook({table_name: df}, output_filename, formulas=formulas, formula_tables=[table_name] if use_formulas else [])
+        return output_filename
+    wb = excel_styles.register_styles(Workbook())
+    sheet = wb.active
+    sheet.title = table_name[:31]
+    columns = list(df.columns)
+    for col_num, column in enumerate(columns, 1):
+        sheet.cell(row=1, column=col_num, value=column)
+    for row_num, record in enumerate(df.itertuples(index=False, name=None), 2):
+        delta_update.write_row(sheet, row_num, columns, record, use_formulas, formulas)
+    for col_num, column in enumerate(columns, 1):
+        sheet.column_dimensions[get_column_letter(col_num)].width = xlsxwriter_report.column_width(column, df[column])
+    wb.save(output_filename)
+    return output_filename
+
+
+# Function to render every table (sheet name -> DataFrame) into its own workbook on a process pool.
+# Returns sheet name -> workbook path, in table order. Without the fork start method (e.g. on Windows) the
+# scripts can't be re-imported safely by worker processes, so the workbooks are written one after another instead.
+def write_table_workbooks(tables, output_base, engine, formulas=True, formula_tables=(), max_workers=None):
+    max_workers = max_workers or workbook_workers()
+    jobs = {table_name: (table_name, df, table_workbook_path(output_base, table_name), engine, formulas, table_name in formula_tables)
+            for table_name, df in tables.items()}
+    if max_workers == 1 or len(jobs) == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return {table_name: write_table_workbook(*job) for table_name, job in jobs.items()}
+
+    print(f"Writing {len(jobs)} workbooks with up to {min(max_workers, len(jobs))} worker processes")
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs)), mp_context=multiprocessing.get_context('fork')) as executor:
+        futures = {table_name: executor.submit(write_table_workbook, *job) for table_name, job in jobs.items()}
+        return {table_name: future.result() for table_name, future in futures.items()}
+
+
+# Function to merge the per-table workbooks into one workbook, one sheet each, keeping formulas and links.
+# Sheets are copied row by row through read-only and write-only workbooks, so memory stays flat; read-only sheets
+# don't carry hyperlinks, so the link cells are linked again from each row's URL.
+def merge_workbooks(workbook_paths, output_filename):
+    merged = excel_styles.register_styles(Workbook(write_only=True))
+    for sheet_name, path in workbook_paths.items():
+        source = load_workbook(path, read_only=True)
+        source_sheet = source.worksheets[0]
+        target = merged.create_sheet(sheet_name[:31])
+
+        # Column widths have to be set before rows are appended; formula text is left out of the width
+        widths = {}
+        for row in source_sheet.iter_rows(values_only=True):
+            for col_num, value in enumerate(row, 1):
+                if value is not None and not (isinstance(value, str) and value.startswith('=')):
+                    widths[col_num] = max(widths.get(col_num, 0), len(str(value)))
+        for col_num, length in widths.items():
+            target.column_dimensions[get_column_letter(col_num)].width = min((length + 2) * 1.2, xlsxwriter_report.MAX_COLUMN_WIDTH)
+
+        rows = source_sheet.iter_rows(values_only=True)
+        headers = list(next(rows, []))
+        link_columns = {index for index, header in enumerate(headers) if header in xlsxwriter_report.LINK_COLUMNS}
+        for index in link_columns:
+            excel_styles.style_link_column(target, get_column_letter(index + 1))
+        target.append(headers)
+        url_index = headers.index("URL") if "URL" in headers else None
+        for row in rows:
+            cells = []
+            for col_num, value in enumerate(row):
+                if col_num in link_columns and value is not None:
+                    cell = WriteOnlyCell(target, value=value)
+                    if url_index is not None and not (isinstance(value, str) and value.startswith('=')):
+                        excel_styles.set_link(cell, row[url_index], value)
+                    else:
+                        cell.style = excel_styles.LINK_STYLE
+                    cells.append(cell)
+                else:
+                    cells.append(value)
+            target.append(cells)
+        source.close()
+    merged.save(output_filename)
+    return output_filename
@@ -0,0 +1,644 @@
+import json
+import os
+import time
+
+import requests
+
+import checkpoints
+import project_fields
+import record_spill
+import run_metrics
+
+GRAPHQL_URL = f"{run_metrics.github_api_url()}/graphql"
+
+# Organization that owns the project boards unless a target names another one
+DEFAULT_ORG = "kpmg-global-technology-and-knowledge"
+
+# Page sizes for project items: GitHub allows at most 100 per page; the adaptive paginator stays between these
+MAX_PAGE_SIZE = 100
+MIN_PAGE_SIZE = 10
+
+# A page grows only as far as its time, scaled to the larger size, stays under FAST_PAGE_SECONDS; slower than SLOW_PAGE_SECONDS shrinks it
+FAST_PAGE_SECONDS = 2.0
+SLOW_PAGE_SECONDS = 8.0
+
+# Rate-limit points a page may cost before it stops growing, e.g. PROJECT_PAGE_COST_BUDGET=10
+# (a full-query page of 100 items costs about 3; extra field selections cost more)
+DEFAULT_PAGE_COST_BUDGET = 5
+
+# Pages that must succeed after a failure before the page size may grow back past the size that failed
+CEILING_RECOVERY_PAGES = 5
+
+# Seconds before a page request is treated as timed out, and failed attempts allowed at the smallest page size
+PAGE_TIMEOUT_SECONDS = 60
+MAX_PAGE_FAILURES = 3
+
+# GraphQL error text that means the page asked for too much and a smaller page should work
+SHRINK_ERROR_MARKERS = ("MAX_NODE_LIMIT_EXCEEDED", "node limit", "timeout", "timed out", "Something went wrong")
+
+# Connections fetched per follow-up request for items whose labels or field values didn't fit on the item page,
+# and how many labels or field values each of them asks for
+NESTED_BATCH_SIZE = 50
+NESTED_PAGE_SIZE = 100
+
+# Columns every fetched project record has; configured extra fields are added after these
+RECORD_COLUMNS = ["Title", "URL", "Created At", "Updated At", "State", "Author", "Labels", "Milestone", "Status"]
+
+# GraphQL query to fetch one page of a project's items; filled in with the org login, project number, page size and cursor
+query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+  organization(login: "%s") {
+    projectV2(number: %d) {
+      items(first: %d, after: %s) {
+        pageInfo {
+          endCursor
+          hasNextPage
+        }
+        nodes {
+          id
+          content {
+            ... on Issue {
+              id
+              number
+              title
+              url
+              createdAt
+              updatedAt
+              state
+              author {
+                login
+              }
+              labels(first: 10) {
+                pageInfo {
+                  endCursor
+                  hasNextPage
+                }
+                nodes {
+                  name
+                }
+              }
+              milestone {
+                title
+              }
+            }
+          }
+          fieldValues(first: 100) {
+            pageInfo {
+              endCursor
+              hasNextPage
+            }
+            nodes {
+              ... on ProjectV2ItemFieldValueCommon {
+                field {
+                  ... on ProjectV2FieldCommon {
+                    id
+                    name
+                  }
+                }
+              }
+              ... on ProjectV2ItemFieldTextValue {
+                text
+              }
+              ... on ProjectV2ItemFieldNumberValue {
+                number
+              }
+              ... on ProjectV2ItemFieldDateValue {
+                date
+              }
+              ... on ProjectV2ItemFieldSingleSelectValue {
+                optionId
+                name
+              }
+              ... on ProjectV2ItemFieldIterationValue {
+                iterationId
+                title
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+# Lean query: only the named fields are requested through fieldValueByName instead of every field value.
+# Filled in with the extra field selections, then the org login, project number, page size and cursor.
+lean_query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+  organization(login: "%%s") {
+    projectV2(number: %%d) {
+      items(first: %%d, after: %%s) {
+        pageInfo {
+          endCursor
+          hasNextPage
+        }
+        nodes {
+          id
+          content {
+            ... on Issue {
+              id
+              number
+              title
+              url
+              createdAt
+              updatedAt
+              state
+              author {
+                login
+              }
+              labels(first: 10) {
+                pageInfo {
+                  endCursor
+                  hasNextPage
+                }
+                nodes {
+                  name
+                }
+              }
+              milestone {
+                title
+              }
+            }
+          }
+          status: fieldValueByName(name: "Status") {
+%s
+          }
+%s
+        }
+      }
+    }
+  }
+}
+'''
+
+# Value fragments for one fieldValueByName selection, covering every field type a project can have
+field_value_fragments = '''            ... on ProjectV2ItemFieldSingleSelectValue {
+              name
+            }
+            ... on ProjectV2ItemFieldTextValue {
+              text
+            }
+            ... on ProjectV2ItemFieldNumberValue {
+              number
+            }
+            ... on ProjectV2ItemFieldDateValue {
+              date
+            }
+            ... on ProjectV2ItemFieldIterationValue {
+              title
+            }'''
+
+# GraphQL query to fetch one project item by node id (e.g. after a projects_v2_item webhook) with the lean field selections.
+# Filled in with the status fragments and extra field selections, then the item node id.
+item_query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+  node(id: "%%s") {
+    ... on ProjectV2Item {
+      id
+      isArchived
+      project {
+        number
+        owner {
+          ... on Organization {
+            login
+          }
+        }
+      }
+      content {
+        ... on Issue {
+          id
+          number
+          title
+          url
+          createdAt
+          updatedAt
+          state
+          author {
+            login
+          }
+          labels(first: 10) {
+            pageInfo {
+              endCursor
+              hasNextPage
+            }
+            nodes {
+              name
+            }
+          }
+          milestone {
+            title
+          }
+        }
+      }
+      status: fieldValueByName(name: "Status") {
+%s
+      }
+%s
+    }
+  }
+}
+'''
+
+
+# Follow-up query for the rest of the labels and field values of some items; filled in with one aliased node per connection
+nested_query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+%s
+}
+'''
+
+# One aliased issue node with the next page of its labels; filled in with the alias, issue node id, page size and cursor
+nested_labels_template = '''  %s: node(id: "%s") {
+    ... on Issue {
+      labels(first: %d, after: "%s") {
+        pageInfo {
+          endCursor
+          hasNextPage
+        }
+        nodes {
+          name
+        }
+      }
+    }
+  }'''
+
+# One aliased project item node with the next page of its field values (the same selections as the full query)
+nested_field_values_template = '''  %s: node(id: "%s") {
+    ... on ProjectV2Item {
+      fieldValues(first: %d, after: "%s") {
+        pageInfo {
+          endCursor
+          hasNextPage
+        }
+        nodes {
+          ... on ProjectV2ItemFieldValueCommon {
+            field {
+              ... on ProjectV2FieldCommon {
+                id
+                name
+              }
+            }
+          }
+          ... on ProjectV2ItemFieldTextValue {
+            text
+          }
+          ... on ProjectV2ItemFieldNumberValue {
+            number
+          }
+          ... on ProjectV2ItemFieldDateValue {
+            date
+          }
+          ... on ProjectV2ItemFieldSingleSelectValue {
+            optionId
+            name
+          }
+          ... on ProjectV2ItemFieldIterationValue {
+            iterationId
+            title
+          }
+        }
+      }
+    }
+  }'''
+
+
+# Function to read the project query mode, e.g. PROJECT_QUERY=lean to fetch only the named fields (full is the default)
+def selected_query_mode(default="full"):
+    mode = os.environ.get("PROJECT_QUERY", default).strip().lower()
+    if mode not in ("full", "lean"):
+        raise ValueError(f"Unsupported project query mode {mode}; choose full or lean")
+    return mode
+
+
+# Function to read the extra project fields to fetch as columns, e.g. PROJECT_FIELDS=Priority,Iteration
+# (PROJECT_FIELDS=all asks for every custom field, see resolve_extra_fields)
+def extra_field_names():
+    value = os.environ.get("PROJECT_FIELDS", "")
+    return [name.strip() for name in value.split(",") if name.strip() and name.strip() not in ("Status", "all")]
+
+
+# Function to read whether every custom field of the boards is fetched as a column (PROJECT_FIELDS=all)
+def all_fields_requested():
+    return "all" in [name.strip() for name in os.environ.get("PROJECT_FIELDS", "").split(",")]
+
+
+# Function to work out the extra field columns of a run: PROJECT_FIELDS, or with PROJECT_FIELDS=all every custom field
+# of the given boards in the order their (cached) schemas list them, followed by any other names PROJECT_FIELDS gives
+def resolve_extra_fields(token, org=DEFAULT_ORG, project_numbers=()):
+    extra_fields = extra_field_names()
+    if not all_fields_requested():
+        return extra_fields
+    names = []
+    for project_number in project_numbers:
+        for name in project_fields.custom_field_names(project_fields.load_field_schema(org, project_number, token)):
+            if name not in names:
+                names.append(name)
+    return names + [name for name in extra_fields if name not in names]
+
+
+# Function to build the fieldValueByName selections for the given extra fields; each one gets a field_<n> alias
+def _field_selections(extra_fields):
+    selections = "\n".join(
+        f"          field_{index}: fieldValueByName(name: {json.dumps(name)}) {{\n{field_value_fragments}\n          }}"
+        for index, name in enumerate(extra_fields))
+    # The result is formatted again with the query values, so escape any % in field names
+    return selections.replace('%', '%%')
+
+
+# Function to build the lean query template for the given extra fields
+def build_lean_query(extra_fields):
+    return lean_query_template % (field_value_fragments, _field_selections(extra_fields))
+
+
+# Function to read the value of one fieldValueByName result, whatever the field type
+def field_value(value):
+    if not value:
+        return None
+    for key in ("name", "text", "number", "date", "title"):
+        if key in value:
+            return value[key]
+    return None
+
+
+# Function to extract a named field from field values
+def extract_field(field_values, field_name):
+    return project_fields.decode_field_values(field_values).get(field_name)
+
+
+# Function to extract status from field values
+def extract_status(field_values):
+    return extract_field(field_values, 'Status')
+
+
+# Function to turn one project item node into a record (None when the item is not an issue, e.g. a draft or pull request).
+# schema (field id -> definition, see project_fields) lets the full query's field values be decoded by field id.
+def item_record(node, mode, extra_fields, schema=None):
+    issue = node.get('content')
+    if not issue:
+        return None
+    record = {
+        'Title': issue['title'],
+        'URL': issue['url'],
+        'Created At': issue['createdAt'],
+        'Updated At': issue['updatedAt'],
+        'State': issue['state'],
+        'Author': issue['author']['login'],
+        'Labels': ", ".join([label['name'] for label in issue['labels']['nodes']]),
+        'Milestone': issue['milestone']['title'] if issue.get('milestone') else None,
+    }
+    if mode == "lean":
+        # The named fields come back under their aliases, so no scan over field values is needed
+        record['Status'] = field_value(node.get('status'))
+        for index, name in enumerate(extra_fields):
+            record[name] = field_value(node.get(f'field_{index}'))
+    else:
+        # Every field value is decoded once, so each extra field is a lookup rather than another scan
+        values = project_fields.decode_field_values(node['fieldValues']['nodes'], schema)
+        record['Status'] = values.get('Status')
+        for name in extra_fields:
+            record[name] = values.get(name)
+    return record
+
+
+# Function to list the labels and field values connections of item nodes that have more pages:
+# (node id, connection name, cursor, connection) for each, where node id is the issue's for labels and the item's for field values
+def truncated_connections(nodes):
+    truncated = []
+    for node in nodes:
+        issue = node.get('content') or {}
+        for owner_id, name, connection in ((issue.get('id'), 'labels', issue.get('labels')), (node.get('id'), 'fieldValues', node.get('fieldValues'))):
+            page_info = (connection or {}).get('pageInfo') or {}
+            if owner_id and page_info.get('hasNextPage'):
+                truncated.append((owner_id, name, page_info['endCursor'], connection))
+    return truncated
+
+
+# Function to fetch the rest of the labels and field values of the item nodes whose first page of them ran out.
+# Only those items are asked for, NESTED_BATCH_SIZE connections per aliased query, and the fetched labels and field values
+# are appended to the nodes in place, so item_record sees them complete. Connections that still have more pages go round again.
+def complete_nested_pages(nodes, token):
+    pending = truncated_connections(nodes)
+    if not pending:
+        return nodes
+    print(f"Fetching the rest of {len(pending)} label and field value lists of project items")
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    while pending:
+        batch, pending = pending[:NESTED_BATCH_SIZE], pending[NESTED_BATCH_SIZE:]
+        blocks = []
+        for index, (owner_id, name, cursor, connection) in enumerate(batch):
+            template = nested_labels_template if name == 'labels' else nested_field_values_template
+            blocks.append(template % (f"n{index}", owner_id, NESTED_PAGE_SIZE, cursor))
+        query = nested_query_template % "\n".join(blocks)
+        response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers=headers, timeout=PAGE_TIMEOUT_SECONDS)
+        if response.status_code != 200:
+            print(f"Failed to fetch the rest of the labels and field values. Status Code: {response.status_code}. Response: {response.text}")
+            continue
+        data = response.json()
+        run_metrics.record_rate_limit(data)
+
+        # A node that can't be resolved only nulls its own alias, so keep whatever did resolve
+        if "errors" in data:
+            print(f"Error fetching the rest of the labels and field values: {data['errors']}")
+        for index, (owner_id, name, cursor, connection) in enumerate(batch):
+            result = ((data.get('data') or {}).get(f"n{index}") or {}).get(name)
+            if not result:
+                continue
+            connection['nodes'].extend(result['nodes'])
+            connection['pageInfo'] = result['pageInfo']
+            if result['pageInfo']['hasNextPage']:
+                pending.append((owner_id, name, result['pageInfo']['endCursor'], connection))
+    return nodes
+
+
+# Function to read the page size the paginator starts from, e.g. PROJECT_PAGE_SIZE=50 (PROJECT_ADAPTIVE_PAGES=0 keeps it fixed)
+def page_size_settings():
+    page_size = int(os.environ.get("PROJECT_PAGE_SIZE", MAX_PAGE_SIZE))
+    adaptive = os.environ.get("PROJECT_ADAPTIVE_PAGES", "1").strip() not in ("0", "false", "no")
+    return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, page_size)), adaptive
+
+
+# Function to read how many rate-limit points one page may cost before it stops growing
+def page_cost_budget():
+    return max(1.0, float(os.environ.get("PROJECT_PAGE_COST_BUDGET", DEFAULT_PAGE_COST_BUDGET)))
+
+
+# Function to pick the next page size from how the last page went: half after a failure, a quarter smaller when slow.
+# Otherwise it grows by up to half again (up to ceiling), as far as the page's time and cost, scaled to the larger size,
+# stay within FAST_PAGE_SECONDS and cost_budget.
+def next_page_size(page_size, failed=False, seconds=0.0, cost=1, ceiling=MAX_PAGE_SIZE, cost_budget=None):
+    if failed:
+        return max(MIN_PAGE_SIZE, page_size // 2)
+    if seconds > SLOW_PAGE_SECONDS:
+        return max(MIN_PAGE_SIZE, int(page_size * 0.75))
+    cost_budget = page_cost_budget() if cost_budget is None else cost_budget
+    fits = page_size * min(FAST_PAGE_SECONDS / seconds if seconds > 0 else 1.5, cost_budget / cost if cost else 1.5)
+    return max(page_size, min(ceiling, int(page_size * 1.5), int(fits)))
+
+
+# Function to tell whether a failed page is worth retrying with fewer items (timeouts, overload, node limits)
+def is_shrinkable_failure(response=None, data=None):
+    if response is None:
+        return True
+    if response.status_code in run_metrics.RETRY_STATUS_CODES:
+        return True
+    errors = (data or {}).get("errors") or []
+    return any(any(marker.lower() in json.dumps(error).lower() for marker in SHRINK_ERROR_MARKERS) for error in errors)
+
+
+# Function to fetch all issues for a project, handling pagination.
+# mode and extra_fields default to PROJECT_QUERY and PROJECT_FIELDS; item_index, when given, is filled with item node id -> issue URL.
+def fetch_project_items(project_number, token, org=DEFAULT_ORG, mode=None, extra_fields=None, item_index=None):
+    mode = mode or selected_query_mode()
+    extra_fields = extra_field_names() if extra_fields is None else list(extra_fields)
+    template = build_lean_query(extra_fields) if mode == "lean" else query_template
+    # The full query decodes field values by id against the board's cached field schema
+    schema = project_fields.load_field_schema(org, project_number, token) if mode == "full" else None
+    schema_refreshed = False
+    page_size, adaptive = page_size_settings()
+    # Spills to disk past PROJECT_FETCH_SPILL_MB; callers still build one DataFrame per board, so only the fetch is bounded
+    issues = record_spill.record_list(record_spill.PROJECT_FETCH_SETTING)
+    end_cursor = None
+    has_next_page = True
+    failures = 0
+    ceiling = MAX_PAGE_SIZE  # a size that failed is not grown back into until CEILING_RECOVERY_PAGES pages succeed
+    pages_since_failure = 0
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    print(f"Fetching project {org}/{project_number} with page size {page_size}{' (adaptive)' if adaptive else ''}")
+
+    # Pick up after the last page a previous, interrupted run saved for this board and query shape
+    checkpoint_name = "_".join(["project", org, str(project_number), mode] + extra_fields)
+    checkpoint = checkpoints.load_checkpoint(checkpoint_name)
+    if checkpoint:
+        issues.extend(checkpoint['records'])
+        # The item ids of the resumed pages are saved with them, so webhooks can still find those items
+        if item_index is not None:
+            item_index.update(checkpoint['index'])
+        end_cursor = checkpoint['position']
+        print(f"Resuming project {org}/{project_number} from its checkpoint after {len(issues)} items")
+
+    while has_next_page:
+        cursor_str = f'"{end_cursor}"' if end_cursor else 'null'  # Proper handling of cursor value in query
+        query = template % (org, project_number, page_size, cursor_str)
+        start = time.perf_counter()
+        response = data = None
+        try:
+            # The paginator retries failed pages itself with a smaller page, so no same-size retries here
+            response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers=headers, timeout=PAGE_TIMEOUT_SECONDS, retries=0 if adaptive else 2)
+            data = response.json() if response.status_code == 200 else None
+        except (requests.ConnectionError, requests.Timeout, ValueError):
+            if not adaptive:
+                raise
+        seconds = time.perf_counter() - start
+        if data is not None:
+            run_metrics.record_rate_limit(data)
+
+        # Timeouts, overload and node-limit errors: retry the same cursor with a smaller page
+        if data is None or "errors" in data:
+            if adaptive and is_shrinkable_failure(response, data) and failures < MAX_PAGE_FAILURES:
+                failures += 1 if page_size == MIN_PAGE_SIZE else 0
+                ceiling = max(MIN_PAGE_SIZE, page_size * 3 // 4)
+                pages_since_failure = 0
+                page_size = next_page_size(page_size, failed=True)
+                print(f"Page of project {org}/{project_number} failed after {seconds:.1f}s; retrying with page size {page_size}")
+                continue
+            # Check for and handle errors in the response
+            if data is None:
+                print(f"Error fetching data for project {org}/{project_number}: status {response.status_code if response is not None else 'no response'}")
+            else:
+                print(f"Error fetching data for project {org}/{project_number}: {data['errors']}")
+            break
+        failures = 0
+        pages_since_failure += 1
+        if ceiling < MAX_PAGE_SIZE and pages_since_failure >= CEILING_RECOVERY_PAGES:
+            print(f"Project {org}/{project_number}: {pages_since_failure} pages succeeded since a failure; page size may grow past {ceiling} again")
+            ceiling = MAX_PAGE_SIZE
+
+        # Parse the JSON response and extract issues
+        page_info = data['data']['organization']['projectV2']['items']['pageInfo']
+        nodes = data['data']['organization']['projectV2']['items']['nodes']
+        complete_nested_pages(nodes, token)
+
+        # A field added to the board since its schema was cached shows up as an unknown id; fetch the schema again once
+        if schema is not None and not schema_refreshed and project_fields.has_unknown_fields(nodes, schema):
+            print(f"Project {org}/{project_number} has fields its cached schema doesn't know; fetching the schema again")
+            schema = project_fields.load_field_schema(org, project_number, token, refresh=True)
+            schema_refreshed = True
+
+        page_records = []
+        page_index = {}
+        for node in nodes:
+            record = item_record(node, mode, extra_fields, schema)
+            if record:
+                page_records.append(record)
+                if node.get('id'):
+                    page_index[node['id']] = record['URL']
+        issues.extend(page_records)
+        if item_index is not None:
+            item_index.update(page_index)
+
+        has_next_page = page_info['hasNextPage']
+        end_cursor = page_info['endCursor']
+        if has_next_page:
+            checkpoints.save_checkpoint(checkpoint_name, end_cursor, page_records, page_index)
+        else:
+            checkpoints.clear_checkpoint(checkpoint_name)
+
+        if adaptive and has_next_page:
+            cost = ((data.get('data') or {}).get('rateLimit') or {}).get('cost', 1)
+            new_size = next_page_size(page_size, seconds=seconds, cost=cost, ceiling=ceiling)
+            if new_size != page_size:
+                print(f"Project {org}/{project_number}: page of {page_size} took {seconds:.1f}s at cost {cost}; page size now {new_size}")
+                page_size = new_size
+    return issues
+
+
+# Function to fetch one project item by its node id.
+# Returns {'org', 'project_number', 'archived', 'record'} (record is None for non-issue items), or None when the item is gone.
+def fetch_project_item(item_id, token, extra_fields=None):
+    extra_fields = extra_field_names() if extra_fields is None else list(extra_fields)
+    query = item_query_template % (field_value_fragments, _field_selections(extra_fields)) % json.dumps(item_id)[1:-1]
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers=headers, timeout=PAGE_TIMEOUT_SECONDS)
+    if response.status_code != 200:
+        print(f"Error fetching project item {item_id}: status {response.status_code}")
+        return None
+    data = response.json()
+    run_metrics.record_rate_limit(data)
+    if "errors" in data:
+        print(f"Error fetching project item {item_id}: {data['errors']}")
+    node = (data.get('data') or {}).get('node')
+    if not node:
+        return None
+    complete_nested_pages([node], token)
+    return {
+        'org': ((node['project'].get('owner') or {}).get('login')),
+        'project_number': node['project']['number'],
+        'archived': node.get('isArchived', False),
+        'record': item_record(node, "lean", extra_fields),
+    }
@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+
+import run_metrics
+
+GRAPHQL_URL = f"{run_metrics.github_api_url()}/graphql"
+
+# Cache file for the field schema of each board, kept next to the reports; PROJECT_FIELD_CACHE overrides it
+# (PROJECT_FIELD_CACHE=0 turns caching off and fetches the schema on every run)
+DEFAULT_CACHE_FILE = "project_field_cache.json"
+
+# Hours a cached schema is trusted before it is fetched again, e.g. PROJECT_FIELD_CACHE_HOURS=1
+DEFAULT_CACHE_HOURS = 24
+
+# Field types that carry a value per item and can become a column (the others, e.g. ASSIGNEES or LABELS, mirror issue data)
+VALUE_FIELD_TYPES = ("TEXT", "NUMBER", "DATE", "SINGLE_SELECT", "ITERATION")
+
+_lock = threading.Lock()
+
+# GraphQL query to fetch the fields of one project: ids, names, types, single-select options and iterations.
+# Filled in with the org login and project number; a project has at most 50 fields, so one page holds them all.
+schema_query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+  organization(login: "%s") {
+    projectV2(number: %d) {
+      fields(first: 100) {
+        nodes {
+          ... on ProjectV2FieldCommon {
+            id
+            name
+            dataType
+          }
+          ... on ProjectV2SingleSelectField {
+            options {
+              id
+              name
+            }
+          }
+          ... on ProjectV2IterationField {
+            configuration {
+              iterations {
+                id
+                title
+              }
+              completedIterations {
+                id
+                title
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+
+# Function to read the schema cache file for this run (None when caching is off)
+def cache_path():
+    path = os.environ.get("PROJECT_FIELD_CACHE", DEFAULT_CACHE_FILE).strip()
+    return None if path in ("", "0") else path
+
+
+# Function to read how many hours a cached schema is used before it is fetched again
+def cache_hours():
+    return float(os.environ.get("PROJECT_FIELD_CACHE_HOURS", DEFAULT_CACHE_HOURS))
+
+
+def _read_cache(path):
+    if path is None or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable project field cache {path}: {e}")
+        return {}
+
+
+# Function to write one board's schema into the cache file (atomically, so an interrupted run can't leave a broken file)
+def _write_cache(path, key, schema):
+    with _lock:
+        cache = _read_cache(path)
+        cache[key] = {'fetched_at': time.time(), 'fields': schema}
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(temp_path, path)
+
+
+# Function to turn one field node of the schema query into {'name', 'type', 'options', 'iterations'};
+# options and iterations map their ids to the names items show
+def field_definition(node):
+    configuration = node.get('configuration') or {}
+    iterations = (configuration.get('iterations') or []) + (configuration.get('completedIterations') or [])
+    return {
+        'name': node['name'],
+        'type': node.get('dataType'),
+        'options': {option['id']: option['name'] for option in node.get('options') or []},
+        'iterations': {iteration['id']: iteration['title'] for iteration in iterations},
+    }
+
+
+# Function to fetch the field schema of one project; returns field id -> field_definition, or None when it can't be read
+def fetch_field_schema(org, project_number, token):
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    query = schema_query_template % (org, project_number)
+    response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers=headers)
+    if response.status_code != 200:
+        print(f"Failed to fetch the fields of project {org}/{project_number}. Status Code: {response.status_code}. Response: {response.text}")
+        return None
+    data = response.json()
+    run_metrics.record_rate_limit(data)
+    project = ((data.get('data') or {}).get('organization') or {}).get('projectV2')
+    if "errors" in data or not project:
+        print(f"Error fetching the fields of project {org}/{project_number}: {data.get('errors')}")
+        return None
+    # Items only reference fields by id; nodes without one are field types this query doesn't select
+    return {node['id']: field_definition(node) for node in project['fields']['nodes'] if node.get('id')}
+
+
+# Function to get the field schema of one project, from the cache while it is younger than PROJECT_FIELD_CACHE_HOURS.
+# refresh fetches it again regardless, e.g. after items showed a field id the cached schema doesn't know.
+# Returns None when the schema can't be fetched; field values are then decoded by the field names the items carry.
+def load_field_schema(org, project_number, token, refresh=False):
+    path = cache_path()
+    key = f"{org}/{project_number}"
+    cached = _read_cache(path).get(key)
+    if cached and not refresh and time.time() - cached['fetched_at'] < cache_hours() * 3600:
+        return cached['fields']
+    schema = fetch_field_schema(org, project_number, token)
+    if schema is None:
+        return cached['fields'] if cached else None
+    if path is not None:
+        _write_cache(path, key, schema)
+    print(f"Fetched the {len(schema)} fields of project {org}/{project_number}")
+    return schema
+
+
+# Function to list the custom fields of a schema that can become columns, in project order (Status has its own column)
+def custom_field_names(schema):
+    return [field['name'] for field in (schema or {}).values() if field['type'] in VALUE_FIELD_TYPES and field['name'] != "Status"]
+
+
+# Function to tell whether any field value of the item nodes belongs to a field the schema doesn't know (added since it was cached)
+def has_unknown_fields(nodes, schema):
+    for node in nodes:
+        for value in (node.get('fieldValues') or {}).get('nodes') or []:
+            field_id = (value.get('field') or {}).get('id')
+            if field_id and field_id not in schema:
+                return True
+    return False
+
+
+# Function to read the typed value of one field value node: a number for number fields, the date text (YYYY-MM-DD)
+# for date fields, the option name for single-select fields and the iteration title for iteration fields
+def typed_value(value, definition=None):
+    definition = definition or {}
+    if 'number' in value:
+        return value['number']
+    if 'optionId' in value:
+        return definition.get('options', {}).get(value['optionId'], value.get('name'))
+    if 'iterationId' in value:
+        return definition.get('iterations', {}).get(value['iterationId'], value.get('title'))
+    for key in ("date", "text", "name", "title"):
+        if key in value:
+            return value[key]
+    return None
+
+
+# Function to decode the field values of one item into field name -> typed value in a single pass.
+# With a schema each value is matched to its field by id; without one, by the field name the value carries.
+def decode_field_values(field_values, schema=None):
+    values = {}
+    for value in field_values:
+        field = value.get('field') or {}
+        definition = (schema or {}).get(field.get('id'))
+        name = definition['name'] if definition else field.get('name')
+        if name and name not in values:
+            values[name] = typed_value(value, definition)
+    return values
@@ -0,0 +1,186 @@
+import json
+import os
+from datetime import datetime
+
+import run_metrics
+
+GRAPHQL_URL = f"{run_metrics.github_api_url()}/graphql"
+
+# Pull requests looked up per GraphQL request; each is one aliased pullRequest(number:) field
+ENRICHMENT_BATCH_SIZE = 50
+
+# Reviews fetched per pull request and page; pull requests with more follow up with their own cursors
+REVIEW_PAGE_SIZE = 100
+
+# Columns added to the pull request sheet by the enrichment stage
+ENRICHMENT_COLUMNS = ["Reviewed By", "Approved By", "Review State", "Commits", "Additions", "Deletions", "Changed Files", "First Review At", "Merged At", "Hours To First Review", "Hours To Merge"]
+
+# Reviews of one pull request, a page at a time; filled in with the page size and the after argument (blank for the first page)
+reviews_template = '''
+    reviews(first: %d%s) {
+      totalCount
+      pageInfo {
+        endCursor
+        hasNextPage
+      }
+      nodes {
+        author {
+          login
+        }
+        state
+        submittedAt
+      }
+    }
+'''
+
+# Fields fetched for every pull request in a batch
+pull_fields_template = '''
+    number
+    createdAt
+    mergedAt
+    additions
+    deletions
+    changedFiles
+    commits {
+      totalCount
+    }''' + reviews_template % (REVIEW_PAGE_SIZE, "")
+
+query_template = '''
+{
+  rateLimit {
+    cost
+    remaining
+    limit
+    resetAt
+  }
+  repository(owner: "%s", name: "%s") {
+%s
+  }
+}
+'''
+
+
+# Function to read whether the pull request enrichment stage runs (PULL_ENRICHMENT=0 turns it off)
+def enrichment_enabled():
+    return os.environ.get("PULL_ENRICHMENT", "1").strip() not in ("0", "false", "no")
+
+
+# Function to build one GraphQL query that looks up a batch of pull requests by number through aliases
+def build_enrichment_query(repo_owner, repo_name, numbers):
+    aliases = "\n".join(f"    pr{number}: pullRequest(number: {number}) {{{pull_fields_template}    }}" for number in numbers)
+    return query_template % (repo_owner, repo_name, aliases)
+
+
+# Function to build one GraphQL query for the next page of reviews of several pull requests: (number, cursor) pairs
+def build_review_page_query(repo_owner, repo_name, pages):
+    aliases = "\n".join(f"    pr{number}: pullRequest(number: {number}) {{{reviews_template % (REVIEW_PAGE_SIZE, f', after: {json.dumps(cursor)}')}    }}" for number, cursor in pages)
+    return query_template % (repo_owner, repo_name, aliases)
+
+
+# Function to fetch the rest of the reviews of the pull requests whose first page of them ran out, batch_size per request.
+# The fetched reviews are appended to the pullRequest nodes in place, so enrichment_row sees them complete; pull requests
+# whose reviews still have more pages go round again. Returns the numbers whose reviews couldn't all be fetched.
+def complete_review_pages(repo_owner, repo_name, pulls, headers, batch_size=ENRICHMENT_BATCH_SIZE):
+    pending = [(number, pull['reviews']['pageInfo']['endCursor']) for number, pull in pulls.items()
+               if (pull['reviews'].get('pageInfo') or {}).get('hasNextPage')]
+    if pending:
+        print(f"Fetching the rest of the reviews of {len(pending)} pull requests")
+    incomplete = []
+    while pending:
+        batch, pending = pending[:batch_size], pending[batch_size:]
+        query = build_review_page_query(repo_owner, repo_name, batch)
+        response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers={**headers, "Content-Type": "application/json"})
+        if response.status_code != 200:
+            print(f"Failed to fetch the rest of the reviews. Status Code: {response.status_code}. Response: {response.text}")
+            incomplete.extend(number for number, cursor in batch)
+            continue
+        data = response.json()
+        run_metrics.record_rate_limit(data)
+        if "errors" in data:
+            print(f"Error fetching the rest of the reviews: {data['errors']}")
+        repository = (data.get('data') or {}).get('repository') or {}
+        for number, cursor in batch:
+            reviews = (repository.get(f"pr{number}") or {}).get('reviews')
+            if not reviews:
+                incomplete.append(number)
+                continue
+            connection = pulls[number]['reviews']
+            connection['nodes'].extend(reviews['nodes'])
+            connection['pageInfo'] = reviews['pageInfo']
+            if reviews['pageInfo']['hasNextPage']:
+                pending.append((number, reviews['pageInfo']['endCursor']))
+    return incomplete
+
+
+# Function to work out the hours between two GitHub timestamps (blank when either is missing)
+def _hours_between(start, end):
+    if not start or not end:
+        return ""
+    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
+    return round((end_dt - start_dt).total_seconds() / 3600, 1)
+
+
+# Function to turn one pullRequest node into values in ENRICHMENT_COLUMNS order
+def enrichment_row(pull):
+    reviews = [review for review in pull['reviews']['nodes'] if review.get('submittedAt')]
+    reviewers = []
+    approvers = []
+    for review in reviews:
+        login = (review.get('author') or {}).get('login', '')
+        if login and login not in reviewers:
+            reviewers.append(login)
+        if login and review['state'] == 'APPROVED' and login not in approvers:
+            approvers.append(login)
+    # The latest approval or change request decides the review state; comments alone don't
+    decisive = [review['state'] for review in reviews if review['state'] in ('APPROVED', 'CHANGES_REQUESTED')]
+    first_review_at = min((review['submittedAt'] for review in reviews), default="")
+    return [
+        ",".join(reviewers),
+        ",".join(approvers),
+        decisive[-1] if decisive else ("COMMENTED" if reviews else ""),
+        pull['commits']['totalCount'],
+        pull['additions'],
+        pull['deletions'],
+        pull['changedFiles'],
+        first_review_at,
+        pull.get('mergedAt') or "",
+        _hours_between(pull['createdAt'], first_review_at),
+        _hours_between(pull['createdAt'], pull.get('mergedAt')),
+    ]
+
+
+# Function to fetch the enrichment values for many pull requests, ENRICHMENT_BATCH_SIZE per GraphQL request;
+# pull requests with more than REVIEW_PAGE_SIZE reviews get the rest of them in follow-up requests.
+# Returns pull request number -> values in ENRICHMENT_COLUMNS order; numbers GitHub can't resolve are left out.
+def fetch_pull_enrichment(repo_owner, repo_name, numbers, headers, batch_size=ENRICHMENT_BATCH_SIZE):
+    enrichment = {}
+    numbers = list(numbers)
+    for start in range(0, len(numbers), batch_size):
+        batch = numbers[start:start + batch_size]
+        query = build_enrichment_query(repo_owner, repo_name, batch)
+        print(f"Enriching pull requests {batch[0]}..{batch[-1]} ({len(batch)} in this batch)")
+        response = run_metrics.http_post(GRAPHQL_URL, json={'query': query}, headers={**headers, "Content-Type": "application/json"})
+        if response.status_code != 200:
+            print(f"Failed to enrich pull requests. Status Code: {response.status_code}. Response: {response.text}")
+            continue
+        data = response.json()
+        run_metrics.record_rate_limit(data)
+
+        # A missing or inaccessible number only nulls its own alias, so keep whatever did resolve
+        if "errors" in data:
+            print(f"Error enriching pull requests: {data['errors']}")
+        repository = (data.get('data') or {}).get('repository') or {}
+        pulls = {number: repository[f"pr{number}"] for number in batch if repository.get(f"pr{number}")}
+        incomplete = complete_review_pages(repo_owner, repo_name, pulls, headers, batch_size)
+        if incomplete:
+            print(f"Reviews of pull requests {', '.join(map(str, incomplete))} are incomplete; their review columns only count the reviews fetched")
+        for number, pull in pulls.items():
+            enrichment[number] = enrichment_row(pull)
+    return enrichment
+
+
+# Function to append the enrichment values to pull request rows (rows start with the PR number)
+def enrich_rows(rows, enrichment):
+    blank = [""] * len(ENRICHMENT_COLUMNS)
+    return [row + enrichment.get(row[0], blank) for row in rows]
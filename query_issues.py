@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import pandas as pd
+import issue_store
+import output_backends
+
+# Slices the boards kept in the issue store (written by getProjectsStatus.py and getProjectsStatusReleaseDefects.py with ISSUE_STORE=1)
+# without fetching anything, e.g.
+#
+#   python query_issues.py --view Defects --where Pod=Alpha --group-by Status
+#   python query_issues.py --where "Status=Todo,In Progress" --label Feature --from 2024-01-01 --output slice.csv
+#   python query_issues.py --view Release1.8items --group-by Pod,Status
+#
+# Views: items (every board row), Release1.8items, Defects and Features, with the same rows as the report sheets.
+
+parser = argparse.ArgumentParser(description="Query the fetched project boards kept in the local issue store")
+parser.add_argument("--db", default=None, help=f"issue store file (default ISSUE_STORE or {issue_store.DEFAULT_STORE_FILE})")
+parser.add_argument("--view", default="items", choices=list(issue_store.VIEWS), help="rows to query")
+parser.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE[,VALUE]", help="keep rows whose column is one of the values; repeat for more filters")
+parser.add_argument("--label", action="append", default=[], help="keep rows carrying this label; repeat to require several")
+parser.add_argument("--from", dest="date_from", help="first date to keep (YYYY-MM-DD)")
+parser.add_argument("--to", dest="date_to", help="last date to keep (YYYY-MM-DD)")
+parser.add_argument("--date-field", default="updated", choices=list(issue_store.DATE_COLUMNS), help="date the --from/--to range applies to")
+parser.add_argument("--group-by", default="", metavar="COLUMN[,COLUMN]", help="count rows per group instead of listing them (Label counts per label)")
+parser.add_argument("--output", help="write the result to a .csv, .jsonl, .parquet or .xlsx file instead of printing it")
+args = parser.parse_args()
+
+where = {}
+for condition in args.where:
+    name, separator, values = condition.partition("=")
+    if not separator:
+        parser.error(f"--where needs COLUMN=VALUE: {condition}")
+    where[name.strip()] = [value.strip() for value in values.split(",")]
+
+db_path = args.db or issue_store.store_path() or issue_store.DEFAULT_STORE_FILE
+if not os.path.exists(db_path):
+    print(f"No issue store at {db_path}; run getProjectsStatus.py or getProjectsStatusReleaseDefects.py first")
+    sys.exit(1)
+
+conn = issue_store.connect(db_path)
+try:
+    result = issue_store.query(conn, view=args.view, where=where, labels=args.label, date_field=args.date_field,
+                               date_from=args.date_from, date_to=args.date_to,
+                               group_by=[name.strip() for name in args.group_by.split(",") if name.strip()])
+finally:
+    conn.close()
+
+if args.output:
+    extension = os.path.splitext(args.output)[1].lstrip(".").lower()
+    if extension == "xlsx":
+        result.to_excel(args.output, index=False)
+    else:
+        output_backends.write_table(result, args.output, extension)
+    print(f"{len(result)} rows written to {args.output}")
+else:
+    with pd.option_context("display.max_rows", None, "display.max_columns", None, "display.width", 200):
+        print(result.to_string(index=False))
+    print(f"{len(result)} rows")
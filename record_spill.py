@@ -0,0 +1,104 @@
+import atexit
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+# Rows per DataFrame chunk when spilled records are streamed back to the writers
+CHUNK_ROWS = 1000
+
+
+# Settings for the spill budget. The REST exports stream their spilled records into every output, so MEMORY_BUDGET_MB
+# bounds their whole run; project boards are loaded whole into DataFrames for the report views afterwards, so
+# PROJECT_FETCH_SPILL_MB only bounds the records held while a board is being fetched.
+MEMORY_BUDGET_SETTING = "MEMORY_BUDGET_MB"
+PROJECT_FETCH_SETTING = "PROJECT_FETCH_SPILL_MB"
+
+
+# Function to read the memory budget for fetched records, e.g. MEMORY_BUDGET_MB=64 (unset keeps everything in memory)
+def memory_budget_bytes(setting=MEMORY_BUDGET_SETTING):
+    value = os.environ.get(setting, "").strip()
+    if value in ("", "0"):
+        return None
+    return int(float(value) * 1024 * 1024)
+
+
+# Function to tell whether this run is in the bounded-memory mode
+def bounded_mode():
+    return memory_budget_bytes() is not None
+
+
+# List-like collection of fetched records that keeps at most budget_bytes of them (measured as JSON) in memory
+# and spills the rest to a temporary JSON Lines file (in SPILL_DIR, or the system temp directory).
+# Records are kept as JSON text either way, so iterating always yields fresh copies.
+class SpilledRecords:
+    def __init__(self, budget_bytes, spill_dir=None):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = spill_dir or os.environ.get("SPILL_DIR") or None
+        self.spill_path = None
+        self._file = None
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._count = 0
+
+    def append(self, record):
+        line = json.dumps(record)
+        self._buffer.append(line)
+        self._buffer_bytes += len(line)
+        self._count += 1
+        if self._buffer_bytes > self.budget_bytes:
+            self._spill()
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def _spill(self):
+        if self._file is None:
+            self._file = tempfile.NamedTemporaryFile('w', prefix='spill_', suffix='.jsonl', dir=self.spill_dir, delete=False, encoding='utf-8')
+            self.spill_path = self._file.name
+            atexit.register(self.close)
+            print(f"Fetched records passed the memory budget; spilling to {self.spill_path}")
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._buffer = []
+        self._buffer_bytes = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        if self._file is not None:
+            self._file.flush()
+            with open(self.spill_path, 'r', encoding='utf-8') as spill_file:
+                for line in spill_file:
+                    yield json.loads(line)
+        for line in list(self._buffer):
+            yield json.loads(line)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            if os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+            self._file = None
+
+
+# Function to start a collection for fetched records: a plain list, or a SpilledRecords when setting has a budget
+def record_list(setting=MEMORY_BUDGET_SETTING):
+    budget = memory_budget_bytes(setting)
+    return SpilledRecords(budget) if budget else []
+
+
+# Function to turn an iterable of rows into DataFrames of at most size rows (one empty DataFrame when there are no rows)
+def chunks(rows, columns, size=CHUNK_ROWS):
+    chunk = []
+    produced = False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield pd.DataFrame(chunk, columns=columns)
+            produced = True
+            chunk = []
+    if chunk or not produced:
+        yield pd.DataFrame(chunk, columns=columns)
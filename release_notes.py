@@ -0,0 +1,242 @@
+import difflib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import async_rest
+import issue_bodies
+import run_metrics
+
+# Repository the release-note issues live in
+REPO_OWNER = "kpmg-global-technology-and-knowledge"
+REPO_NAME = "Digital-matrix-app"
+
+# Body shown for a feature whose issue can't be read (e.g. 404 or 403); it is never cached, so the next run tries again
+FALLBACK_BODY = "No description available."
+
+# Cache file for the rendered section of each feature, kept next to the notes; RELEASE_NOTES_CACHE overrides it
+# (RELEASE_NOTES_CACHE=0 renders every section again on each run)
+DEFAULT_SECTION_CACHE = "release_notes_cache.json"
+
+# Most feature sections kept in the cache; the least recently used ones are dropped first
+DEFAULT_SECTION_CACHE_SIZE = 5000
+
+# Bumped whenever the section layout or body cleanup changes, so sections rendered by older code are not reused
+SECTION_CACHE_VERSION = 1
+
+# Rendered sections in least- to most-recently-used order, keyed by layout and issue URL; each keeps the updatedAt it was rendered at
+_sections = OrderedDict()
+_lock = threading.Lock()
+_state = {'path': None, 'max_entries': DEFAULT_SECTION_CACHE_SIZE, 'hits': 0, 'misses': 0, 'dirty': False}
+
+
+# Function to load the section cache from disk; path and size default to RELEASE_NOTES_CACHE and RELEASE_NOTES_CACHE_SIZE
+def load_section_cache(path=None, max_entries=None):
+    path = path or os.environ.get("RELEASE_NOTES_CACHE", DEFAULT_SECTION_CACHE)
+    max_entries = max_entries or int(os.environ.get("RELEASE_NOTES_CACHE_SIZE", DEFAULT_SECTION_CACHE_SIZE))
+    with _lock:
+        _sections.clear()
+        _state.update({'path': None if path in ("0", "") else path, 'max_entries': max_entries, 'hits': 0, 'misses': 0, 'dirty': False})
+        if _state['path'] and os.path.exists(_state['path']):
+            try:
+                with open(_state['path'], 'r', encoding='utf-8') as cache_file:
+                    stored = json.load(cache_file)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable release notes cache {_state['path']}: {e}")
+                stored = {}
+            if stored.get('version') == SECTION_CACHE_VERSION:
+                _sections.update(stored.get('sections', []))
+            _evict()
+    return _state['path']
+
+
+def _evict():
+    while len(_sections) > _state['max_entries']:
+        _sections.popitem(last=False)
+
+
+def _section_key(layout, row):
+    updated_at = row.get('Updated At')
+    if updated_at is None or (not isinstance(updated_at, str) and pd.isna(updated_at)) or updated_at == '':
+        return None, None
+    return f"{layout}:{row['URL']}", updated_at
+
+
+# Function to look up the cached section of one feature row; returns None when the feature is new or changed since it was rendered
+def cached_section(layout, row):
+    key, updated_at = _section_key(layout, row)
+    with _lock:
+        entry = _sections.get(key) if key is not None and _state['path'] is not None else None
+        if entry is None or entry['updated_at'] != updated_at:
+            _state['misses'] += 1
+            return None
+        _sections.move_to_end(key)
+        _state['hits'] += 1
+        return entry['section']
+
+
+# Function to cache the rendered section of one feature row at its updatedAt, replacing the one rendered before it changed
+def store_section(layout, row, section):
+    key, updated_at = _section_key(layout, row)
+    if key is None:
+        return
+    with _lock:
+        if _state['path'] is None:
+            return
+        _sections[key] = {'updated_at': updated_at, 'section': section}
+        _sections.move_to_end(key)
+        _state['dirty'] = True
+        _evict()
+
+
+# Function to write the section cache back to disk (atomically, so an interrupted run can't leave a broken file)
+def save_section_cache():
+    with _lock:
+        if _state['path'] is None:
+            return
+        if _state['dirty']:
+            temp_path = f"{_state['path']}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as cache_file:
+                json.dump({'version': SECTION_CACHE_VERSION, 'sections': list(_sections.items())}, cache_file)
+            os.replace(temp_path, _state['path'])
+            _state['dirty'] = False
+    print(f"Release notes cache: {_state['hits']} sections reused, {_state['misses']} rendered, {len(_sections)} kept in {_state['path']}")
+
+
+# Function to read the notes a diff is taken against: RELEASE_NOTES_BASE (e.g. the notes of the last release build),
+# otherwise the notes the previous run left in md_filename. RELEASE_NOTES_DIFF=0 turns the diff off (None).
+def diff_base_path(md_filename):
+    if os.environ.get("RELEASE_NOTES_DIFF", "1").strip() in ("0", "false", "no"):
+        return None
+    return os.environ.get("RELEASE_NOTES_BASE", "").strip() or md_filename
+
+
+# Function to write the notes to md_filename and a unified diff against the previous notes to <md_filename>.diff
+# (nothing to diff on the first build); returns the number of added and removed lines
+def write_release_notes_file(md_filename, notes):
+    base_path = diff_base_path(md_filename)
+    previous = None
+    if base_path and os.path.exists(base_path):
+        with open(base_path, 'r', encoding='utf-8') as base_file:
+            previous = base_file.read()
+    with open(md_filename, 'w', encoding='utf-8') as md_file:
+        md_file.write(notes)
+    if previous is None:
+        return None
+
+    base_name = f"{md_filename} (previous build)" if base_path == md_filename else base_path
+    diff = list(difflib.unified_diff(previous.splitlines(keepends=True), notes.splitlines(keepends=True), fromfile=base_name, tofile=md_filename))
+    changed = sum(1 for line in diff if line[:1] in ("+", "-") and line[:3] not in ("+++", "---"))
+    diff_filename = f"{os.path.splitext(md_filename)[0]}.diff"
+    with open(diff_filename, 'w', encoding='utf-8') as diff_file:
+        diff_file.writelines(diff)
+    print(f"Release notes: {changed} lines added or removed since {base_name}, diff written to {diff_filename}")
+    return changed
+
+
+# BEGIN of Function call to add Defects
+def fetch_defects_content(df):
+    # Convert the defects dataframe to a string
+    defects_content = "## Defects\n\n"
+    for index, row in df.iterrows():
+        defect_description = " - ".join([str(item) for item in row if pd.notna(item)])
+        defects_content += f"* {defect_description}\n"
+
+    return defects_content
+# End of Function call to add Defects
+
+def fetch_issue_body(issue_url, token, updated_at=None):
+    issue_number = issue_url.split('/')[-1]
+    repo_owner = REPO_OWNER
+    repo_name = REPO_NAME
+    # Bodies already fetched at this updatedAt come from the cache instead of the network
+    cached = issue_bodies.cached_body(f"{repo_owner}/{repo_name}", issue_number, updated_at)
+    if cached is not None:
+        return cached['clean']
+    api_url = f"{run_metrics.github_api_url()}/repos/{repo_owner}/{repo_name}/issues/{issue_number}"
+
+    headers = {"Authorization": f"Bearer {token}"}
+    response = run_metrics.http_get(api_url, headers=headers)
+    if response.status_code != 200:
+        print(f"Failed to fetch issue {issue_number}: {response.status_code}")
+        return FALLBACK_BODY
+    issue_data = response.json()
+    #print(f"Original Body: {body}")  # Debugging line to show the original body
+    # An issue without a description has "body": null
+    body = issue_data.get("body") or ""
+
+    truncated_body = issue_bodies.clean_issue_body(body)
+    issue_bodies.store_body(f"{repo_owner}/{repo_name}", issue_number, updated_at, body, truncated_body)
+
+    return truncated_body
+
+
+# Function to fetch the bodies of every feature missing from the cache at once with the asyncio engine (REST_ENGINE=async).
+# Returns issue URL -> cleaned body; a feature whose lookup failed is left out and fetch_issue_body tries it again.
+def prefetch_issue_bodies(df_features, token):
+    repo = f"{REPO_OWNER}/{REPO_NAME}"
+    bodies = {}
+    missing = {}
+    for index, row in df_features.iterrows():
+        issue_url = row['URL']
+        issue_number = issue_url.split('/')[-1]
+        cached = issue_bodies.cached_body(repo, issue_number, row.get('Updated At'))
+        if cached is not None:
+            bodies[issue_url] = cached['clean']
+        elif issue_url not in missing:
+            missing[issue_url] = (issue_number, row.get('Updated At'))
+
+    api_urls = [f"{run_metrics.github_api_url()}/repos/{repo}/issues/{issue_number}" for issue_number, updated_at in missing.values()]
+    results = async_rest.fetch_json_many(api_urls, {"Authorization": f"Bearer {token}"})
+    for (issue_url, (issue_number, updated_at)), (status, issue_data, text) in zip(missing.items(), results):
+        if status != 200:
+            print(f"Failed to fetch {issue_url}. Status Code: {status}. Response: {text}")
+            continue
+        # An issue without a description has "body": null
+        body = issue_data.get("body") or ""
+        bodies[issue_url] = issue_bodies.clean_issue_body(body)
+        issue_bodies.store_body(repo, issue_number, updated_at, body, bodies[issue_url])
+    return bodies
+
+
+# Function to render the release notes Markdown from the Features and Defects tables.
+# Features unchanged since their section was cached (same URL and updatedAt) are taken from the section cache;
+# only new or changed ones have their bodies fetched, cleaned and rendered again.
+def render_release_notes(df_features, df_defects, token):
+    notes = ["# Release Notes\n\n"]
+    sections = [cached_section("features", row) for index, row in df_features.iterrows()]
+
+    # With REST_ENGINE=async the bodies still to render are looked up together up front, REST_CONCURRENCY at a time
+    stale_features = df_features[[section is None for section in sections]]
+    bodies = prefetch_issue_bodies(stale_features, token) if async_rest.selected_rest_engine() == 'async' and len(stale_features) else {}
+
+    # The defects list follows every feature and is the same each time, so it is rendered once
+    defect_body =fetch_defects_content(df_defects)
+
+    # Ensure issue_body is a string
+    defect_body = str(defect_body) if defect_body else ""
+    defect_section = "## **List of Defects**\n\n" + f"*{defect_body}*\n\n"
+
+    for (index, row), section in zip(df_features.iterrows(), sections):
+        if section is None:
+            feature_title = row['Title']
+            issue_url = row['URL']
+
+            # Fetch the issue body using the URL
+            issue_body = bodies[issue_url] if issue_url in bodies else fetch_issue_body(issue_url, token, row.get('Updated At'))
+
+            # Ensure issue_body is a string
+            issue_body = str(issue_body) if issue_body else ""
+            # Write the feature title and issue body to the Markdown file with formatting
+            section = f"## **{feature_title}**\n\n" + f"*{issue_body}*\n\n" + f"[Issue Link]({issue_url})\n\n"
+            # A feature whose issue couldn't be read is rendered with the fallback but not cached, so the next run tries it again
+            if issue_body != FALLBACK_BODY:
+                store_section("features", row, section)
+        notes.append(section)
+        notes.append(defect_section)
+        #md_file.write(f"[Issue Link]({issue_url})\n\n")
+
+    return "".join(notes)
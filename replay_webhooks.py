@@ -0,0 +1,42 @@
+import json
+import sys
+import requests
+import webhook_events
+
+# Replays webhook deliveries recorded by the report server (WEBHOOK_LOG) against a running report server,
+# e.g. a local stand-in started with test data, signing each one with the same secret GitHub would use.
+# Usage: python replay_webhooks.py webhooks.jsonl [http://127.0.0.1:8765/webhook]
+
+DEFAULT_URL = "http://127.0.0.1:8765/webhook"
+
+log_path = sys.argv[1] if len(sys.argv) > 1 else 'webhooks.jsonl'
+url = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_URL
+
+secret = webhook_events.read_webhook_secret()
+if secret is None:
+    print("No webhook secret configured; set WEBHOOK_SECRET or create webhook_secret.txt")
+    sys.exit(1)
+
+replayed = failed = 0
+with open(log_path, 'r', encoding='utf-8') as log_file:
+    for line in log_file:
+        if not line.strip():
+            continue
+        delivery = json.loads(line)
+        body = json.dumps(delivery['payload']).encode('utf-8')
+        headers = {
+            "Content-Type": "application/json",
+            "X-GitHub-Event": delivery['event'],
+            "X-Hub-Signature-256": webhook_events.payload_signature(secret, body),
+        }
+        if delivery.get('delivery'):
+            headers["X-GitHub-Delivery"] = delivery['delivery']
+        response = requests.post(url, data=body, headers=headers)
+        if response.status_code == 200:
+            replayed += 1
+            print(f"{delivery['event']} {delivery['payload'].get('action', '')}: {response.json()}")
+        else:
+            failed += 1
+            print(f"Failed to replay {delivery['event']} {delivery.get('delivery')}. Status Code: {response.status_code}. Response: {response.text}")
+
+print(f"Replayed {replayed} deliveries to {url}, {failed} failed")
@@ -0,0 +1,436 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+from openpyxl import Workbook
+import json
+import os
+import tempfile
+import threading
+import time
+import pandas as pd
+import run_metrics
+import issue_bodies
+import issue_store
+import project_fetch
+import release_notes
+import report_views
+import rest_exports
+import webhook_events
+import xlsxwriter_report
+
+# Keeps the project boards in memory, refreshes them on a timer and serves the report over a local HTTP API:
+#
+#   GET  /health                       boards, row counts and when each board was last refreshed
+#   GET  /tables                       table names and row counts (board sheets, Release1.8items, Defects, Features, Summary sheets)
+#   GET  /tables/<name>?format=csv     one table as JSON (the default), CSV or xlsx; <name>.csv works as well
+#   GET  /report.xlsx                  every table in one workbook, built on demand with the selected EXCEL_ENGINE
+#   GET  /release-notes                the release notes Markdown
+#   GET  /metrics                      fetch metrics in the Prometheus text format
+#   POST /refresh                      refresh every board now instead of waiting for the timer
+#   POST /webhook                      GitHub issues, issue_comment, pull_request and projects_v2_item webhooks
+#
+# Each board is refetched on its own once it is older than REPORT_REFRESH_SECONDS; only that board's view and the
+# release views are rebuilt, and the release notes are re-rendered on the next request with bodies from the cache.
+# Webhooks keep the boards current between refreshes: issue events update the issue's rows straight from the payload,
+# and project item events refetch just that item. Deliveries must be signed with WEBHOOK_SECRET (or webhook_secret.txt);
+# with webhooks configured, REPORT_REFRESH_SECONDS can be raised so full board polls only catch missed events.
+# Usage: python report_server.py (REPORT_SERVER_HOST and REPORT_SERVER_PORT override where it listens)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Seconds before a board is refetched
+DEFAULT_REFRESH_SECONDS = 900
+
+# Longest the refresher sleeps between looking for boards that are due
+REFRESH_CHECK_SECONDS = 30
+
+# Content type for each format the API serves
+CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "md": "text/markdown; charset=utf-8",
+    "prom": "text/plain; version=0.0.4; charset=utf-8",
+}
+
+# Function to read the token from a file
+def read_token_from_file(file_path):
+    with open(file_path, 'r') as file:
+        return file.read().strip()
+
+# Path to the token file
+token_file_path = 'github_token.txt'
+
+# Read the token from the file
+token = read_token_from_file(token_file_path)
+
+# Define project numbers and their corresponding titles
+project_mapping = {
+    12: "Workbench Program Status",
+    18: "Workbench-Platform-Americas-Streams",
+    20: "Workbench-Platform-ASPAC-Streams",
+    27: "Workbench-Platform-EMEA-Streams"
+}
+
+# Organization that owns the project boards
+project_org = project_fetch.DEFAULT_ORG
+
+# Extra project fields kept as columns after Status (PROJECT_FIELDS, or every custom field with PROJECT_FIELDS=all)
+extra_fields = project_fetch.resolve_extra_fields(token, project_org, project_mapping)
+
+# In-memory model: fetched records and board view per board, the release views built from them, and the rendered notes.
+# generation goes up whenever a board's records change, so notes rendered from older data are not kept.
+# items maps project item node ids to the board and issue URL they belong to, for projects_v2_item webhooks.
+# pending holds, for each board being refetched, the webhook changes and item moves applied while its fetch runs,
+# so they are applied again to the fetched board instead of being lost when it replaces the old one.
+model = {'boards': {}, 'views': {}, 'release_views': {}, 'refreshed_at': {}, 'errors': {}, 'items': {}, 'pending': {}, 'generation': 0, 'notes': None, 'notes_generation': None}
+_lock = threading.RLock()
+_notes_lock = threading.Lock()
+_refresh_now = threading.Event()
+
+# Function to read where the server listens and how often boards are refreshed
+def server_settings():
+    host = os.environ.get("REPORT_SERVER_HOST", DEFAULT_HOST)
+    port = int(os.environ.get("REPORT_SERVER_PORT", DEFAULT_PORT))
+    refresh_seconds = float(os.environ.get("REPORT_REFRESH_SECONDS", DEFAULT_REFRESH_SECONDS))
+    return host, port, max(1.0, refresh_seconds)
+
+# Function to store a board's records and rebuild its view and the release views (callers hold _lock)
+def set_board(board_name, df):
+    previous_view = model['views'].get(board_name)
+    model['boards'][board_name] = df
+    model['views'][board_name] = report_views.build_board_view(df, board_name)
+    model['release_views'] = report_views.build_release_views(dict(model['views']))
+    if report_views.summary_enabled():
+        model['release_views'].update(report_views.build_summary_tables(dict(model['views'])))
+    model['generation'] += 1
+    # The issue store follows the in-memory boards, so query_issues.py sees webhook updates too; after the first save
+    # of a board only the rows that differ from its previous view are rewritten
+    if store_path is not None:
+        conn = issue_store.connect(store_path)
+        try:
+            issue_store.save_board(conn, board_name, model['views'][board_name], previous_view)
+        finally:
+            conn.close()
+
+# Function to refetch one board and rebuild the views that depend on it (nothing is rebuilt when the board is unchanged)
+def refresh_board(project_number, project_title):
+    board_name = project_title[:31]
+    stage_name = f"fetch:{project_title}"
+    item_index = {}
+    with _lock:
+        model['pending'][board_name] = {'changes': [], 'items': {}}
+    try:
+        with run_metrics.stage(stage_name):
+            issues = project_fetch.fetch_project_items(project_number, token, org=project_org, extra_fields=extra_fields, item_index=item_index)
+    except Exception:
+        with _lock:
+            model['pending'].pop(board_name, None)
+        raise
+    run_metrics.record_rows(stage_name, len(issues))
+    df = pd.DataFrame(issues, columns=project_fetch.RECORD_COLUMNS + extra_fields)
+    df['Status'] = df['Status'].astype(str)  # Ensure the Status column type is string
+
+    with _lock:
+        # The fetch may have read the board before webhooks that arrived during it; apply those changes again
+        pending = model['pending'].pop(board_name)
+        for change in pending['changes']:
+            new_df = change(df)
+            if new_df is not None:
+                df = new_df
+        items = {item_id: (board_name, url) for item_id, url in item_index.items()}
+        items.update(pending['items'])
+        model['refreshed_at'][board_name] = time.time()
+        model['errors'].pop(board_name, None)
+        model['items'] = {item_id: location for item_id, location in model['items'].items() if location[0] != board_name}
+        model['items'].update({item_id: location for item_id, location in items.items() if location is not None})
+        if pending['changes']:
+            print(f"Applied {len(pending['changes'])} webhook changes received while {project_title} was being fetched")
+        previous = model['boards'].get(board_name)
+        if previous is not None and previous.equals(df):
+            return False
+        set_board(board_name, df)
+    print(f"Refreshed {project_title}: {len(df)} items")
+    return True
+
+# Function to refresh every board that is due (or all of them when forced), keeping the old data for a board that fails
+def refresh_due_boards(refresh_seconds, forced=False):
+    for project_number, project_title in project_mapping.items():
+        board_name = project_title[:31]
+        if not forced and time.time() - model['refreshed_at'].get(board_name, 0) < refresh_seconds:
+            continue
+        try:
+            refresh_board(project_number, project_title)
+        except Exception as e:
+            print(f"Failed to refresh {project_title}: {e}")
+            with _lock:
+                model['errors'][board_name] = str(e)
+                # Try again on the next timer tick rather than after a whole refresh interval
+                model['refreshed_at'].setdefault(board_name, 0)
+
+# Function run by the refresher thread: wake up every REFRESH_CHECK_SECONDS (or on POST /refresh) and refresh due boards
+def refresh_loop(refresh_seconds):
+    while True:
+        forced = _refresh_now.wait(min(REFRESH_CHECK_SECONDS, refresh_seconds))
+        _refresh_now.clear()
+        refresh_due_boards(refresh_seconds, forced=forced)
+
+# Function to apply a change to the loaded boards (all of them, or just board_names); change returns a new board or None.
+# A board being refetched also keeps the change, to apply it to the fetched board. Returns the names of the boards that changed.
+def update_boards(change, board_names=None):
+    updated = []
+    with _lock:
+        refetching = [board_name for board_name in model['pending'] if board_name not in model['boards']]
+        for board_name in list(model['boards']) + refetching:
+            if board_names is not None and board_name not in board_names:
+                continue
+            if board_name in model['pending']:
+                model['pending'][board_name]['changes'].append(change)
+            df = model['boards'].get(board_name)
+            if df is None:
+                continue
+            new_df = change(df)
+            if new_df is not None:
+                set_board(board_name, new_df)
+                updated.append(board_name)
+    return updated
+
+# Function to find the loaded board for a project, or None when the server doesn't track it
+def board_for_project(org, project_number):
+    if org != project_org or project_number not in project_mapping:
+        return None
+    board_name = project_mapping[project_number][:31]
+    return board_name if board_name in model['boards'] else None
+
+# Function to point a project item at its (board, URL), or forget it when location is None (callers hold _lock);
+# a board being refetched keeps the move, so its fetched item index doesn't undo it
+def set_item(item_id, board_name, location):
+    if location is None:
+        model['items'].pop(item_id, None)
+    else:
+        model['items'][item_id] = location
+    if board_name in model['pending']:
+        model['pending'][board_name]['items'][item_id] = location
+
+# Function to apply a projects_v2_item webhook: refetch the one item, or take it off its board when deleted or archived
+def apply_item_event(action, item):
+    item_id = item.get('node_id')
+    if action in webhook_events.ITEM_IGNORED_ACTIONS or not item_id or item.get('content_type', 'Issue') != 'Issue':
+        return []
+    if action in webhook_events.ITEM_REMOVED_ACTIONS:
+        with _lock:
+            location = model['items'].get(item_id)
+            if location is not None:
+                set_item(item_id, location[0], None)
+        if location is None:
+            print(f"Project item {item_id} is not on a loaded board; ignoring {action}")
+            return []
+        board_name, url = location
+        return update_boards(lambda df: webhook_events.remove_issue(df, url), [board_name])
+
+    with run_metrics.stage("webhook:project item"):
+        fetched = project_fetch.fetch_project_item(item_id, token, extra_fields=extra_fields)
+    if fetched is None or fetched['record'] is None:
+        return []
+    board_name = board_for_project(fetched['org'], fetched['project_number'])
+    if board_name is None:
+        return []
+    record = fetched['record']
+    if fetched['archived']:
+        with _lock:
+            set_item(item_id, board_name, None)
+        return update_boards(lambda df: webhook_events.remove_issue(df, record['URL']), [board_name])
+    with _lock:
+        set_item(item_id, board_name, (board_name, record['URL']))
+    return update_boards(lambda df: webhook_events.upsert_item(df, record), [board_name])
+
+# Function to apply one verified webhook to the loaded boards; returns the names of the boards that changed
+def apply_webhook(event_name, payload):
+    action = payload.get('action')
+    if event_name in ('issues', 'issue_comment'):
+        change = webhook_events.issue_event_change(event_name, payload)
+        return update_boards(change) if change is not None else []
+    if event_name == 'projects_v2_item':
+        return apply_item_event(action, payload.get('projects_v2_item') or {})
+    # pull_request: the boards hold issues only, and a merge that closes issues sends their own issues events
+    return []
+
+# Function to take a consistent copy of every report table, keyed by sheet name
+def current_tables():
+    with _lock:
+        tables = dict(model['views'])
+        tables.update(model['release_views'])
+    return tables
+
+# Function to return the release notes, rendering them again only after a board changed
+def current_release_notes():
+    with _notes_lock:
+        with _lock:
+            generation = model['generation']
+            if model['notes'] is not None and model['notes_generation'] == generation:
+                return model['notes']
+            tables = dict(model['release_views'])
+        with run_metrics.stage("write:release notes"):
+            notes = release_notes.render_release_notes(tables["Features"], tables["Defects"], token)
+        issue_bodies.save_body_cache()
+        release_notes.save_section_cache()
+        with _lock:
+            model['notes'] = notes
+            model['notes_generation'] = generation
+        return notes
+
+# Function to describe the boards the server holds
+def health():
+    with _lock:
+        boards = {}
+        for board_name, df in model['boards'].items():
+            refreshed_at = model['refreshed_at'].get(board_name)
+            boards[board_name] = {'rows': len(df), 'refreshed_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(refreshed_at)) if refreshed_at else None}
+        return {'boards': boards, 'errors': dict(model['errors']), 'generation': model['generation']}
+
+# Function to write tables to an in-memory .xlsx file with the selected Excel engine
+def workbook_bytes(tables):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_filename = os.path.join(temp_dir, "report.xlsx")
+        if xlsxwriter_report.selected_excel_engine() == 'xlsxwriter':
+            xlsxwriter_report.write_report_workbook(tables, output_filename, formulas=xlsxwriter_report.formulas_enabled(), formula_tables=xlsxwriter_report.formula_tables_for(tables))
+        else:
+            wb = Workbook()
+            wb.remove(wb.active)
+            for sheet_title, df in tables.items():
+                sheet = wb.create_sheet(sheet_title[:31])
+                values = df.astype(object).where(df.notna(), None)
+                rest_exports.write_rows_sheet(sheet, list(df.columns), values.values.tolist())
+            wb.save(output_filename)
+        with open(output_filename, 'rb') as workbook_file:
+            return workbook_file.read()
+
+# Function to serialise one table as JSON, CSV or xlsx
+def table_bytes(table_name, df, output_format):
+    if output_format == "json":
+        return df.to_json(orient="records", force_ascii=False).encode('utf-8')
+    if output_format == "csv":
+        return df.to_csv(index=False).encode('utf-8')
+    return workbook_bytes({table_name: df})
+
+# Function to render the run metrics in the Prometheus format with the server's uptime as the duration
+def metrics_text():
+    run_metrics.metrics['duration_seconds'] = round(time.perf_counter() - run_metrics.metrics.get('_start', time.perf_counter()), 3)
+    run_metrics.metrics['peak_memory_mb'] = run_metrics.peak_memory_mb()
+    return run_metrics.prometheus_text()
+
+# Request handler for the report API
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    def send_body(self, body, content_type, status=200, filename=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if filename:
+            self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, payload, status=200):
+        self.send_body(json.dumps(payload, indent=2).encode('utf-8'), CONTENT_TYPES["json"], status)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = unquote(url.path).rstrip('/') or '/'
+        query = parse_qs(url.query)
+        try:
+            if path in ('/', '/health'):
+                self.send_json(health())
+            elif path == '/tables':
+                self.send_json({table_name: len(df) for table_name, df in current_tables().items()})
+            elif path.startswith('/tables/'):
+                table_name = path[len('/tables/'):]
+                output_format = query.get('format', ['json'])[0].lower()
+                for extension in ('json', 'csv', 'xlsx'):
+                    if table_name.endswith(f".{extension}"):
+                        table_name, output_format = table_name[:-len(extension) - 1], extension
+                tables = current_tables()
+                if table_name not in tables:
+                    self.send_json({'error': f"Unknown table {table_name}", 'tables': list(tables)}, status=404)
+                elif output_format not in ('json', 'csv', 'xlsx'):
+                    self.send_json({'error': f"Unsupported format {output_format}; choose json, csv or xlsx"}, status=400)
+                else:
+                    filename = f"{table_name}.{output_format}" if output_format != 'json' else None
+                    self.send_body(table_bytes(table_name, tables[table_name], output_format), CONTENT_TYPES[output_format], filename=filename)
+            elif path == '/report.xlsx':
+                self.send_body(workbook_bytes(current_tables()), CONTENT_TYPES["xlsx"], filename="getProjectsStatusReleaseDefects.xlsx")
+            elif path in ('/release-notes', '/release-notes.md'):
+                self.send_body(current_release_notes().encode('utf-8'), CONTENT_TYPES["md"])
+            elif path == '/metrics':
+                self.send_body(metrics_text().encode('utf-8'), CONTENT_TYPES["prom"])
+            else:
+                self.send_json({'error': f"Unknown path {path}"}, status=404)
+        except Exception as e:
+            print(f"Failed to serve {self.path}: {e}")
+            self.send_json({'error': str(e)}, status=500)
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip('/')
+        if path == '/refresh':
+            _refresh_now.set()
+            self.send_json({'refresh': 'scheduled'}, status=202)
+        elif path == '/webhook':
+            self.receive_webhook()
+        else:
+            self.send_json({'error': f"Unknown path {path}"}, status=404)
+
+    def receive_webhook(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if webhook_secret is None:
+            self.send_json({'error': "No webhook secret configured; set WEBHOOK_SECRET"}, status=403)
+            return
+        if not webhook_events.verify_signature(webhook_secret, body, self.headers.get('X-Hub-Signature-256')):
+            self.send_json({'error': "Invalid signature"}, status=401)
+            return
+        event_name = self.headers.get('X-GitHub-Event', '')
+        delivery_id = self.headers.get('X-GitHub-Delivery')
+        if event_name == 'ping':
+            self.send_json({'pong': True})
+            return
+        if event_name not in webhook_events.SUPPORTED_EVENTS:
+            self.send_json({'event': event_name, 'ignored': True})
+            return
+        if webhook_events.is_duplicate_delivery(delivery_id):
+            self.send_json({'event': event_name, 'delivery': delivery_id, 'duplicate': True})
+            return
+        try:
+            payload = json.loads(body)
+            webhook_events.record_delivery(event_name, delivery_id, payload)
+            with run_metrics.stage(f"webhook:{event_name}"):
+                updated = apply_webhook(event_name, payload)
+            run_metrics.record_rows(f"webhook:{event_name}", len(updated))
+        except Exception as e:
+            print(f"Failed to apply {event_name} webhook {delivery_id}: {e}")
+            # The delivery wasn't applied, so GitHub's redelivery of it must not be answered as a duplicate
+            webhook_events.forget_delivery(delivery_id)
+            self.send_json({'error': str(e)}, status=500)
+            return
+        self.send_json({'event': event_name, 'action': payload.get('action'), 'boards_updated': updated})
+
+host, port, refresh_seconds = server_settings()
+webhook_secret = webhook_events.read_webhook_secret()
+store_path = issue_store.store_path()
+
+# Metrics accumulate for as long as the server runs and are served from /metrics
+run_metrics.reset_metrics('report_server')
+issue_bodies.load_body_cache()
+release_notes.load_section_cache()
+
+# Load every board before serving, so the first requests see the whole report
+refresh_due_boards(refresh_seconds, forced=True)
+threading.Thread(target=refresh_loop, args=(refresh_seconds,), name="report-refresh", daemon=True).start()
+
+server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+print(f"Serving the report on http://{host}:{port} (boards refresh every {refresh_seconds:g}s)")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
+finally:
+    server.server_close()
+    issue_bodies.save_body_cache()
+    release_notes.save_section_cache()
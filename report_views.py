@@ -0,0 +1,192 @@
+import os
+
+import pandas as pd
+
+# Milestones that make up the "Release1.8items" view
+RELEASE_MILESTONES = ["Release 1.6.0", "Release 1.7.0", "Release 1.8.0"]
+
+# Issue types recognised by the LabelIssueType formula
+ISSUE_TYPES = ("FEATURE", "USER STORY", "TASK", "EPIC", "OPERATIONAL", "DEFECT")
+
+# Column layout of the project board sheets (same headers as the Excel sheets, trailing spaces included)
+BOARD_COLUMNS = ["Title", "URL", "Created At", "Updated At", "State", "Author", "Labels", "LabelStatus", "LabelIssueType", "Pod", "IsDefect", "Milestone", "GitHub Link ", "POD Project ", "Status"]
+
+# Column layout of the Release1.8items sheet; Defects and Features drop some of these
+VIEW_COLUMNS = ["Title", "URL", "Created At", "Updated At", "State", "Author", "Labels", "LabelStatus", "IssueType", "Pod", "IsDefect", "Milestone", "GitHub Link", "Pod Project", "Status"]
+DEFECT_COLUMNS = [column for column in VIEW_COLUMNS if column not in ("LabelStatus", "IssueType", "Pod")]
+FEATURE_COLUMNS = [column for column in VIEW_COLUMNS if column not in ("Pod", "IsDefect")]
+
+# Summary sheets: sheet name -> (row field, column field) counted per board and across every board
+SUMMARY_PIVOTS = {
+    "Summary Pod x Status": ("Pod", "Status"),
+    "Summary Type x Milestone": ("LabelIssueType", "Milestone"),
+}
+SUMMARY_ALL_BOARDS = "All boards"
+SUMMARY_BLANK = "(blank)"
+
+# Excel formulas for the derived columns, written for row 2 (G is Labels, B is URL) and re-pointed per row
+LABEL_STATUS_FORMULA = '''=IFERROR(MID(G2, SEARCH("Status: ", G2) + LEN("Status: "), IF(ISNUMBER(SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: "))), SEARCH(",", G2, SEARCH("Status: ", G2) + LEN("Status: ")) - (SEARCH("Status: ", G2) + LEN("Status: ")), LEN(G2))), "")'''
+ISSUETYPE_FORMULA = '''=IF(OR(UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "FEATURE", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "USER STORY", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "TASK", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "EPIC", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "OPERATIONAL", UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)) = "DEFECT"), UPPER(LEFT(G2, FIND(" ", G2 & " ") - 1)), IF(OR(LEFT(G2, 4) = "Pod:", G2 = ""), "", IFERROR(IF(ISERROR(FIND(",", G2)), G2, LEFT(G2, FIND(",", G2) - 1)), G2)))'''
+POD_FORMULA = '''=IFERROR(MID(G2, SEARCH("Pod: ", G2) + LEN("Pod: "), SEARCH(",", G2, SEARCH("Pod: ", G2)) - (SEARCH("Pod: ", G2) + LEN("Pod: "))), "")'''
+ISDEFECT_FORMULA = '''=IF(ISNUMBER(SEARCH("Defect", G2)), "Defect", "")'''
+HYPERLINK_FORMULA = '''=HYPERLINK(B2, TRIM(RIGHT(SUBSTITUTE(B2, "/", REPT(" ", 100)), 100)))'''
+
+
+# Python equivalent of label_status_formula: the text after "Status: " up to the next comma
+def label_status(labels):
+    if not isinstance(labels, str):
+        return ''
+    start = labels.lower().find('status: ')
+    if start == -1:
+        return ''
+    start += len('status: ')
+    end = labels.find(',', start)
+    return labels[start:end] if end != -1 else labels[start:]
+
+
+# Python equivalent of issuetype_formula: the leading issue type word, else the first label
+def label_issue_type(labels):
+    if not isinstance(labels, str) or labels == '':
+        return ''
+    first_word = labels.split(' ', 1)[0].upper()
+    if first_word in ISSUE_TYPES:
+        return first_word
+    if labels[:4].lower() == 'pod:':
+        return ''
+    return labels.split(',', 1)[0]
+
+
+# Python equivalent of pod_formula: the text after "Pod: " up to the next comma (blank when no comma follows)
+def label_pod(labels):
+    if not isinstance(labels, str):
+        return ''
+    start = labels.lower().find('pod: ')
+    if start == -1:
+        return ''
+    end = labels.find(',', start)
+    if end == -1:
+        return ''
+    return labels[start + len('pod: '):end]
+
+
+# Python equivalent of isdefect_formula
+def label_is_defect(labels):
+    if isinstance(labels, str) and 'defect' in labels.lower():
+        return 'Defect'
+    return ''
+
+
+# Python equivalent of the convertHyperlink display text: the issue number at the end of the URL
+def issue_link_text(url):
+    if not isinstance(url, str):
+        return ''
+    return url.rstrip('/').split('/')[-1].strip()
+
+
+# Function to build a board sheet (fetched columns plus the derived label columns) as a DataFrame
+def build_board_view(df, board_name, include_status=True):
+    # Columns beyond the fetched ones are configured extra project fields; they follow the board columns
+    fetched_columns = ["Title", "URL", "Created At", "Updated At", "State", "Author", "Labels", "Milestone", "Status"]
+    extra_columns = [column for column in df.columns if column not in fetched_columns]
+    extras = df[extra_columns]
+    df = df.reindex(columns=fetched_columns)
+    labels = df['Labels']
+    board = pd.DataFrame({
+        "Title": df['Title'],
+        "URL": df['URL'],
+        "Created At": df['Created At'],
+        "Updated At": df['Updated At'],
+        "State": df['State'],
+        "Author": df['Author'],
+        "Labels": labels,
+        "LabelStatus": labels.map(label_status),
+        "LabelIssueType": labels.map(label_issue_type),
+        "Pod": labels.map(label_pod),
+        "IsDefect": labels.map(label_is_defect),
+        "Milestone": df['Milestone'],
+        "GitHub Link ": df['URL'].map(issue_link_text),
+        "POD Project ": board_name,
+        "Status": df['Status'],
+    }, columns=BOARD_COLUMNS)
+    if not include_status:
+        board = board.drop(columns=["Status"])
+    for column in extra_columns:
+        board[column] = extras[column]
+    return board
+
+
+# Function to build the Release1.8items, Defects and Features views from the board views
+def build_release_views(board_views, release_milestones=RELEASE_MILESTONES):
+    if board_views:
+        all_rows = pd.concat(board_views.values(), ignore_index=True)
+    else:
+        all_rows = pd.DataFrame(columns=BOARD_COLUMNS)
+    all_rows = all_rows.rename(columns={"LabelIssueType": "IssueType", "GitHub Link ": "GitHub Link", "POD Project ": "Pod Project"})
+    view_columns = [column for column in VIEW_COLUMNS if column in all_rows.columns]
+
+    # Release items: rows on a release milestone, de-duplicated by URL
+    release_df = all_rows[all_rows['Milestone'].isin(release_milestones)][view_columns]
+    release_df = release_df.drop_duplicates(subset=["URL"]).reset_index(drop=True)
+
+    # Defects: rows with "Defect" in the labels, de-duplicated by URL
+    labels = all_rows['Labels'].fillna('')
+    defect_df = all_rows[labels.str.contains('Defect', regex=False)].drop_duplicates(subset=["URL"])
+    defect_df = defect_df.assign(IsDefect='Defect')
+    defect_df = defect_df[[column for column in DEFECT_COLUMNS if column in defect_df.columns]].reset_index(drop=True)
+
+    # Features: release items labelled "Feature"; unlabelled rows are kept, as in the Excel Features sheet
+    release_labels = release_df['Labels'].fillna('')
+    features_df = release_df[(release_labels == '') | release_labels.str.contains('Feature', regex=False)].copy()
+    features_df.loc[features_df['Labels'].fillna('') != '', 'IssueType'] = 'Feature'
+    features_df = features_df[[column for column in FEATURE_COLUMNS if column in features_df.columns]].reset_index(drop=True)
+
+    return {"Release1.8items": release_df, "Defects": defect_df, "Features": features_df}
+
+
+# Function to build every table of the release/defects report, keyed by sheet name
+def build_report_tables(project_dataframes, include_status=True, release_milestones=RELEASE_MILESTONES, include_summary=None):
+    tables = {}
+    for board_name, df in project_dataframes.items():
+        tables[board_name] = build_board_view(df, board_name, include_status=include_status)
+    board_views = dict(tables)
+    tables.update(build_release_views(board_views, release_milestones))
+    if include_status and (summary_enabled() if include_summary is None else include_summary):
+        tables.update(build_summary_tables(board_views))
+    return tables
+
+
+# Function to read whether the Summary sheets are added to the report (SUMMARY_SHEETS=0 leaves them out)
+def summary_enabled():
+    return os.environ.get("SUMMARY_SHEETS", "1").strip() not in ("0", "false", "no")
+
+
+# Function to count one board's rows by a row field and a column field, with a Total column and row
+def _pivot_counts(board, row_field, column_field):
+    values = board[[row_field, column_field]].astype(object).where(board[[row_field, column_field]].notna(), SUMMARY_BLANK)
+    # Status is stored as text, so a missing Status reads "None"
+    values = values.replace({'': SUMMARY_BLANK, 'None': SUMMARY_BLANK, 'nan': SUMMARY_BLANK})
+    counts = pd.crosstab(values[row_field], values[column_field], margins=True, margins_name="Total")
+    return counts.rename_axis(index=row_field, columns=None).reset_index()
+
+
+# Function to build the Summary sheets from the board views: one block per board and an "All boards" rollup,
+# where an issue that is on several boards counts once
+def build_summary_tables(board_views):
+    boards = {name: view for name, view in board_views.items() if len(view)}
+    if boards:
+        all_rows = pd.concat(boards.values(), ignore_index=True).drop_duplicates(subset=["URL"])
+    else:
+        all_rows = pd.DataFrame(columns=BOARD_COLUMNS)
+    tables = {}
+    for sheet_name, (row_field, column_field) in SUMMARY_PIVOTS.items():
+        blocks = [(SUMMARY_ALL_BOARDS, all_rows)] + list(boards.items())
+        pivots = [_pivot_counts(board, row_field, column_field).assign(Board=board_name) for board_name, board in blocks if len(board)]
+        if pivots:
+            summary = pd.concat(pivots, ignore_index=True)
+            # Count columns in the order they first appear, Total last; a board without a value counts 0 there
+            count_columns = [column for column in summary.columns if column not in ("Board", row_field, "Total")] + ["Total"]
+            summary[count_columns] = summary[count_columns].fillna(0).astype(int)
+            tables[sheet_name] = summary[["Board", row_field] + count_columns]
+        else:
+            tables[sheet_name] = pd.DataFrame(columns=["Board", row_field, "Total"])
+    return tables
@@ -0,0 +1,184 @@
+import re
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+import async_rest
+import checkpoints
+import excel_styles
+import output_backends
+import record_spill
+import run_metrics
+
+# Sheet columns of the issue and pull request exports
+ISSUE_COLUMNS = ["Number", "Type", "Title", "Body", "Reporter (User)", "Created dt", "Assignees", "Labels", "Milestone", "State"]
+PULL_COLUMNS = ["Number", "Type", "Title", "Body", "Reporter (User)", "Labels", "Milestone", "State", "Reviewers", "Committers"]
+
+
+# Function to clean free text for an Excel cell: strips HTML tags, replaces URLs and truncates to the cell limit
+def sanitize_for_excel(text, keep_newlines=True):
+    if not isinstance(text, str):
+        text = str(text)
+    if not text:
+        return text  # or return "" to avoid NoneType issues
+    # Remove HTML tags
+    text = re.sub('<[^<]+?>', ' ', text)
+    # Replace URLs with a simple placeholder or remove them
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[LINK]', text)
+    # Remove or replace other illegal characters as needed
+    if not keep_newlines:
+        text = text.replace('\n', ' ').replace('\r', '').replace('\t', ' ')
+    # Truncate to avoid Excel cell character limit issues
+    text = (text[:32767]) if len(text) > 32767 else text
+    return text
+
+
+# Function to fetch every page of a REST list endpoint (issues or pulls, all states)
+# In the bounded-memory mode (MEMORY_BUDGET_MB) the items spill to disk instead of growing one list.
+# REST_ENGINE=async fetches the pages concurrently with async_rest instead, in the same order.
+def fetch_all_items(base_url, headers):
+    if async_rest.selected_rest_engine() == 'async':
+        return async_rest.fetch_all_items(base_url, headers)
+
+    items = record_spill.record_list()
+    page = 1
+
+    # Pick up after the last page a previous, interrupted run saved for this endpoint
+    checkpoint_name = f"rest_{base_url}"
+    checkpoint = checkpoints.load_checkpoint(checkpoint_name)
+    if checkpoint:
+        items.extend(checkpoint['records'])
+        page = checkpoint['position']
+        print(f"Resuming {base_url} from its checkpoint at page {page} after {len(items)} items")
+
+    while True:
+        # Construct the full URL with query parameters for each request
+        api_url = f"{base_url}?state=all&page={page}&per_page=100"
+        response = run_metrics.http_get(api_url, headers=headers)
+        print(f"Fetching {api_url}")  # Debug print to check the constructed URL
+
+        if response.status_code == 200:
+            data = response.json()
+            if not data:
+                checkpoints.clear_checkpoint(checkpoint_name)
+                break  # No more data, exit the loop
+            items.extend(data)
+            page += 1
+            checkpoints.save_checkpoint(checkpoint_name, page, data)
+        else:
+            print(f"Failed to fetch data. Status Code: {response.status_code}. Response: {response.text} status_code: {response.status_code}")
+            break
+    return items
+
+
+def get_username_from_string(input_string):
+    start_index = input_string.find("'login': '") + len("'login': '")
+    end_index = input_string.find("_kpmg'")
+    input_string = input_string[start_index:end_index]
+    return input_string
+
+
+# Function to tell whether an item from the /issues endpoint is really a pull request
+def is_pull_request(item):
+    return 'pull_request' in item
+
+
+# Function to build one issue row in ISSUE_COLUMNS order; returns the row and the issue URL for the Number hyperlink
+def issue_row(issue):
+    issue_user = sanitize_for_excel(issue["user"])
+    row = [
+        issue["number"],
+        "Issue",
+        issue["title"],
+        sanitize_for_excel(issue["body"]),
+        get_username_from_string(issue_user),
+        issue["created_at"],
+        ",".join(assignee["login"] for assignee in issue["assignees"]),
+        ",".join(label["name"] for label in issue["labels"]),
+        issue["milestone"]["title"] if issue["milestone"] else "",
+        issue["state"],
+    ]
+    return row, issue["html_url"]
+
+
+# Function to build one pull request row in PULL_COLUMNS order; returns the row and the pull request URL
+def pull_row(pull):
+    row = [
+        pull["number"],
+        "Pull Request",
+        sanitize_for_excel(pull["title"], keep_newlines=False),
+        pull["body"],
+        ",".join(assignee["login"] for assignee in pull["assignees"]),
+        ",".join(label["name"] for label in pull["labels"]),
+        pull["milestone"]["title"] if pull["milestone"] else "",
+        pull["state"],
+        ",".join(reviewer["login"] for reviewer in pull["requested_reviewers"]),
+        pull["user"]["login"],
+    ]
+    return row, pull["html_url"]
+
+
+# Function to write rows into an openpyxl sheet: header, the first column linked to the item URL (when urls are given), then widths sized to the content
+def write_rows_sheet(sheet, header_row, rows, urls=None):
+    excel_styles.register_styles(sheet.parent)
+    for col_num, header in enumerate(header_row, 1):
+        sheet[f"{get_column_letter(col_num)}1"] = header
+
+    for row_num, row in enumerate(rows, 2):
+        for col_num, value in enumerate(row, 1):
+            sheet[f"{get_column_letter(col_num)}{row_num}"] = value
+        if urls:
+            excel_styles.set_link(sheet[f"A{row_num}"], urls[row_num - 2], row[0])
+
+    # Adjust column widths
+    for col in sheet.columns:
+        max_length = 0
+        for cell in col:
+            if cell.value:
+                max_length = max(max_length, len(str(cell.value)))
+        adjusted_width = (max_length + 2) * 1.2
+        sheet.column_dimensions[col[0].column_letter].width = adjusted_width
+
+
+# Function to write sheets into a write-only workbook, streaming rows instead of holding every cell (bounded-memory mode).
+# sheets maps a title to (header_row, entries), where entries() returns a fresh iterator of (row, url); it is read twice,
+# once to size the columns (write-only sheets need widths before any row) and once to write the rows.
+def write_rows_workbook(output_filename, sheets):
+    wb = excel_styles.register_styles(Workbook(write_only=True))
+    for sheet_title, (header_row, entries) in sheets.items():
+        sheet = wb.create_sheet(sheet_title)
+        widths = [len(str(header)) for header in header_row]
+        has_links = False
+        for row, url in entries():
+            has_links = has_links or bool(url)
+            for index, value in enumerate(row):
+                if value:
+                    widths[index] = max(widths[index], len(str(value)))
+        if has_links:
+            excel_styles.style_link_column(sheet, "A")
+        for index, max_length in enumerate(widths, 1):
+            sheet.column_dimensions[get_column_letter(index)].width = (max_length + 2) * 1.2
+        sheet.append(header_row)
+        for row, url in entries():
+            cells = list(row)
+            if url:
+                cells[0] = excel_styles.set_link(WriteOnlyCell(sheet), url, row[0])
+            sheet.append(cells)
+    wb.save(output_filename)
+    return output_filename
+
+
+# Function to write every output of the bounded-memory mode from (header_row, entries) sheets: columnar formats in chunks,
+# then the workbook through write_rows_workbook
+def write_streamed_outputs(sheets, output_base, formats):
+    for output_format in formats:
+        if output_format == 'xlsx':
+            continue
+        for sheet_title, (header_row, entries) in sheets.items():
+            filename = f"{output_base}_{output_backends.table_file_part(sheet_title)}.{output_backends.FORMAT_EXTENSIONS[output_format]}"
+            output_backends.write_table_chunks(record_spill.chunks((row for row, url in entries()), header_row), filename, output_format)
+            print(f"{sheet_title} written to {filename}")
+    if 'xlsx' in formats:
+        write_rows_workbook(f"{output_base}.xlsx", sheets)
+        print(f"Data written to {output_base}.xlsx")
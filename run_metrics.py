@@ -0,0 +1,230 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import requests
+
+# resource is not available on Windows; psutil is an optional fallback there
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# GitHub API root; GITHUB_API_URL points every script somewhere else, e.g. http://127.0.0.1:8790 for mock_github_server.py
+DEFAULT_API_URL = "https://api.github.com"
+
+# HTTP status codes that are worth retrying (GitHub returns these on timeouts and overload)
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# Metrics collected for the current run; stages are tracked per thread so worker threads attribute correctly
+metrics = {}
+_lock = threading.RLock()
+_local = threading.local()
+
+
+# Function to read the GitHub API root for this run (REST paths and /graphql are appended to it)
+def github_api_url():
+    return os.environ.get("GITHUB_API_URL", DEFAULT_API_URL).rstrip("/")
+
+
+def _stage_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+# Function to start a fresh metrics record for a run
+def reset_metrics(run_name):
+    metrics.clear()
+    metrics.update({
+        'run': run_name,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'duration_seconds': 0.0,
+        'peak_memory_mb': None,
+        'requests': _new_counters(),
+        'rate_limit': {'cost': 0, 'remaining': None, 'limit': None, 'reset_at': None},
+        'stages': {},
+    })
+    metrics['_start'] = time.perf_counter()
+    _stage_stack().clear()
+
+
+def _new_counters():
+    return {'count': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0}
+
+
+def _stage_entry(name):
+    with _lock:
+        if not metrics:
+            reset_metrics('run')
+        if name not in metrics['stages']:
+            metrics['stages'][name] = {'seconds': 0.0, 'rows': 0, 'requests': _new_counters(), 'rate_limit_cost': 0}
+        return metrics['stages'][name]
+
+
+# Function to read the peak resident memory of this process in MB
+def peak_memory_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+        if sys.platform == 'darwin':
+            return round(peak / (1024 * 1024), 1)
+        return round(peak / 1024, 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 1)
+    return None
+
+
+# Function to mark the start of a pipeline stage, e.g. "fetch:Workbench Program Status"
+def begin_stage(name):
+    _stage_entry(name)
+    _stage_stack().append((name, time.perf_counter()))
+
+
+# Function to mark the end of the innermost pipeline stage
+def end_stage():
+    name, start = _stage_stack().pop()
+    entry = _stage_entry(name)
+    with _lock:
+        entry['seconds'] = round(entry['seconds'] + time.perf_counter() - start, 3)
+        metrics['peak_memory_mb'] = peak_memory_mb()
+    return entry
+
+
+# Context manager form of begin_stage/end_stage for smaller blocks
+@contextmanager
+def stage(name):
+    begin_stage(name)
+    try:
+        yield _stage_entry(name)
+    finally:
+        end_stage()
+
+
+# Function to record the number of rows a stage produced
+def record_rows(stage_name, count):
+    entry = _stage_entry(stage_name)
+    with _lock:
+        entry['rows'] += count
+
+
+# Function to record one HTTP round trip against the run and the current stage
+def record_request(duration, nbytes, ok=True, retry=False):
+    stack = _stage_stack()
+    with _lock:
+        if not metrics:
+            reset_metrics('run')
+        targets = [metrics['requests']]
+        if stack:
+            targets.append(_stage_entry(stack[-1][0])['requests'])
+        for counters in targets:
+            counters['count'] += 1
+            counters['bytes'] += nbytes
+            counters['seconds'] = round(counters['seconds'] + duration, 3)
+            if retry:
+                counters['retries'] += 1
+            if not ok:
+                counters['errors'] += 1
+
+
+# Function to record the rateLimit block of a GraphQL response
+def record_rate_limit(data):
+    rate_limit = (data.get('data') or {}).get('rateLimit') if isinstance(data, dict) else None
+    if not rate_limit:
+        return
+    stack = _stage_stack()
+    cost = rate_limit.get('cost') or 0
+    with _lock:
+        if not metrics:
+            reset_metrics('run')
+        metrics['rate_limit']['cost'] += cost
+        metrics['rate_limit']['remaining'] = rate_limit.get('remaining')
+        metrics['rate_limit']['limit'] = rate_limit.get('limit')
+        metrics['rate_limit']['reset_at'] = rate_limit.get('resetAt')
+        if stack:
+            _stage_entry(stack[-1][0])['rate_limit_cost'] += cost
+
+
+# Function to send an HTTP request through the metrics layer, retrying transient failures
+def http_request(method, url, retries=2, backoff=2, **kwargs):
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            record_request(time.perf_counter() - start, 0, ok=False, retry=attempt > 0)
+            if attempt >= retries:
+                raise
+        else:
+            ok = response.status_code < 400
+            record_request(time.perf_counter() - start, len(response.content), ok=ok, retry=attempt > 0)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                return response
+        attempt += 1
+        print(f"Retrying {method} {url} (attempt {attempt + 1} of {retries + 1})")
+        time.sleep(backoff * attempt)
+
+
+def http_get(url, **kwargs):
+    return http_request('GET', url, **kwargs)
+
+
+def http_post(url, **kwargs):
+    return http_request('POST', url, **kwargs)
+
+
+# Function to render the metrics in the Prometheus text exposition format
+def prometheus_text():
+    run = metrics.get('run', 'run')
+    lines = [
+        '# TYPE getprojects_run_duration_seconds gauge',
+        f'getprojects_run_duration_seconds{{run="{run}"}} {metrics["duration_seconds"]}',
+        '# TYPE getprojects_http_requests_total counter',
+        f'getprojects_http_requests_total{{run="{run}"}} {metrics["requests"]["count"]}',
+        '# TYPE getprojects_http_retries_total counter',
+        f'getprojects_http_retries_total{{run="{run}"}} {metrics["requests"]["retries"]}',
+        '# TYPE getprojects_http_response_bytes_total counter',
+        f'getprojects_http_response_bytes_total{{run="{run}"}} {metrics["requests"]["bytes"]}',
+        '# TYPE getprojects_graphql_rate_limit_cost_total counter',
+        f'getprojects_graphql_rate_limit_cost_total{{run="{run}"}} {metrics["rate_limit"]["cost"]}',
+    ]
+    if metrics['rate_limit']['remaining'] is not None:
+        lines.append('# TYPE getprojects_graphql_rate_limit_remaining gauge')
+        lines.append(f'getprojects_graphql_rate_limit_remaining{{run="{run}"}} {metrics["rate_limit"]["remaining"]}')
+    if metrics['peak_memory_mb'] is not None:
+        lines.append('# TYPE getprojects_peak_memory_megabytes gauge')
+        lines.append(f'getprojects_peak_memory_megabytes{{run="{run}"}} {metrics["peak_memory_mb"]}')
+    lines.append('# TYPE getprojects_stage_duration_seconds gauge')
+    for name, entry in metrics['stages'].items():
+        label = name.replace('\\', '\\\\').replace('"', '\\"')
+        lines.append(f'getprojects_stage_duration_seconds{{run="{run}",stage="{label}"}} {entry["seconds"]}')
+        lines.append(f'getprojects_stage_rows{{run="{run}",stage="{label}"}} {entry["rows"]}')
+        lines.append(f'getprojects_stage_requests{{run="{run}",stage="{label}"}} {entry["requests"]["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+# Function to write the metrics JSON (and optionally a Prometheus file) next to an output file
+def write_metrics(output_filename, prometheus=None):
+    if prometheus is None:
+        prometheus = os.environ.get('RUN_METRICS_PROMETHEUS', '') not in ('', '0')
+    metrics['duration_seconds'] = round(time.perf_counter() - metrics.get('_start', time.perf_counter()), 3)
+    metrics['peak_memory_mb'] = peak_memory_mb()
+    base_name = os.path.splitext(output_filename)[0]
+    metrics_filename = f"{base_name}_metrics.json"
+    with open(metrics_filename, 'w', encoding='utf-8') as metrics_file:
+        json.dump({key: value for key, value in metrics.items() if not key.startswith('_')}, metrics_file, indent=2)
+    if prometheus:
+        with open(f"{base_name}_metrics.prom", 'w', encoding='utf-8') as prom_file:
+            prom_file.write(prometheus_text())
+    print(f"Run metrics written to {metrics_filename}")
+    return metrics_filename
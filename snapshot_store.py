@@ -0,0 +1,158 @@
+import glob
+import os
+import re
+from datetime import datetime
+
+import pandas as pd
+
+import report_views
+
+# Folder the per-run board snapshots are kept in for diff_snapshots.py when SNAPSHOT_DIR=1; SNAPSHOT_DIR=<folder> picks another.
+# Off by default, as every run adds a file.
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+# Snapshots kept per script; older runs are deleted after each save, e.g. SNAPSHOT_KEEP=52 (SNAPSHOT_KEEP=0 keeps them all)
+DEFAULT_SNAPSHOT_KEEP = 90
+
+# An item is one issue on one board; the same issue on two boards is tracked separately
+KEY_COLUMNS = ["Board", "URL"]
+
+# Columns a diff reports transitions for unless others are asked for
+TRACKED_COLUMNS = ["Status", "Milestone", "State"]
+
+# Board view columns kept in a snapshot (GitHub Link is derived from URL and POD Project becomes Board)
+SNAPSHOT_COLUMNS = KEY_COLUMNS + [column for column in report_views.BOARD_COLUMNS if column not in ("URL", "GitHub Link ", "POD Project ")]
+
+# Run timestamp in a snapshot file name, e.g. getProjectsStatus_20240101_120000.parquet
+RUN_PATTERN = re.compile(r'(\d{8}_\d{6})\.parquet$')
+
+
+# Function to read the snapshot folder for this run (None when snapshots are off)
+def snapshot_dir():
+    path = os.environ.get("SNAPSHOT_DIR", "0").strip()
+    if path.lower() in ("", "0", "false", "no"):
+        return None
+    return DEFAULT_SNAPSHOT_DIR if path.lower() in ("1", "true", "yes") else path
+
+
+# Function to read how many snapshots of each script are kept (0 keeps every one)
+def snapshot_keep():
+    return max(0, int(os.environ.get("SNAPSHOT_KEEP", DEFAULT_SNAPSHOT_KEEP)))
+
+
+# Function to build one snapshot table from the fetched boards (board name -> fetched DataFrame), one row per board item
+def snapshot_frame(project_dataframes):
+    frames = []
+    for board_name, df in project_dataframes.items():
+        board = report_views.build_board_view(df, board_name).rename(columns={"POD Project ": "Board"})
+        extra_columns = [column for column in board.columns if column not in report_views.BOARD_COLUMNS and column != "Board"]
+        frames.append(board.reindex(columns=SNAPSHOT_COLUMNS + extra_columns))
+    if not frames:
+        return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    snapshot = pd.concat(frames, ignore_index=True)
+    # An issue added to a board twice keeps its first row, like the report views
+    snapshot = snapshot.drop_duplicates(subset=KEY_COLUMNS, keep="first")
+    return snapshot.astype({column: "string" for column in snapshot.columns})
+
+
+# Function to write this run's boards as a zstd-compressed Parquet snapshot, e.g. snapshots/getProjectsStatus_20240101_120000.parquet
+def save_snapshot(project_dataframes, run_name, directory=None):
+    directory = directory or snapshot_dir()
+    if directory is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{run_name}.parquet")
+    snapshot = snapshot_frame(project_dataframes)
+    snapshot.to_parquet(path, index=False, compression="zstd")
+    print(f"{len(snapshot)} board items saved to the snapshot {path}")
+    prune_snapshots(directory, run_prefix(path))
+    return path
+
+
+# Function to read the script part of a snapshot file name, e.g. getProjectsStatus_ for getProjectsStatus_20240101_120000.parquet
+def run_prefix(path):
+    return RUN_PATTERN.split(os.path.basename(path))[0]
+
+
+# Function to delete the oldest snapshots of one script (its run_prefix) beyond the newest keep
+def prune_snapshots(directory, prefix, keep=None):
+    keep = snapshot_keep() if keep is None else keep
+    if not keep:
+        return []
+    stale = [path for path in list_snapshots(directory, prefix) if run_prefix(path) == prefix][:-keep]
+    for path in stale:
+        os.remove(path)
+    if stale:
+        print(f"Removed {len(stale)} snapshots older than the newest {keep}")
+    return stale
+
+
+# Function to read the run time from a snapshot file name
+def snapshot_time(path):
+    match = RUN_PATTERN.search(os.path.basename(path))
+    return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S") if match else None
+
+
+# Function to list the snapshots in a folder, oldest first; prefix keeps the runs of one script, e.g. getProjectsStatus
+def list_snapshots(directory=None, prefix=None):
+    directory = directory or snapshot_dir() or DEFAULT_SNAPSHOT_DIR
+    paths = [path for path in glob.glob(os.path.join(directory, "*.parquet")) if snapshot_time(path) is not None]
+    if prefix:
+        paths = [path for path in paths if os.path.basename(path).startswith(prefix)]
+    return sorted(paths, key=lambda path: (snapshot_time(path), path))
+
+
+# Function to read a snapshot; columns limits it to the ones needed, which Parquet reads without loading the rest
+def load_snapshot(path, columns=None):
+    return pd.read_parquet(path, columns=columns)
+
+
+# Function to compare two snapshots with a keyed join on Board and URL.
+# Returns sheet name -> DataFrame: Transitions (one row per item and changed field), Added and Removed items.
+def diff_snapshots(old, new, fields=None):
+    fields = [field for field in (fields or TRACKED_COLUMNS) if field in old.columns and field in new.columns]
+    joined = old.merge(new, on=KEY_COLUMNS, how="outer", suffixes=(" (old)", " (new)"), indicator=True)
+
+    added = new.merge(joined.loc[joined["_merge"] == "right_only", KEY_COLUMNS], on=KEY_COLUMNS)
+    removed = old.merge(joined.loc[joined["_merge"] == "left_only", KEY_COLUMNS], on=KEY_COLUMNS)
+
+    both = joined[joined["_merge"] == "both"]
+    transitions = []
+    for field in fields:
+        before = both[f"{field} (old)"].fillna("")
+        after = both[f"{field} (new)"].fillna("")
+        changed = both[before != after]
+        transitions.append(pd.DataFrame({
+            "Board": changed["Board"],
+            "URL": changed["URL"],
+            "Title": changed["Title (new)"],
+            "Field": field,
+            "From": before[before != after],
+            "To": after[before != after],
+        }))
+    transitions = pd.concat(transitions, ignore_index=True) if transitions else pd.DataFrame(columns=["Board", "URL", "Title", "Field", "From", "To"])
+    transitions = transitions.sort_values(["Board", "URL", "Field"], kind="stable").reset_index(drop=True)
+    return {"Transitions": transitions, "Added": added.reset_index(drop=True), "Removed": removed.reset_index(drop=True)}
+
+
+# Function to count items per Board and field value for every snapshot (e.g. Status per run for a burn-down).
+# With weekly only the last run of each ISO week is kept. Only the Board and field columns are read from each file.
+def field_history(paths, field="Status", weekly=False):
+    if weekly:
+        last_of_week = {}
+        for path in paths:
+            last_of_week[snapshot_time(path).isocalendar()[:2]] = path
+        paths = list(last_of_week.values())
+    frames = []
+    for path in paths:
+        snapshot = load_snapshot(path, columns=["Board", field])
+        counts = snapshot.fillna({field: ""}).groupby(["Board", field]).size().unstack(fill_value=0)
+        counts.insert(0, "Run", snapshot_time(path).strftime("%Y-%m-%d %H:%M:%S"))
+        frames.append(counts.reset_index())
+    if not frames:
+        return pd.DataFrame(columns=["Run", "Board"])
+    history = pd.concat(frames, ignore_index=True).fillna(0)
+    value_columns = [column for column in history.columns if column not in ("Run", "Board")]
+    history[value_columns] = history[value_columns].astype(int)
+    history.columns.name = None
+    return history[["Run", "Board"] + value_columns]
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import aiohttp
+
+import async_rest
+
+
+def test_fetch_json_many_keeps_other_results_when_one_connection_fails(monkeypatch):
+    async def fake_request(session, semaphore, method, url, retries=2, backoff=2, **kwargs):
+        if url.endswith("/2"):
+            raise aiohttp.ClientConnectionError("connection reset")
+        await asyncio.sleep(0)
+        return 200, f'{{"number": {url.rsplit("/", 1)[1]}}}'.encode(), {}
+
+    monkeypatch.setattr(async_rest, "request", fake_request)
+    results = async_rest.fetch_json_many([f"http://mock/issues/{number}" for number in (1, 2, 3)], {})
+    assert [status for status, data, text in results] == [200, 0, 200]
+    assert results[0][1] == {"number": 1} and results[2][1] == {"number": 3}
+    assert results[1][1] is None and "connection reset" in results[1][2]
+
+
+def test_last_page_number_reads_the_link_header():
+    link = '<https://api.github.com/repos/o/r/issues?state=all&page=2&per_page=100>; rel="next", ' \
+           '<https://api.github.com/repos/o/r/issues?state=all&page=7&per_page=100>; rel="last"'
+    assert async_rest.last_page_number(link) == 7
+    assert async_rest.last_page_number(None) is None
+
+
+def test_host_slots_cap_requests_in_flight_across_threads(monkeypatch):
+    monkeypatch.setenv("REST_CONCURRENCY", "3")
+    monkeypatch.setattr(async_rest, "_host_slots", {})
+    in_flight = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    async def one_request(url):
+        async with async_rest.host_slot(url):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.02)
+            with lock:
+                in_flight["now"] -= 1
+
+    async def one_target():
+        await asyncio.gather(*(one_request(f"https://api.github.com/repos/o/r/issues/{number}") for number in range(5)))
+
+    # Each worker thread runs its own event loop, like export_targets with REST_ENGINE=async
+    threads = [threading.Thread(target=asyncio.run, args=(one_target(),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert in_flight["peak"] == 3
+    assert async_rest.host_slots("https://api.github.com/graphql") is async_rest.host_slots("https://api.github.com/x")
+    assert async_rest.host_slots("https://github.example.com/api/v3/x") is not async_rest.host_slots("https://api.github.com/x")
@@ -0,0 +1,92 @@
+import os
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+import delta_update
+
+
+def board_table():
+    return pd.DataFrame({
+        "Title": ["One", "Two"],
+        "URL": ["https://github.com/o/r/issues/1", "https://github.com/o/r/issues/2"],
+        "Status": ["Todo", "Done"],
+    })
+
+
+def summary_table():
+    return pd.DataFrame({"Board": ["B", "B"], "Status": ["Todo", "Done"], "Issues": [1, 1], "Total": [1, 1]})
+
+
+def first_report(path, board=None):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for sheet_name, df in (("Board", board_table() if board is None else board), ("Summary", summary_table())):
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(list(df.columns))
+        for record in df.itertuples(index=False, name=None):
+            sheet.append(list(record))
+    workbook.save(path)
+
+
+def update(previous, output, tables):
+    return delta_update.update_report_workbook(str(previous), tables, str(output), formulas=False)
+
+
+def test_unchanged_summary_sheet_is_not_flagged_or_counted(tmp_path):
+    first_report(tmp_path / "r1.xlsx")
+    counts = update(tmp_path / "r1.xlsx", tmp_path / "r2.xlsx", {"Board": board_table(), "Summary": summary_table()})
+    assert counts["Summary"] == {"changed": 0, "added": 0, "removed": 0, "replaced": 0}
+    assert counts["Board"] == {"changed": 0, "added": 0, "removed": 0, "replaced": 0}
+    sheet = load_workbook(tmp_path / "r2.xlsx")["Summary"]
+    assert [cell.value for cell in sheet[1]] == list(summary_table().columns)
+
+
+def test_changed_summary_sheet_is_replaced_without_flags(tmp_path):
+    first_report(tmp_path / "r1.xlsx")
+    board = board_table()
+    board.loc[0, "Status"] = "Done"
+    summary = pd.DataFrame({"Board": ["B"], "Status": ["Done"], "Issues": [2], "Total": [2]})
+    counts = update(tmp_path / "r1.xlsx", tmp_path / "r2.xlsx", {"Board": board, "Summary": summary})
+    assert counts["Board"]["changed"] == 1 and counts["Board"]["added"] == 0
+    assert counts["Summary"] == {"changed": 0, "added": 0, "removed": 0, "replaced": 1}
+    sheet = load_workbook(tmp_path / "r2.xlsx")["Summary"]
+    assert [list(row) for row in sheet.iter_rows(values_only=True)] == [["Board", "Status", "Issues", "Total"], ["B", "Done", 2, 2]]
+
+
+def test_unchanged_tables_copy_the_previous_report(tmp_path, monkeypatch):
+    first_report(tmp_path / "r1.xlsx")
+    tables = {"Board": board_table(), "Summary": summary_table()}
+    update(tmp_path / "r1.xlsx", tmp_path / "r2.xlsx", tables)
+    assert os.path.exists(delta_update.index_path(str(tmp_path / "r2.xlsx")))
+
+    def fail_load(*args, **kwargs):
+        raise AssertionError("the workbook should not be loaded")
+    monkeypatch.setattr(delta_update, "load_workbook", fail_load)
+    counts = update(tmp_path / "r2.xlsx", tmp_path / "r3.xlsx", tables)
+    assert not any(any(table_counts.values()) for table_counts in counts.values())
+    assert (tmp_path / "r3.xlsx").read_bytes() == (tmp_path / "r2.xlsx").read_bytes()
+
+
+def test_flagged_previous_report_is_rewritten_to_clear_its_markers(tmp_path):
+    first_report(tmp_path / "r1.xlsx")
+    board = board_table()
+    board.loc[1, "Status"] = "Todo"
+    update(tmp_path / "r1.xlsx", tmp_path / "r2.xlsx", {"Board": board, "Summary": summary_table()})
+    counts = update(tmp_path / "r2.xlsx", tmp_path / "r3.xlsx", {"Board": board, "Summary": summary_table()})
+    assert counts["Board"]["changed"] == 0
+    markers = [row[-1] for row in load_workbook(tmp_path / "r3.xlsx")["Board"].iter_rows(min_row=2, values_only=True)]
+    assert markers == [None, None]
+
+
+def test_whole_number_floats_settle_after_one_update(tmp_path):
+    board = board_table()
+    board["Estimate"] = [3.0, None]
+    first_report(tmp_path / "r1.xlsx", board)
+    tables = {"Board": board, "Summary": summary_table()}
+    for previous, output in (("r1.xlsx", "r2.xlsx"), ("r2.xlsx", "r3.xlsx")):
+        counts = update(tmp_path / previous, tmp_path / output, tables)
+        assert counts["Board"] == {"changed": 0, "added": 0, "removed": 0, "replaced": 0}
+    markers = [row[-1] for row in load_workbook(tmp_path / "r3.xlsx")["Board"].iter_rows(min_row=2, values_only=True)]
+    assert markers == [None, None]
+    assert not delta_update._read_index(str(tmp_path / "r3.xlsx"))["marked_sheets"]
@@ -0,0 +1,56 @@
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+import excel_styles
+import rest_exports
+import xlsxwriter_report
+
+URL = "https://github.com/o/r/issues/"
+
+
+def test_links_past_the_sheet_limit_become_formulas(monkeypatch):
+    monkeypatch.setattr(excel_styles, "MAX_SHEET_URLS", 2)
+    sheet = excel_styles.register_styles(Workbook()).active
+    for row in range(1, 5):
+        excel_styles.set_link(sheet.cell(row=row, column=3), URL + str(row))
+    assert [sheet.cell(row=row, column=3).hyperlink is not None for row in range(1, 5)] == [True, True, False, False]
+    assert sheet["C3"].value == f'=HYPERLINK("{URL}3", "3")'
+    assert all(sheet.cell(row=row, column=3).style == excel_styles.LINK_STYLE for row in range(1, 5))
+    assert sheet.column_dimensions["C"].font.underline == "single"
+
+
+def test_hyperlink_formula_escapes_quotes():
+    assert excel_styles.hyperlink_formula('https://x/"a"', 'say "hi"') == '=HYPERLINK("https://x/""a""", "say ""hi""")'
+
+
+def test_refresh_moves_the_column_format_and_caps_loaded_links(tmp_path, monkeypatch):
+    sheet = excel_styles.register_styles(Workbook()).active
+    for row in range(1, 4):
+        sheet.cell(row=row, column=1, value="x")
+        excel_styles.set_link(sheet.cell(row=row, column=3), URL + str(row))
+    sheet.delete_cols(2)
+    monkeypatch.setattr(excel_styles, "MAX_SHEET_URLS", 2)
+    excel_styles.refresh_hyperlinks(sheet)
+    assert [sheet.cell(row=row, column=2).hyperlink.ref for row in range(1, 3)] == ["B1", "B2"]
+    assert sheet["B3"].hyperlink is None and sheet["B3"].value == f'=HYPERLINK("{URL}3", "3")'
+    assert sheet.column_dimensions["B"].font.underline == "single"
+    assert not sheet.column_dimensions["C"].has_style
+    sheet.parent.save(tmp_path / "moved.xlsx")
+
+
+def test_xlsxwriter_report_caps_native_links(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_styles, "MAX_SHEET_URLS", 2)
+    df = pd.DataFrame({"Title": ["a", "b", "c"], "URL": [URL + str(number) for number in (1, 2, 3)], "GitHub Link ": ["1", "2", "3"]})
+    path = xlsxwriter_report.write_report_workbook({"Board": df}, str(tmp_path / "report.xlsx"), formulas=False)
+    sheet = load_workbook(path)["Board"]
+    assert [sheet.cell(row=row, column=3).hyperlink is not None for row in range(2, 5)] == [True, True, False]
+    assert sheet["C4"].value == f'=HYPERLINK("{URL}3", "3")'
+    assert sheet.column_dimensions["C"].font.underline == "single"
+
+
+def test_write_only_workbook_formats_its_link_column(tmp_path):
+    entries = lambda: iter([(["1", "first"], URL + "1"), (["2", "second"], URL + "2")])
+    path = rest_exports.write_rows_workbook(str(tmp_path / "rows.xlsx"), {"Issues": (["Number", "Title"], entries)})
+    sheet = load_workbook(path)["Issues"]
+    assert sheet.column_dimensions["A"].font.underline == "single"
+    assert sheet["A2"].hyperlink.target == URL + "1"
@@ -0,0 +1,79 @@
+import pandas as pd
+
+import issue_store
+import project_fetch
+import report_views
+
+URL = "https://github.com/o/r/issues/"
+
+
+def boards():
+    program = pd.DataFrame([
+        ["Export board", URL + "1", "2024-01-05T09:00:00Z", "2024-02-01T00:00:00Z", "OPEN", "alice", "Feature, Pod: Alpha", "Release 1.8.0", "In Progress"],
+        ["Login fails", URL + "2", "2024-01-06T09:00:00Z", "2024-02-02T00:00:00Z", "OPEN", "bob", "Defect, Pod: Beta, Status: Blocked", "Release 1.7.0", "Todo"],
+        ["Pipeline flaky", URL + "3", "2024-01-07T09:00:00Z", "2024-02-03T00:00:00Z", "CLOSED", "carol", "Task", None, "Done"],
+        ["Unlabelled", URL + "4", "2024-01-08T09:00:00Z", "2024-02-04T00:00:00Z", "OPEN", "alice", None, "Release 1.8.0", "Todo"],
+    ], columns=project_fetch.RECORD_COLUMNS)
+    # Issue 2 is on both boards; the views keep the first board's row
+    stream = pd.DataFrame([
+        ["Login fails", URL + "2", "2024-01-06T09:00:00Z", "2024-02-02T00:00:00Z", "OPEN", "bob", "Defect, Pod: Beta, Status: Blocked", "Release 1.7.0", "In Review"],
+        ["Old defect", URL + "5", "2024-01-09T09:00:00Z", "2024-02-05T00:00:00Z", "CLOSED", "dave", "Defect", "Release 2.0", "Done"],
+    ], columns=project_fetch.RECORD_COLUMNS)
+    return {"Program": program, "Stream": stream}
+
+
+def stored(tmp_path):
+    conn = issue_store.connect(str(tmp_path / "issues.db"))
+    views = {name: report_views.build_board_view(df, name) for name, df in boards().items()}
+    for name, view in views.items():
+        issue_store.save_board(conn, name, view)
+    return conn, views
+
+
+# Function to compare a query result with a sheet: same columns and rows, with blanks as None and values as text
+def as_text(df):
+    return [[None if pd.isna(value) else str(value) for value in row] for row in df.itertuples(index=False, name=None)]
+
+
+def test_views_match_the_report_sheets(tmp_path):
+    conn, views = stored(tmp_path)
+    sheets = dict(views, **report_views.build_release_views(views))
+    all_items = pd.concat(list(views.values()), ignore_index=True)
+    for view, sheet in (("items", all_items), ("Release1.8items", sheets["Release1.8items"]), ("Defects", sheets["Defects"]), ("Features", sheets["Features"])):
+        result = issue_store.query(conn, view=view)
+        assert list(result.columns) == list(sheet.columns), view
+        assert as_text(result) == as_text(sheet), view
+
+
+def test_filters_labels_dates_and_group_by(tmp_path):
+    conn, _ = stored(tmp_path)
+    assert list(issue_store.query(conn, where={"Pod": "Beta"})["URL"]) == [URL + "2", URL + "2"]
+    assert list(issue_store.query(conn, labels=["Defect", "Pod: Beta"], where={"POD Project": "Stream"})["Status"]) == ["In Review"]
+    assert list(issue_store.query(conn, date_field="created", date_from="2024-01-07", date_to="2024-01-08")["URL"]) == [URL + "3", URL + "4"]
+    counts = issue_store.query(conn, view="Defects", group_by=["Status"])
+    assert counts.to_dict(orient="records") == [{"Status": "Done", "Count": 1}, {"Status": "Todo", "Count": 1}]
+    by_label = issue_store.query(conn, where={"Board": "Program"}, group_by=["Label"])
+    assert dict(zip(by_label["Label"], by_label["Count"]))["Pod: Alpha"] == 1
+
+
+def test_saving_against_the_previous_view_rewrites_only_changed_rows(tmp_path):
+    conn, views = stored(tmp_path)
+    changed = boards()["Program"]
+    changed.loc[1, "Status"] = "Done"
+    changed_view = report_views.build_board_view(changed, "Program")
+    assert issue_store.save_board(conn, "Program", changed_view, views["Program"]) == 1
+    assert as_text(issue_store.query(conn, where={"Board": "Program"})) == as_text(changed_view)
+
+    shorter_view = report_views.build_board_view(changed.drop(index=3), "Program")
+    assert issue_store.save_board(conn, "Program", shorter_view, changed_view) == 0
+    assert as_text(issue_store.query(conn, where={"Board": "Program"})) == as_text(shorter_view)
+    assert conn.execute("SELECT COUNT(*) FROM item_labels WHERE board = 'Program' AND row = 3").fetchone()[0] == 0
+
+
+def test_store_is_opt_in(monkeypatch):
+    monkeypatch.delenv("ISSUE_STORE", raising=False)
+    assert issue_store.store_path() is None
+    monkeypatch.setenv("ISSUE_STORE", "1")
+    assert issue_store.store_path() == issue_store.DEFAULT_STORE_FILE
+    monkeypatch.setenv("ISSUE_STORE", "data/boards.db")
+    assert issue_store.store_path() == "data/boards.db"
@@ -0,0 +1,82 @@
+import pandas as pd
+
+import issue_timelines
+import project_fetch
+import report_views
+
+URL = "https://github.com/o/r/issues/"
+
+
+def event(kind, at, **values):
+    return dict({"type": kind, "at": at, "label": None, "status": None, "previous": None, "project": None}, **values)
+
+
+def status_change(at, status, project=12, previous=None):
+    return event("ProjectV2ItemStatusChangedEvent", at, status=status, previous=previous, project=project)
+
+
+CREATED = "2024-01-01T00:00:00Z"
+
+
+def test_cycle_starts_at_the_first_start_status_and_ends_at_the_close():
+    events = [
+        event("ClosedEvent", "2024-01-11T00:00:00Z"),
+        status_change("2024-01-03T00:00:00Z", "In Progress", previous="Todo"),
+        event("LabeledEvent", "2024-01-02T00:00:00Z", label="Feature"),
+        status_change("2024-01-05T00:00:00Z", "In Progress", previous="In Review"),
+        status_change("2024-01-04T00:00:00Z", "In Review", previous="In Progress"),
+        event("UnlabeledEvent", "2024-01-06T00:00:00Z", label="Feature"),
+    ]
+    values = issue_timelines.timeline_values(CREATED, events, project_number=12, statuses=["In Progress"])
+    assert values == ["2024-01-03T00:00:00Z", "2024-01-11T00:00:00Z", 0, 3, 2, 10.0, 8.0]
+
+
+def test_status_changes_of_other_projects_are_left_out():
+    events = [status_change("2024-01-02T00:00:00Z", "In Progress", project=99), status_change("2024-01-04T00:00:00Z", "In Progress", project=None)]
+    values = issue_timelines.timeline_values(CREATED, events, project_number=12, statuses=["In Progress"])
+    assert values[0] == "2024-01-04T00:00:00Z" and values[3] == 1
+    # Without a project number every status change counts
+    assert issue_timelines.timeline_values(CREATED, events, statuses=["In Progress"])[0] == "2024-01-02T00:00:00Z"
+
+
+def test_reopened_issue_has_no_close_until_it_closes_again():
+    closed = event("ClosedEvent", "2024-01-02T12:00:00Z")
+    reopened = event("ReopenedEvent", "2024-01-03T00:00:00Z")
+    values = issue_timelines.timeline_values(CREATED, [closed, reopened], statuses=["In Progress"])
+    assert values == ["", "", 1, 0, 0, "", ""]
+    closed_again = event("ClosedEvent", "2024-01-04T00:00:00Z")
+    assert issue_timelines.timeline_values(CREATED, [closed, reopened, closed_again], statuses=["In Progress"])[1:3] == ["2024-01-04T00:00:00Z", 1]
+    assert issue_timelines.timeline_values(CREATED, [closed], statuses=["In Progress"])[5] == 1.5
+
+
+def test_start_statuses_come_from_the_setting(monkeypatch):
+    monkeypatch.setenv("TIMELINE_START_STATUSES", "In Review, Doing")
+    assert issue_timelines.start_statuses() == ["In Review", "Doing"]
+    events = [status_change("2024-01-02T00:00:00Z", "In Progress"), status_change("2024-01-03T00:00:00Z", "Doing")]
+    assert issue_timelines.timeline_values(CREATED, events)[0] == "2024-01-03T00:00:00Z"
+
+
+def test_only_issue_urls_have_timelines():
+    assert issue_timelines.parse_issue_url(URL + "7") == ("o", "r", 7)
+    assert issue_timelines.parse_issue_url("https://github.com/o/r/pull/7") is None
+    assert issue_timelines.parse_issue_url(None) is None
+
+
+def test_timeline_tables_take_medians_per_pod_and_milestone():
+    board = report_views.build_board_view(pd.DataFrame([
+        ["One", URL + "1", CREATED, CREATED, "CLOSED", "alice", "Pod: Alpha, Feature", "Release 1.8.0", "Done"],
+        ["Two", URL + "2", CREATED, CREATED, "CLOSED", "alice", "Pod: Alpha, Feature", "Release 1.8.0", "Done"],
+        ["Three", URL + "3", CREATED, CREATED, "OPEN", "alice", "Pod: Alpha, Feature", "Release 1.8.0", "Todo"],
+        ["No timeline", "https://github.com/o/r/pull/4", CREATED, CREATED, "OPEN", "alice", None, None, "Todo"],
+    ], columns=project_fetch.RECORD_COLUMNS), "Program")
+    timelines = {
+        URL + "1": [event("ClosedEvent", "2024-01-03T00:00:00Z")],
+        URL + "2": [event("ClosedEvent", "2024-01-05T00:00:00Z")],
+        URL + "3": [],
+    }
+    tables = issue_timelines.build_timeline_tables({"Program": board}, timelines, {"Program": 12})
+    items = tables[issue_timelines.TIMELINE_SHEET]
+    assert list(items.columns) == issue_timelines.TIMELINE_COLUMNS
+    assert items["URL"].tolist() == [URL + "1", URL + "2", URL + "3"]
+    summary = tables[issue_timelines.TIMELINE_SUMMARY_SHEET].iloc[0]
+    assert (summary["Pod"], summary["Items"], summary["Closed"], summary["Median Lead Time (Days)"]) == ("Alpha", 3, 2, 3.0)
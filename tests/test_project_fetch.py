@@ -0,0 +1,104 @@
+import re
+
+import project_fetch
+import record_spill
+import run_metrics
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+
+def item_node(index):
+    return {
+        'id': f"PVTI_{index}",
+        'content': {'id': f"I_{index}", 'title': f"Issue {index}", 'url': f"https://github.com/o/r/issues/{index}",
+                    'createdAt': "2024-01-01T00:00:00Z", 'updatedAt': "2024-01-02T00:00:00Z", 'state': "OPEN",
+                    'author': {'login': "alice"}, 'labels': {'nodes': []}, 'milestone': None},
+        'status': {'name': "Todo"},
+    }
+
+
+def test_next_page_size_grows_within_the_cost_and_time_budgets():
+    assert project_fetch.next_page_size(40, seconds=0.5, cost=1, cost_budget=5) == 60
+    # A page costing more than 1 still grows, as far as the larger page fits the cost budget
+    assert project_fetch.next_page_size(40, seconds=0.5, cost=2, cost_budget=3) == 60
+    assert project_fetch.next_page_size(40, seconds=0.5, cost=4, cost_budget=5) == 50
+    assert project_fetch.next_page_size(40, seconds=1.6, cost=1, cost_budget=5) == 50
+    assert project_fetch.next_page_size(40, seconds=0.5, cost=6, cost_budget=5) == 40
+    assert project_fetch.next_page_size(80, seconds=0.5, cost=1, ceiling=90, cost_budget=5) == 90
+
+
+def test_next_page_size_shrinks_after_failures_and_slow_pages():
+    assert project_fetch.next_page_size(100, failed=True) == 50
+    assert project_fetch.next_page_size(100, seconds=project_fetch.SLOW_PAGE_SECONDS + 1) == 75
+    assert project_fetch.next_page_size(12, failed=True) == project_fetch.MIN_PAGE_SIZE
+
+
+def test_ceiling_recovers_after_successful_pages(monkeypatch):
+    monkeypatch.setenv("FETCH_CHECKPOINTS", "0")
+    monkeypatch.setenv("PROJECT_PAGE_SIZE", "100")
+    sizes = []
+    state = {'offset': 0, 'failed': False}
+
+    # The first page of 100 fails once; every later page succeeds quickly at cost 1, until 600 items are served
+    def fake_post(url, json=None, **kwargs):
+        size = int(re.search(r'items\(first:\s*(\d+)', json['query']).group(1))
+        sizes.append(size)
+        if size == 100 and not state['failed']:
+            state['failed'] = True
+            return FakeResponse(502)
+        start = state['offset']
+        end = min(start + size, 600)
+        state['offset'] = end
+        items = {'pageInfo': {'endCursor': str(end), 'hasNextPage': end < 600}, 'nodes': [item_node(index) for index in range(start, end)]}
+        return FakeResponse(200, {'data': {'rateLimit': {'cost': 1}, 'organization': {'projectV2': {'items': items}}}})
+
+    monkeypatch.setattr(run_metrics, "http_post", fake_post)
+    records = project_fetch.fetch_project_items(1, "token", org="o", mode="lean", extra_fields=[])
+    assert len(records) == 600
+    # 100 fails; pages stay under the ceiling of 75 until CEILING_RECOVERY_PAGES pages succeed, then grow back to 100
+    recovery = project_fetch.CEILING_RECOVERY_PAGES
+    assert sizes[:2] == [100, 50]
+    assert max(sizes[1:1 + recovery]) == 75
+    assert sizes[1 + recovery] == 100
+
+
+def test_board_fetch_spills_only_with_its_own_budget(monkeypatch):
+    monkeypatch.setenv("FETCH_CHECKPOINTS", "0")
+    page = {'data': {'rateLimit': {'cost': 1}, 'organization': {'projectV2': {'items': {
+        'pageInfo': {'endCursor': "3", 'hasNextPage': False}, 'nodes': [item_node(index) for index in range(3)]}}}}}
+    monkeypatch.setattr(run_metrics, "http_post", lambda *args, **kwargs: FakeResponse(200, page))
+
+    monkeypatch.setenv("MEMORY_BUDGET_MB", "0.0001")
+    assert isinstance(project_fetch.fetch_project_items(1, "token", org="o", mode="lean", extra_fields=[]), list)
+
+    monkeypatch.setenv("PROJECT_FETCH_SPILL_MB", "0.0001")
+    records = project_fetch.fetch_project_items(1, "token", org="o", mode="lean", extra_fields=[])
+    assert isinstance(records, record_spill.SpilledRecords) and records.spill_path is not None
+    assert [record['URL'] for record in records] == [f"https://github.com/o/r/issues/{index}" for index in range(3)]
+    records.close()
+
+
+def test_resumed_fetch_restores_the_item_index(monkeypatch, tmp_path):
+    monkeypatch.setenv("FETCH_CHECKPOINTS", str(tmp_path))
+    monkeypatch.setenv("PROJECT_ADAPTIVE_PAGES", "0")
+
+    # The first run gets one page of two items, then the API fails; the second run resumes from the checkpoint
+    def page(start, end, has_next):
+        items = {'pageInfo': {'endCursor': str(end), 'hasNextPage': has_next}, 'nodes': [item_node(index) for index in range(start, end)]}
+        return FakeResponse(200, {'data': {'rateLimit': {'cost': 1}, 'organization': {'projectV2': {'items': items}}}})
+    responses = [page(0, 2, True), FakeResponse(200, {'errors': [{'message': "Something went wrong"}]}), page(2, 3, False)]
+    monkeypatch.setattr(run_metrics, "http_post", lambda *args, **kwargs: responses.pop(0))
+
+    project_fetch.fetch_project_items(1, "token", org="o", mode="lean", extra_fields=[])
+    item_index = {}
+    records = project_fetch.fetch_project_items(1, "token", org="o", mode="lean", extra_fields=[], item_index=item_index)
+    assert len(records) == 3
+    assert item_index == {f"PVTI_{index}": f"https://github.com/o/r/issues/{index}" for index in range(3)}
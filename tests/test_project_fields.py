@@ -0,0 +1,64 @@
+import project_fields
+
+SCHEMA = {
+    "F1": {"name": "Status", "type": "SINGLE_SELECT", "options": {"o1": "Todo", "o2": "Done"}, "iterations": {}},
+    "F2": {"name": "Estimate", "type": "NUMBER", "options": {}, "iterations": {}},
+    "F3": {"name": "Sprint", "type": "ITERATION", "options": {}, "iterations": {"i1": "Sprint 1", "i2": "Sprint 2"}},
+    "F4": {"name": "Due", "type": "DATE", "options": {}, "iterations": {}},
+    "F5": {"name": "Assignees", "type": "ASSIGNEES", "options": {}, "iterations": {}},
+    "F6": {"name": "Pod", "type": "SINGLE_SELECT", "options": {"o3": "Alpha (renamed)"}, "iterations": {}},
+}
+
+FIELD_VALUES = [
+    {"optionId": "o2", "name": "Done", "field": {"id": "F1", "name": "Status"}},
+    {"number": 3.0, "field": {"id": "F2", "name": "Estimate"}},
+    {"iterationId": "i1", "title": "Sprint 1", "field": {"id": "F3", "name": "Sprint"}},
+    {"date": "2024-02-01", "field": {"id": "F4", "name": "Due"}},
+    {"optionId": "o3", "name": "Alpha", "field": {"id": "F6", "name": "Pod"}},
+]
+
+
+def test_decode_with_schema_reads_names_from_the_field_ids():
+    values = project_fields.decode_field_values(FIELD_VALUES, SCHEMA)
+    assert values == {"Status": "Done", "Estimate": 3.0, "Sprint": "Sprint 1", "Due": "2024-02-01", "Pod": "Alpha (renamed)"}
+
+
+def test_decode_without_schema_falls_back_to_the_value_names():
+    values = project_fields.decode_field_values(FIELD_VALUES)
+    assert values == {"Status": "Done", "Estimate": 3.0, "Sprint": "Sprint 1", "Due": "2024-02-01", "Pod": "Alpha"}
+
+
+def test_first_value_of_a_field_wins_and_unnamed_values_are_skipped():
+    field_values = [
+        {"text": "first", "field": {"id": "F7", "name": "Notes"}},
+        {"text": "second", "field": {"id": "F7", "name": "Notes"}},
+        {"text": "orphan"},
+    ]
+    assert project_fields.decode_field_values(field_values) == {"Notes": "first"}
+
+
+def test_typed_value_keeps_zero_and_unknown_ids():
+    assert project_fields.typed_value({"number": 0}) == 0
+    assert project_fields.typed_value({"optionId": "gone", "name": "Old"}, SCHEMA["F1"]) == "Old"
+    assert project_fields.typed_value({"iterationId": "i2"}, SCHEMA["F3"]) == "Sprint 2"
+    assert project_fields.typed_value({}) is None
+
+
+def test_custom_field_names_skip_status_and_issue_mirrors():
+    assert project_fields.custom_field_names(SCHEMA) == ["Estimate", "Sprint", "Due", "Pod"]
+    assert project_fields.custom_field_names(None) == []
+
+
+def test_unknown_field_ids_ask_for_a_schema_refresh():
+    nodes = [{"fieldValues": {"nodes": FIELD_VALUES}}, {"fieldValues": None}]
+    assert not project_fields.has_unknown_fields(nodes, SCHEMA)
+    nodes.append({"fieldValues": {"nodes": [{"text": "x", "field": {"id": "F9", "name": "New"}}]}})
+    assert project_fields.has_unknown_fields(nodes, SCHEMA)
+
+
+def test_field_definition_maps_option_and_iteration_ids():
+    node = {
+        "id": "F3", "name": "Sprint", "dataType": "ITERATION",
+        "configuration": {"iterations": [{"id": "i2", "title": "Sprint 2"}], "completedIterations": [{"id": "i1", "title": "Sprint 1"}]},
+    }
+    assert project_fields.field_definition(node) == {"name": "Sprint", "type": "ITERATION", "options": {}, "iterations": {"i2": "Sprint 2", "i1": "Sprint 1"}}
@@ -0,0 +1,64 @@
+import re
+
+import pull_enrichment
+import run_metrics
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = ""
+
+    def json(self):
+        return self.payload
+
+
+# Pull request 7 has 150 reviews, only the last of them an approval; pull request 8 has two
+REVIEWS = {
+    7: [{'author': {'login': f"user{index}"}, 'state': "COMMENTED", 'submittedAt': f"2024-01-{1 + index // 10:02d}T00:00:00Z"} for index in range(149)]
+       + [{'author': {'login': "lead"}, 'state': "APPROVED", 'submittedAt': "2024-02-01T00:00:00Z"}],
+    8: [{'author': {'login': "alice"}, 'state': "APPROVED", 'submittedAt': "2024-01-02T00:00:00Z"},
+        {'author': {'login': "bob"}, 'state': "COMMENTED", 'submittedAt': "2024-01-03T00:00:00Z"}],
+}
+
+
+def fake_post(queries):
+    def post(url, json=None, **kwargs):
+        queries.append(json['query'])
+        repository = {}
+        for selection in json['query'].split("    pr")[1:]:
+            alias, number = re.match(r'(\d+): pullRequest\(number: (\d+)\)', selection).groups()
+            alias, number = f"pr{alias}", int(number)
+            first, after = re.search(r'reviews\(first: (\d+)(?:, after: "(\d+)")?', selection).groups()
+            start = int(after or 0)
+            end = min(start + int(first), len(REVIEWS[number]))
+            reviews = {'totalCount': len(REVIEWS[number]), 'pageInfo': {'endCursor': str(end), 'hasNextPage': end < len(REVIEWS[number])},
+                       'nodes': REVIEWS[number][start:end]}
+            pull = {'reviews': reviews}
+            if after is None:
+                pull.update({'number': number, 'createdAt': "2024-01-01T00:00:00Z", 'mergedAt': None, 'additions': 1,
+                             'deletions': 0, 'changedFiles': 1, 'commits': {'totalCount': 1}})
+            repository[alias] = pull
+        return FakeResponse(200, {'data': {'repository': repository}})
+    return post
+
+
+def test_enrichment_fetches_the_rest_of_long_review_lists(monkeypatch):
+    queries = []
+    monkeypatch.setattr(run_metrics, "http_post", fake_post(queries))
+    enrichment = pull_enrichment.fetch_pull_enrichment("o", "r", [7, 8], {})
+    columns = pull_enrichment.ENRICHMENT_COLUMNS
+    assert len(queries) == 2 and 'after: "100"' in queries[1] and "pr8:" not in queries[1]
+    assert len(enrichment[7][columns.index("Reviewed By")].split(",")) == 150
+    assert enrichment[7][columns.index("Approved By")] == "lead"
+    assert enrichment[7][columns.index("Review State")] == "APPROVED"
+    assert enrichment[8][columns.index("Approved By")] == "alice"
+
+
+def test_failed_review_page_is_reported_incomplete(monkeypatch):
+    post = fake_post([])
+    pulls = {7: post("", json={'query': pull_enrichment.build_enrichment_query("o", "r", [7])}).payload['data']['repository']['pr7']}
+    monkeypatch.setattr(run_metrics, "http_post", lambda *args, **kwargs: FakeResponse(502))
+    assert pull_enrichment.complete_review_pages("o", "r", pulls, {}) == [7]
+    assert len(pulls[7]['reviews']['nodes']) == pull_enrichment.REVIEW_PAGE_SIZE
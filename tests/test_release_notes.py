@@ -0,0 +1,70 @@
+import pandas as pd
+
+import issue_bodies
+import release_notes
+import run_metrics
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self._payload
+
+
+def use_responses(monkeypatch, responses):
+    monkeypatch.setattr(run_metrics, "http_get", lambda url, **kwargs: responses[url.split('/')[-1]])
+
+
+def test_fetch_issue_body_falls_back_without_caching_on_failure(monkeypatch, tmp_path):
+    issue_bodies.load_body_cache(str(tmp_path / "bodies.json"))
+    use_responses(monkeypatch, {"7": FakeResponse(404, {"message": "Not Found"})})
+    body = release_notes.fetch_issue_body("https://github.com/o/r/issues/7", "token", "2024-01-01T00:00:00Z")
+    assert body == release_notes.FALLBACK_BODY
+    assert issue_bodies.cached_body(f"{release_notes.REPO_OWNER}/{release_notes.REPO_NAME}", "7", "2024-01-01T00:00:00Z") is None
+
+
+def test_fetch_issue_body_handles_null_body(monkeypatch, tmp_path):
+    issue_bodies.load_body_cache(str(tmp_path / "bodies.json"))
+    use_responses(monkeypatch, {"8": FakeResponse(200, {"number": 8, "body": None})})
+    assert release_notes.fetch_issue_body("https://github.com/o/r/issues/8", "token", "2024-01-01T00:00:00Z") == ""
+
+
+def test_fetch_issue_body_cleans_and_caches(monkeypatch, tmp_path):
+    issue_bodies.load_body_cache(str(tmp_path / "bodies.json"))
+    use_responses(monkeypatch, {"9": FakeResponse(200, {"body": "Scope\n\n\nmore\n\n## Acceptance Criteria\n- done"})})
+    assert release_notes.fetch_issue_body("https://github.com/o/r/issues/9", "token", "2024-01-01T00:00:00Z") == "Scope\nmore"
+    cached = issue_bodies.cached_body(f"{release_notes.REPO_OWNER}/{release_notes.REPO_NAME}", "9", "2024-01-01T00:00:00Z")
+    assert cached['clean'] == "Scope\nmore"
+
+
+def test_prefetch_leaves_out_failed_lookups_and_reads_null_bodies(monkeypatch, tmp_path):
+    issue_bodies.load_body_cache(str(tmp_path / "bodies.json"))
+    monkeypatch.setattr(release_notes.async_rest, "fetch_json_many", lambda urls, headers: [
+        (0, None, "ClientConnectionError: connection reset"),
+        (200, {"number": 2, "body": None}, "{}"),
+    ])
+    features = pd.DataFrame({"URL": ["https://github.com/o/r/issues/1", "https://github.com/o/r/issues/2"],
+                             "Updated At": ["2024-01-01T00:00:00Z", "2024-01-01T00:00:00Z"]})
+    assert release_notes.prefetch_issue_bodies(features, "token") == {"https://github.com/o/r/issues/2": ""}
+
+
+def test_render_reuses_cached_sections_and_skips_failed_ones(monkeypatch, tmp_path):
+    issue_bodies.load_body_cache(str(tmp_path / "bodies.json"))
+    release_notes.load_section_cache(str(tmp_path / "sections.json"))
+    monkeypatch.setenv("REST_ENGINE", "requests")
+    use_responses(monkeypatch, {"1": FakeResponse(200, {"body": "First"}), "2": FakeResponse(403, {"message": "Forbidden"})})
+    features = pd.DataFrame({"Title": ["One", "Two"], "URL": ["https://github.com/o/r/issues/1", "https://github.com/o/r/issues/2"],
+                             "Updated At": ["2024-01-01T00:00:00Z", "2024-01-01T00:00:00Z"]})
+    defects = pd.DataFrame({"Title": ["Bug"]})
+    notes = release_notes.render_release_notes(features, defects, "token")
+    assert "*First*" in notes and f"*{release_notes.FALLBACK_BODY}*" in notes
+    assert notes.count("## **List of Defects**") == 2
+
+    # Only the readable feature was cached; the other one is looked up again on the next render
+    use_responses(monkeypatch, {"2": FakeResponse(200, {"body": "Second"})})
+    notes = release_notes.render_release_notes(features, defects, "token")
+    assert "*First*" in notes and "*Second*" in notes
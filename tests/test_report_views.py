@@ -0,0 +1,87 @@
+import pandas as pd
+
+import output_backends
+import project_fetch
+import report_views
+
+URL = "https://github.com/o/r/issues/"
+
+# Labels with the values the sheet formulas (LABEL_STATUS_FORMULA, ISSUETYPE_FORMULA, POD_FORMULA, ISDEFECT_FORMULA)
+# give for them in Excel: SEARCH and "=" ignore case, FIND doesn't, and Pod needs a comma after the pod name
+FORMULA_RESULTS = [
+    # Labels, LabelStatus, LabelIssueType, Pod, IsDefect
+    ("Feature, Pod: Alpha, Status: Ready", "Ready", "Feature", "Alpha", ""),
+    ("Defect", "", "DEFECT", "", "Defect"),
+    ("Task Pod: Beta, Status: Blocked, Defect", "Blocked", "TASK", "Beta", "Defect"),
+    ("User Story", "", "User Story", "", ""),
+    ("Pod: Beta", "", "", "", ""),
+    ("pod: gamma, Task", "", "", "gamma", ""),
+    ("task, status: blocked, pod: gamma", "blocked", "task", "", ""),
+    ("Bug, defect-candidate", "", "Bug", "", "Defect"),
+    ("", "", "", "", ""),
+    (None, "", "", "", ""),
+]
+
+
+def test_label_columns_match_the_formula_results():
+    for labels, status, issue_type, pod, is_defect in FORMULA_RESULTS:
+        assert report_views.label_status(labels) == status, labels
+        assert report_views.label_issue_type(labels) == issue_type, labels
+        assert report_views.label_pod(labels) == pod, labels
+        assert report_views.label_is_defect(labels) == is_defect, labels
+
+
+def test_link_text_matches_the_hyperlink_formula():
+    assert report_views.issue_link_text(URL + "42") == "42"
+    assert report_views.issue_link_text("https://github.com/o/r/pull/7") == "7"
+    assert report_views.issue_link_text(None) == ""
+
+
+def fetched(rows):
+    return pd.DataFrame([[f"Issue {number}", URL + str(number), "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", "OPEN", "alice", labels, milestone, status]
+                         for number, labels, milestone, status in rows], columns=project_fetch.RECORD_COLUMNS)
+
+
+def test_board_and_release_views_follow_the_sheet_layout():
+    program = report_views.build_board_view(fetched([
+        (1, "Feature, Pod: Alpha, Status: Ready", "Release 1.8.0", "Todo"),
+        (2, "Defect, Pod: Beta, Status: Blocked", "Release 1.7.0", "Done"),
+        (3, None, "Release 1.8.0", "Todo"),
+        (4, "Task", "Release 2.0", "Todo"),
+    ]), "Program")
+    stream = report_views.build_board_view(fetched([(2, "Defect, Pod: Beta, Status: Blocked", "Release 1.7.0", "In Review")]), "Stream")
+    assert list(program.columns) == report_views.BOARD_COLUMNS
+    assert program["GitHub Link "].tolist() == ["1", "2", "3", "4"]
+    assert program["Pod"].tolist() == ["Alpha", "Beta", "", ""]
+
+    views = report_views.build_release_views({"Program": program, "Stream": stream})
+    assert views["Release1.8items"]["URL"].tolist() == [URL + "1", URL + "2", URL + "3"]
+    assert list(views["Release1.8items"].columns) == report_views.VIEW_COLUMNS
+    # An issue on two boards keeps its first board's row
+    assert views["Defects"][["URL", "Pod Project", "Status"]].values.tolist() == [[URL + "2", "Program", "Done"]]
+    assert list(views["Defects"].columns) == report_views.DEFECT_COLUMNS
+    assert views["Features"][["URL", "IssueType"]].values.tolist() == [[URL + "1", "Feature"], [URL + "3", ""]]
+
+
+def test_summary_counts_issues_on_several_boards_once_across_boards():
+    program = report_views.build_board_view(fetched([(1, "Pod: Alpha, Feature", None, "Todo"), (2, "Pod: Beta, Defect", None, "Done")]), "Program")
+    stream = report_views.build_board_view(fetched([(2, "Pod: Beta, Defect", None, "Done"), (5, "Task", None, "None")]), "Stream")
+    summary = report_views.build_summary_tables({"Program": program, "Stream": stream})["Summary Pod x Status"]
+    all_boards = summary[summary["Board"] == report_views.SUMMARY_ALL_BOARDS].set_index("Pod")
+    assert all_boards.loc["Total", "Total"] == 3
+    assert all_boards.loc["Beta", "Done"] == 1
+    assert all_boards.loc[report_views.SUMMARY_BLANK, report_views.SUMMARY_BLANK] == 1
+    assert summary[summary["Board"] == "Stream"].set_index("Pod").loc["Total", "Total"] == 2
+
+
+def test_columnar_tables_keep_the_sheet_columns(tmp_path):
+    view = report_views.build_board_view(fetched([(1, "Feature, Pod: Alpha, Status: Ready", "Release 1.8.0", "Todo")]), "Program")
+    base = str(tmp_path / "report")
+    output_backends.write_tables({"Program": view}, base, ["csv", "parquet"])
+    written = sorted(path.name for path in tmp_path.iterdir())
+    assert len(written) == 2
+    for name in written:
+        path = str(tmp_path / name)
+        table = pd.read_parquet(path) if name.endswith(".parquet") else pd.read_csv(path, dtype=str, keep_default_na=False)
+        assert list(table.columns) == report_views.BOARD_COLUMNS
+        assert table.loc[0, "Pod"] == "Alpha" and table.loc[0, "GitHub Link "] == "1"
@@ -0,0 +1,69 @@
+import os
+
+import pandas as pd
+
+import project_fetch
+import snapshot_store
+
+URL = "https://github.com/o/r/issues/"
+
+
+def board(rows):
+    return pd.DataFrame([[f"Issue {number}", URL + str(number), "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z", state, "alice", labels, milestone, status]
+                         for number, state, labels, milestone, status in rows], columns=project_fetch.RECORD_COLUMNS)
+
+
+def old_snapshot():
+    return snapshot_store.snapshot_frame({
+        "Program": board([(1, "OPEN", "Feature", "Release 1.8.0", "Todo"), (2, "OPEN", "Defect", None, "In Progress"), (3, "OPEN", "Task", None, "Todo")]),
+        "Stream": board([(1, "OPEN", "Feature", "Release 1.8.0", "Todo")]),
+    })
+
+
+def new_snapshot():
+    return snapshot_store.snapshot_frame({
+        "Program": board([(1, "OPEN", "Feature", "Release 1.8.0", "In Progress"), (2, "CLOSED", "Defect", "Release 1.8.0", "Done"), (4, "OPEN", "Task", None, "Todo")]),
+        "Stream": board([(1, "OPEN", "Feature", "Release 1.8.0", "Todo")]),
+    })
+
+
+def test_snapshot_frame_keeps_one_row_per_board_item():
+    snapshot = snapshot_store.snapshot_frame({"Program": board([(1, "OPEN", "Feature", None, "Todo"), (1, "OPEN", "Feature", None, "Done")])})
+    assert list(snapshot.columns[:2]) == snapshot_store.KEY_COLUMNS
+    assert snapshot["Status"].tolist() == ["Todo"]
+
+
+def test_diff_reports_transitions_added_and_removed_items():
+    diff = snapshot_store.diff_snapshots(old_snapshot(), new_snapshot())
+    transitions = diff["Transitions"]
+    # The same issue on another board is tracked separately, so the Stream row has no transition
+    assert transitions[["URL", "Field", "From", "To"]].values.tolist() == [
+        [URL + "1", "Status", "Todo", "In Progress"],
+        [URL + "2", "Milestone", "", "Release 1.8.0"],
+        [URL + "2", "State", "OPEN", "CLOSED"],
+        [URL + "2", "Status", "In Progress", "Done"],
+    ]
+    assert set(transitions["Board"]) == {"Program"}
+    assert diff["Added"]["URL"].tolist() == [URL + "4"]
+    assert diff["Removed"]["URL"].tolist() == [URL + "3"]
+    assert snapshot_store.diff_snapshots(old_snapshot(), new_snapshot(), fields=["Status"])["Transitions"]["Field"].unique().tolist() == ["Status"]
+
+
+def test_saved_snapshots_are_pruned_per_script(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_KEEP", "2")
+    boards = {"Program": board([(1, "OPEN", "Feature", None, "Todo")])}
+    for run in ("20240101_120000", "20240102_120000", "20240103_120000"):
+        snapshot_store.save_snapshot(boards, f"getProjectsStatus_{run}", str(tmp_path))
+    snapshot_store.save_snapshot(boards, "getProjectsStatusReleaseDefects20240101_120000", str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["getProjectsStatusReleaseDefects20240101_120000.parquet",
+                                            "getProjectsStatus_20240102_120000.parquet", "getProjectsStatus_20240103_120000.parquet"]
+    history = snapshot_store.field_history(snapshot_store.list_snapshots(str(tmp_path), "getProjectsStatus_"))
+    assert history[["Run", "Board", "Todo"]].values.tolist() == [["2024-01-02 12:00:00", "Program", 1], ["2024-01-03 12:00:00", "Program", 1]]
+
+
+def test_snapshots_are_opt_in(monkeypatch):
+    monkeypatch.delenv("SNAPSHOT_DIR", raising=False)
+    assert snapshot_store.snapshot_dir() is None
+    assert snapshot_store.save_snapshot({}, "getProjectsStatus_20240101_120000") is None
+    monkeypatch.setenv("SNAPSHOT_DIR", "1")
+    assert snapshot_store.snapshot_dir() == snapshot_store.DEFAULT_SNAPSHOT_DIR
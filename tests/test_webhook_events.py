@@ -0,0 +1,105 @@
+import json
+import os
+
+import pandas as pd
+
+import project_fetch
+import webhook_events
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+BOARD_URL = "https://github.com/kpmg-global-technology-and-knowledge/Digital-matrix-app/issues/"
+
+
+# Function to read the recorded deliveries, in the WEBHOOK_LOG format replay_webhooks.py reads
+def recorded_deliveries():
+    with open(os.path.join(FIXTURES, "webhooks.jsonl"), encoding="utf-8") as log_file:
+        return [json.loads(line) for line in log_file if line.strip()]
+
+
+def delivery(delivery_id):
+    return next(entry for entry in recorded_deliveries() if entry["delivery"] == delivery_id)
+
+
+def board():
+    rows = [
+        ["Export board", BOARD_URL + "101", "2024-01-05T09:00:00Z", "2024-02-01T00:00:00Z", "OPEN", "alice", "Feature, Pod: Alpha", "Release 1.8.0", "In Progress"],
+        ["Login fails on Safari", BOARD_URL + "102", "2024-01-05T09:00:00Z", "2024-02-01T00:00:00Z", "OPEN", "alice", "Defect, Pod: Beta", "Release 1.8.0", "Todo"],
+        ["Pipeline flaky", BOARD_URL + "103", "2024-01-05T09:00:00Z", "2024-02-01T00:00:00Z", "OPEN", "alice", "Task", None, "Done"],
+    ]
+    return pd.DataFrame(rows, columns=project_fetch.RECORD_COLUMNS)
+
+
+def apply_recorded(delivery_id, df):
+    entry = delivery(delivery_id)
+    change = webhook_events.issue_event_change(entry["event"], entry["payload"])
+    return None if change is None else change(df)
+
+
+def test_edited_issue_updates_its_row_and_keeps_the_project_status():
+    updated = apply_recorded("d-0001", board())
+    row = updated[updated["URL"] == BOARD_URL + "101"].iloc[0]
+    assert row["Title"] == "Export board to PDF"
+    assert row["Labels"] == "Feature, Pod: Alpha, Status: Ready"
+    assert row["Updated At"] == "2024-03-01T10:00:00Z"
+    assert row["Status"] == "In Progress"
+    assert updated.drop(index=0).equals(board().drop(index=0))
+
+
+def test_milestoned_issue_and_issue_comment_update_their_rows():
+    assert apply_recorded("d-0002", board()).loc[1, "Milestone"] == "Release 2.0"
+    assert apply_recorded("d-0003", board()).loc[2, "Updated At"] == "2024-03-03T12:00:00Z"
+
+
+def test_pull_request_comment_and_project_item_events_are_not_issue_changes():
+    for delivery_id in ("d-0004", "d-0007"):
+        entry = delivery(delivery_id)
+        assert webhook_events.issue_event_change(entry["event"], entry["payload"]) is None
+
+
+def test_deleted_issue_is_taken_off_the_board():
+    updated = apply_recorded("d-0005", board())
+    assert list(updated["URL"]) == [BOARD_URL + "101", BOARD_URL + "103"]
+
+
+def test_issue_not_on_the_board_leaves_it_unchanged():
+    assert apply_recorded("d-0006", board()) is None
+
+
+def test_upsert_item_replaces_or_appends_a_fetched_record():
+    record = dict(zip(project_fetch.RECORD_COLUMNS, board().iloc[2].tolist()), Status="In Review")
+    updated = webhook_events.upsert_item(board(), record)
+    assert updated.loc[2, "Status"] == "In Review" and len(updated) == 3
+    assert webhook_events.upsert_item(updated, record) is None
+
+    new_record = dict(record, URL=BOARD_URL + "200", Status=None)
+    appended = webhook_events.upsert_item(board(), new_record)
+    assert len(appended) == 4 and appended.loc[3, "Status"] == "None"
+
+
+def test_remove_issue_missing_url():
+    assert webhook_events.remove_issue(board(), BOARD_URL + "999") is None
+
+
+def test_verify_signature_of_recorded_payloads():
+    secret = "It's a Secret to Everybody"
+    for entry in recorded_deliveries():
+        body = json.dumps(entry["payload"]).encode("utf-8")
+        signature = webhook_events.payload_signature(secret, body)
+        assert webhook_events.verify_signature(secret, body, signature)
+        assert not webhook_events.verify_signature(secret, body + b" ", signature)
+        assert not webhook_events.verify_signature("another secret", body, signature)
+    assert not webhook_events.verify_signature(secret, b"{}", None)
+    assert not webhook_events.verify_signature(None, b"{}", "sha256=00")
+
+
+def test_signature_matches_githubs_documented_example():
+    # Example from GitHub's "Validating webhook deliveries" documentation
+    assert webhook_events.payload_signature("It's a Secret to Everybody", b"Hello, World!") == \
+        "sha256=757107ea0eb2509fc211221cce984b8a37570b6d7586c22c46f4379c8b043e17"
+
+
+def test_forgotten_delivery_is_not_a_duplicate():
+    assert not webhook_events.is_duplicate_delivery("d-retry")
+    assert webhook_events.is_duplicate_delivery("d-retry")
+    webhook_events.forget_delivery("d-retry")
+    assert not webhook_events.is_duplicate_delivery("d-retry")
@@ -0,0 +1,136 @@
+import hashlib
+import hmac
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Webhook events the ingestion endpoint accepts; anything else is acknowledged and ignored
+SUPPORTED_EVENTS = ("issues", "issue_comment", "pull_request", "projects_v2_item")
+
+# Issue actions after which the issue no longer belongs on the boards
+ISSUE_REMOVED_ACTIONS = ("deleted", "transferred")
+
+# Project item actions that take the item off the board, and the ones that leave its values unchanged
+ITEM_REMOVED_ACTIONS = ("deleted", "archived")
+ITEM_IGNORED_ACTIONS = ("reordered",)
+
+# Delivery ids remembered so a redelivered webhook is not applied twice
+RECENT_DELIVERIES = 1000
+
+_recent = OrderedDict()
+_lock = threading.Lock()
+
+
+# Function to read the webhook secret from WEBHOOK_SECRET or webhook_secret.txt (None when neither is set)
+def read_webhook_secret(file_path='webhook_secret.txt'):
+    secret = os.environ.get("WEBHOOK_SECRET", "").strip()
+    if not secret and os.path.exists(file_path):
+        with open(file_path, 'r') as file:
+            secret = file.read().strip()
+    return secret or None
+
+
+# Function to compute the X-Hub-Signature-256 value GitHub sends for a payload
+def payload_signature(secret, body):
+    return "sha256=" + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+
+# Function to check a payload against its X-Hub-Signature-256 header
+def verify_signature(secret, body, signature_header):
+    if not secret or not signature_header:
+        return False
+    return hmac.compare_digest(payload_signature(secret, body), signature_header.strip())
+
+
+# Function to tell whether a delivery id was already seen (and remember it if not)
+def is_duplicate_delivery(delivery_id):
+    if not delivery_id:
+        return False
+    with _lock:
+        if delivery_id in _recent:
+            return True
+        _recent[delivery_id] = True
+        while len(_recent) > RECENT_DELIVERIES:
+            _recent.popitem(last=False)
+    return False
+
+
+# Function to forget a delivery id whose payload couldn't be applied, so GitHub's redelivery (same id) is applied again
+def forget_delivery(delivery_id):
+    if not delivery_id:
+        return
+    with _lock:
+        _recent.pop(delivery_id, None)
+
+
+# Function to turn the issue object of an issues or issue_comment payload into the issue fields of a project record
+def issue_record(issue):
+    return {
+        'Title': issue['title'],
+        'URL': issue['html_url'],
+        'Created At': issue['created_at'],
+        'Updated At': issue['updated_at'],
+        'State': issue['state'].upper(),
+        'Author': (issue.get('user') or {}).get('login'),
+        'Labels': ", ".join([label['name'] for label in issue.get('labels', [])]),
+        'Milestone': issue['milestone']['title'] if issue.get('milestone') else None,
+    }
+
+
+# Function to update the rows of one issue on a board; returns the new board, or None when nothing changed.
+# Project fields (Status and any extra fields) are left alone, since issue events don't carry them.
+def apply_issue_record(df, record):
+    matches = df['URL'] == record['URL']
+    if not matches.any():
+        return None
+    updated = df.copy()
+    for column, value in record.items():
+        if column in updated.columns:
+            updated.loc[matches, column] = value
+    return None if updated.equals(df) else updated
+
+
+# Function to take an issue's rows off a board; returns the new board, or None when it wasn't there
+def remove_issue(df, url):
+    matches = df['URL'] == url
+    if not matches.any():
+        return None
+    return df[~matches].reset_index(drop=True)
+
+
+# Function to add or replace an issue's row on a board with a freshly fetched project record
+def upsert_item(df, record):
+    record = {**record, 'Status': str(record.get('Status'))}  # Status is kept as a string, as on fetched boards
+    row = pd.DataFrame([record], columns=df.columns)
+    matches = df['URL'] == record['URL']
+    if matches.any():
+        updated = df.copy()
+        updated.loc[matches, list(df.columns)] = row.iloc[0].tolist()
+        return None if updated.equals(df) else updated
+    return pd.concat([df, row], ignore_index=True)
+
+
+# Function to work out the board change an issues or issue_comment payload makes: a function taking a board and returning
+# the new board (or None when that board is unchanged), or None when the event leaves the boards alone
+def issue_event_change(event_name, payload):
+    issue = payload.get('issue') or {}
+    # Comments on pull requests arrive as issue_comment too; the boards hold issues only
+    if event_name not in ('issues', 'issue_comment') or not issue or issue.get('pull_request'):
+        return None
+    if event_name == 'issues' and payload.get('action') in ISSUE_REMOVED_ACTIONS:
+        return lambda df: remove_issue(df, issue['html_url'])
+    record = issue_record(issue)
+    return lambda df: apply_issue_record(df, record)
+
+
+# Function to append a verified delivery to the webhook log (WEBHOOK_LOG), so it can be replayed with replay_webhooks.py
+def record_delivery(event_name, delivery_id, payload):
+    log_path = os.environ.get("WEBHOOK_LOG", "").strip()
+    if not log_path:
+        return
+    with _lock:
+        with open(log_path, 'a', encoding='utf-8') as log_file:
+            log_file.write(json.dumps({'event': event_name, 'delivery': delivery_id, 'payload': payload}) + "\n")
@@ -0,0 +1,123 @@
+import os
+
+import excel_styles
+import report_views
+
+# Derived columns that can be written as live Excel formulas, with the formula template for each
+FORMULA_TEMPLATES = {
+    "LabelStatus": report_views.LABEL_STATUS_FORMULA,
+    "LabelIssueType": report_views.ISSUETYPE_FORMULA,
+    "IssueType": report_views.ISSUETYPE_FORMULA,
+    "Pod": report_views.POD_FORMULA,
+    "IsDefect": report_views.ISDEFECT_FORMULA,
+}
+
+# Columns that show the issue number and link to the row's URL
+LINK_COLUMNS = ("GitHub Link ", "GitHub Link")
+
+# Widest column we set, so long bodies don't produce unusable sheets
+MAX_COLUMN_WIDTH = 100
+
+
+# Function to read the Excel engine for this run, e.g. EXCEL_ENGINE=xlsxwriter (openpyxl is the default)
+def selected_excel_engine(default="openpyxl"):
+    engine = os.environ.get("EXCEL_ENGINE", default).strip().lower()
+    if engine not in ("openpyxl", "xlsxwriter"):
+        raise ValueError(f"Unsupported Excel engine {engine}; choose openpyxl or xlsxwriter")
+    return engine
+
+
+# Function to read whether the derived columns are written as formulas (EXCEL_FORMULAS=0 writes static values)
+def formulas_enabled():
+    return os.environ.get("EXCEL_FORMULAS", "1").strip() not in ("0", "false", "no")
+
+
+# Function to turn a zero-based column index into an Excel column letter
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+# Function to work out a column width the same way the export scripts do, capped at MAX_COLUMN_WIDTH
+def column_width(header, values):
+    lengths = values.dropna().astype(str).str.len()
+    max_length = max(len(str(header)), int(lengths.max()) if len(lengths) else 0)
+    return min((max_length + 2) * 1.2, MAX_COLUMN_WIDTH)
+
+
+# Function to write every table (sheet name -> DataFrame) into one workbook in a single pass.
+# XlsxWriter runs in constant_memory mode, so each sheet is streamed row by row and cannot be reopened;
+# formula cells carry the Python-computed value as their cached result.
+def write_report_workbook(tables, output_filename, formulas=True, formula_tables=(), links=None):
+    # XlsxWriter is only needed when this engine is selected
+    import xlsxwriter
+
+    links = links or {}
+    workbook = xlsxwriter.Workbook(output_filename, {
+        'constant_memory': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'strings_to_numbers': False,
+    })
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    link_format = workbook.add_format({'font_color': '#0000FF', 'underline': 1})
+
+    for sheet_name, df in tables.items():
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        columns = list(df.columns)
+        labels_letter = _column_letter(columns.index("Labels")) if "Labels" in columns else None
+        url_letter = _column_letter(columns.index("URL")) if "URL" in columns else None
+        use_formulas = formulas and sheet_name in formula_tables and labels_letter is not None
+        sheet_links = links.get(sheet_name, {})
+
+        link_urls = {column: list(urls) for column, urls in sheet_links.items()}
+        if url_letter is not None:
+            for column in LINK_COLUMNS:
+                if column in columns and column not in link_urls:
+                    link_urls[column] = list(df["URL"])
+
+        # Column widths and the link columns' column-level format have to be set before any rows are streamed
+        for col_num, column in enumerate(columns):
+            worksheet.set_column(col_num, col_num, column_width(column, df[column]), link_format if column in link_urls else None)
+
+        for col_num, column in enumerate(columns):
+            worksheet.write_string(0, col_num, str(column), header_format)
+
+        # Excel keeps at most MAX_SHEET_URLS hyperlinks per sheet; later links are HYPERLINK formulas
+        sheet_urls = 0
+        values = df.astype(object).where(df.notna(), None)
+        for row_index, record in enumerate(values.itertuples(index=False, name=None)):
+            row_num = row_index + 1
+            excel_row = row_num + 1
+            for col_num, value in enumerate(record):
+                column = columns[col_num]
+                if column in link_urls:
+                    url = link_urls[column][row_index]
+                    if formulas and column in LINK_COLUMNS and excel_styles.link_formulas_enabled():
+                        formula = report_views.HYPERLINK_FORMULA.replace('B2', f'{url_letter}{excel_row}')
+                        worksheet.write_formula(row_num, col_num, formula, link_format, '' if value is None else value)
+                    elif isinstance(url, str) and url and sheet_urls < excel_styles.MAX_SHEET_URLS:
+                        sheet_urls += 1
+                        worksheet.write_url(row_num, col_num, url, link_format, '' if value is None else str(value))
+                    elif isinstance(url, str) and url:
+                        text = '' if value is None else str(value)
+                        worksheet.write_formula(row_num, col_num, excel_styles.hyperlink_formula(url, text), link_format, text)
+                    elif value is not None:
+                        worksheet.write(row_num, col_num, value)
+                elif use_formulas and column in FORMULA_TEMPLATES:
+                    formula = FORMULA_TEMPLATES[column].replace('G2', f'{labels_letter}{excel_row}')
+                    worksheet.write_formula(row_num, col_num, formula, None, '' if value is None else value)
+                elif value is not None:
+                    worksheet.write(row_num, col_num, value)
+
+    workbook.close()
+    return output_filename
+
+
+# Function to list the report tables whose derived columns were formulas in the openpyxl workbook
+def formula_tables_for(tables):
+    return [name for name in tables if name not in ("Defects", "Features")]